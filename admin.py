@@ -7,6 +7,7 @@ import sqlite3
 from flask import Blueprint, request, jsonify, g, current_app, render_template
 
 from auth import admin_required
+from story_render import enqueue_all_stories, enqueue_story, get_render_status
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -118,6 +119,51 @@ def get_dashboard_stats():
         return jsonify({'error': 'Đã xảy ra lỗi'}), 500
 
 
+def queue_story_render(db, story_id):
+    """Queue narration pre-rendering of a story; never fails the story change itself"""
+    try:
+        queued = enqueue_story(db, story_id)
+        if queued:
+            print(f"[RENDER] Queued {queued} narration job(s) for story {story_id}")
+    except Exception as e:
+        print(f"[RENDER QUEUE ERROR] {e}")
+
+
+@admin_bp.route('/api/render/status')
+@admin_required
+def get_story_render_status():
+    """Story pre-rendering progress for the dashboard"""
+    try:
+        return jsonify({'status': 'ok', 'render': get_render_status(get_db())})
+    except Exception as e:
+        print(f"[RENDER STATUS ERROR] {e}")
+        return jsonify({'error': 'Đã xảy ra lỗi'}), 500
+
+
+@admin_bp.route('/api/render/stories/<int:story_id>', methods=['POST'])
+@admin_required
+def rerender_story(story_id):
+    """Re-render the narrations of one story"""
+    try:
+        queued = enqueue_story(get_db(), story_id, force=True)
+        return jsonify({'status': 'ok', 'queued': queued})
+    except Exception as e:
+        print(f"[RENDER STORY ERROR] {e}")
+        return jsonify({'error': 'Đã xảy ra lỗi'}), 500
+
+
+@admin_bp.route('/api/render/all', methods=['POST'])
+@admin_required
+def render_all_stories():
+    """Queue every active story that is missing a narration"""
+    try:
+        queued = enqueue_all_stories(get_db())
+        return jsonify({'status': 'ok', 'queued': queued})
+    except Exception as e:
+        print(f"[RENDER ALL ERROR] {e}")
+        return jsonify({'error': 'Đã xảy ra lỗi'}), 500
+
+
 # ==========================================
 # User Management Routes
 # ==========================================
@@ -516,6 +562,7 @@ def toggle_story_status(story_id):
         new_status = 0 if story['is_active'] else 1
         db.execute('UPDATE stories SET is_active = ? WHERE story_id = ?', (new_status, story_id))
         db.commit()
+        queue_story_render(db, story_id)
         
         return jsonify({
             'status': 'ok',
@@ -556,6 +603,7 @@ def create_story():
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (title, content, summary, category_id, cover_image, country, min_age, max_age, duration_minutes, 1 if is_active else 0))
         db.commit()
+        queue_story_render(db, cursor.lastrowid)
         
         return jsonify({
             'status': 'ok',
@@ -599,6 +647,7 @@ def update_story(story_id):
             WHERE story_id = ?
         ''', (title, content, summary, category_id, cover_image, country, min_age, max_age, duration_minutes, 1 if is_active else 0, story_id))
         db.commit()
+        queue_story_render(db, story_id)
         
         return jsonify({
             'status': 'ok',
@@ -623,6 +672,7 @@ def delete_story(story_id):
         
         db.execute('DELETE FROM stories WHERE story_id = ?', (story_id,))
         db.commit()
+        queue_story_render(db, story_id)
         
         return jsonify({
             'status': 'ok',
@@ -6,7 +6,12 @@ import os
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+import functools
+import json
+import shutil
 import sqlite3
+import struct
+import threading
 import time
 import traceback
 import uuid
@@ -15,6 +20,7 @@ try:
     import librosa.display
 except (ImportError, ModuleNotFoundError):
     pass  # librosa.display may not be available in some versions
+import matplotlib.image
 import matplotlib.pyplot as plt
 import numpy as np
 import soundfile as sf
@@ -28,12 +34,23 @@ os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"
 from f5_tts.infer.utils_infer import (
     load_model,
     load_vocoder,
+    split_gen_text,
+    get_sampling_params,
     infer_process,
-    preprocess_ref_audio_text
+    infer_batch_process,
+    cross_fade_waves
 )
+from f5_tts.eval.utils_eval import calculate_wer, calculate_cer
+from f5_tts.infer.batch_scheduler import BatchScheduler
+from f5_tts.infer.compiled_inference import CompiledInference
+from f5_tts.infer.audio_cache import AudioCache
+from f5_tts.infer.audio_encoding import StreamingEncoder, encode_file, get_output_format, is_format_available, iter_encoded
+from f5_tts.infer.conditioning_cache import ConditioningCache
+from f5_tts.infer.serving_checkpoint import is_serving_checkpoint_current
+from f5_tts.infer.transcription_cache import set_transcription_cache
 from f5_tts.model import DiT, UNetT
 from faster_whisper import WhisperModel
-from flask import Flask, request, jsonify, render_template, g, session, redirect, url_for
+from flask import Flask, request, jsonify, render_template, g, session, redirect, url_for, Response, stream_with_context, send_file
 
 # Import configuration
 from config import get_config
@@ -48,6 +65,8 @@ app.secret_key = app.config.get('SECRET_KEY', 'default-secret-key')
 # Register blueprints
 from auth import auth_bp, mail
 from stories import stories_bp
+from story_render import StoryRenderer
+from tts_jobs import TTSJobWorker, cancel_job, create_job, get_job, get_job_counts, iter_job_events
 from history import history_bp
 from admin import admin_bp
 from upload import upload_bp
@@ -65,6 +84,16 @@ mail.init_app(app)
 OUTPUT_DIR = "static/output"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Encoding of generated files unless a request asks for another (wav | pcm16 | opus | mp3), default in config.py
+OUTPUT_FORMAT = app.config['OUTPUT_FORMAT']
+try:
+    if not is_format_available(OUTPUT_FORMAT):
+        print(f"[WARN] libsndfile cannot write OUTPUT_FORMAT={OUTPUT_FORMAT}, using pcm16")
+        OUTPUT_FORMAT = "pcm16"
+except ValueError as e:
+    print(f"[WARN] {e}, using pcm16")
+    OUTPUT_FORMAT = "pcm16"
+
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 print(f"[INIT] Using device: {DEVICE}")
 
@@ -72,8 +101,42 @@ print(f"[INIT] Using device: {DEVICE}")
 F5TTS_MODEL = None
 VOCODER = None
 WHISPER_MODEL = None
+TTS_SCHEDULER = None
+COMPILED_INFERENCE = None
+MODEL_CACHE_TAG = None  # get_model_cache_tag of the weights F5TTS_MODEL was loaded from
 TARGET_SAMPLE_RATE = 24000
 
+# Model loading is serialised, so that a request arriving during the boot preload waits for it
+MODEL_LOCK = threading.RLock()
+# Set once models are loaded and warmed up by preload_models (TTS_PRELOAD), see /ready
+MODELS_READY = threading.Event()
+PRELOAD_STATE = {"status": "disabled", "error": None, "seconds": None, "attempts": 0, "retry_in": None}
+PRELOAD_THREAD = None
+# Background story narration renderer, see story_render.py
+STORY_RENDERER = None
+# Background worker of /api/tts/jobs, see tts_jobs.py
+TTS_JOB_WORKER = None
+
+# Preprocessed reference voices (decoded audio, mel, RMS, ref_text), persisted across restarts
+CONDITIONING_CACHE = ConditioningCache(
+    cache_dir=app.config.get('CONDITIONING_CACHE_DIR'),
+    max_items=app.config.get('CONDITIONING_CACHE_SIZE', 16)
+)
+# Synthesised audio by text, voice and sampling parameters (TTS_AUDIO_CACHE)
+AUDIO_CACHE = AudioCache(
+    cache_dir=app.config.get('AUDIO_CACHE_DIR'),
+    max_bytes=app.config.get('AUDIO_CACHE_MAX_MB', 2048) * 1024 * 1024
+) if app.config.get('TTS_AUDIO_CACHE', True) else None
+# Text chunks of story narrations, so that re-rendering an edited story only synthesises changed chunks
+SEGMENT_CACHE = AudioCache(
+    cache_dir=app.config.get('SEGMENT_CACHE_DIR'),
+    max_bytes=app.config.get('SEGMENT_CACHE_MAX_MB', 4096) * 1024 * 1024
+)
+# Reference transcriptions by decoded audio hash, ASR model and language; shared with utils_infer
+TRANSCRIPTION_CACHE = set_transcription_cache(app.config.get('TRANSCRIPTION_CACHE_DB'))
+WHISPER_MODEL_SIZE = "base"
+WHISPER_ASR_MODEL = f"faster-whisper/{WHISPER_MODEL_SIZE}"
+
 # ========================================
 # CRITICAL FIX: Load model config from YAML exactly like CLI!
 # ========================================
@@ -113,27 +176,42 @@ def init_db():
                 audio_path TEXT NOT NULL,
                 spectrogram_path TEXT,
                 duration REAL,
+                codec TEXT,
+                file_size INTEGER,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
         db.commit()
+        migrate_history_table(db)
         print("[DB] Database initialized successfully")
 
 
-def save_audio_history(text_input, voice_sample, audio_path, spectrogram_path=None, duration=None):
-    """Save generated audio to history"""
+def migrate_history_table(db):
+    """generated_audios of older databases lack the codec and file_size columns"""
+    columns = [row[1] for row in db.execute('PRAGMA table_info(generated_audios)').fetchall()]
+    if not columns:
+        return
+    for column, column_type in [('codec', 'TEXT'), ('file_size', 'INTEGER')]:
+        if column not in columns:
+            db.execute(f'ALTER TABLE generated_audios ADD COLUMN {column} {column_type}')
+    db.commit()
+
+
+def save_audio_history(text_input, voice_sample, audio_path, spectrogram_path=None, duration=None, codec=None,
+                       file_size=None):
+    """Save generated audio to history, returns its audio_id (None on failure)"""
     try:
         db = get_db()
-        db.execute('''
-            INSERT INTO generated_audios (text_input, voice_sample, audio_path, spectrogram_path, duration)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (text_input, voice_sample, audio_path, spectrogram_path, duration))
+        cursor = db.execute('''
+            INSERT INTO generated_audios (text_input, voice_sample, audio_path, spectrogram_path, duration, codec, file_size)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (text_input, voice_sample, audio_path, spectrogram_path, duration, codec, file_size))
         db.commit()
         print(f"[DB] Saved audio history: {audio_path}")
-        return True
+        return cursor.lastrowid
     except Exception as e:
         print(f"[DB ERROR] Failed to save history: {e}")
-        return False
+        return None
 
 
 def get_audio_history(limit=20):
@@ -141,7 +219,7 @@ def get_audio_history(limit=20):
     try:
         db = get_db()
         cursor = db.execute('''
-            SELECT audio_id, text_input, voice_sample, audio_path, spectrogram_path, duration, created_at
+            SELECT audio_id, text_input, voice_sample, audio_path, spectrogram_path, duration, codec, file_size, created_at
             FROM generated_audios
             ORDER BY created_at DESC
             LIMIT ?
@@ -168,12 +246,14 @@ def delete_audio_history(audio_id):
                     file_path = row[path_key].lstrip('/')
                     # On Windows, also handle forward slashes
                     file_path = file_path.replace('/', os.sep)
-                    if os.path.exists(file_path):
-                        try:
-                            os.remove(file_path)
-                            print(f"[DB] Deleted file: {file_path}")
-                        except Exception as e:
-                            print(f"[WARN] Could not delete file {file_path}: {e}")
+                    paths = [file_path] + ([get_mel_path(file_path)] if path_key == 'audio_path' else [])
+                    for file_path in paths:
+                        if os.path.exists(file_path):
+                            try:
+                                os.remove(file_path)
+                                print(f"[DB] Deleted file: {file_path}")
+                            except Exception as e:
+                                print(f"[WARN] Could not delete file {file_path}: {e}")
             
             # Delete from DB
             db.execute('DELETE FROM generated_audios WHERE audio_id = ?', (audio_id,))
@@ -198,74 +278,6 @@ def log_time(start_time, message):
     return time.time()
 
 
-def calculate_wer(reference, hypothesis):
-    """
-    Calculate Word Error Rate (WER)
-    WER = (S + D + I) / N
-    where S = substitutions, D = deletions, I = insertions, N = words in reference
-    """
-    ref_words = reference.lower().split()
-    hyp_words = hypothesis.lower().split()
-    
-    # Dynamic programming for edit distance
-    d = [[0] * (len(hyp_words) + 1) for _ in range(len(ref_words) + 1)]
-    
-    for i in range(len(ref_words) + 1):
-        d[i][0] = i
-    for j in range(len(hyp_words) + 1):
-        d[0][j] = j
-    
-    for i in range(1, len(ref_words) + 1):
-        for j in range(1, len(hyp_words) + 1):
-            if ref_words[i-1] == hyp_words[j-1]:
-                d[i][j] = d[i-1][j-1]
-            else:
-                d[i][j] = min(
-                    d[i-1][j] + 1,      # deletion
-                    d[i][j-1] + 1,      # insertion
-                    d[i-1][j-1] + 1     # substitution
-                )
-    
-    if len(ref_words) == 0:
-        return 0.0 if len(hyp_words) == 0 else 1.0
-    
-    return d[len(ref_words)][len(hyp_words)] / len(ref_words)
-
-
-def calculate_cer(reference, hypothesis):
-    """
-    Calculate Character Error Rate (CER)
-    CER = (S + D + I) / N
-    where S = substitutions, D = deletions, I = insertions, N = characters in reference
-    """
-    ref_chars = list(reference.lower().replace(" ", ""))
-    hyp_chars = list(hypothesis.lower().replace(" ", ""))
-    
-    # Dynamic programming for edit distance
-    d = [[0] * (len(hyp_chars) + 1) for _ in range(len(ref_chars) + 1)]
-    
-    for i in range(len(ref_chars) + 1):
-        d[i][0] = i
-    for j in range(len(hyp_chars) + 1):
-        d[0][j] = j
-    
-    for i in range(1, len(ref_chars) + 1):
-        for j in range(1, len(hyp_chars) + 1):
-            if ref_chars[i-1] == hyp_chars[j-1]:
-                d[i][j] = d[i-1][j-1]
-            else:
-                d[i][j] = min(
-                    d[i-1][j] + 1,
-                    d[i][j-1] + 1,
-                    d[i-1][j-1] + 1
-                )
-    
-    if len(ref_chars) == 0:
-        return 0.0 if len(hyp_chars) == 0 else 1.0
-    
-    return d[len(ref_chars)][len(hyp_chars)] / len(ref_chars)
-
-
 def evaluate_audio_quality(audio_path, original_text, lang="vi"):
     """
     Transcribe generated audio and calculate WER/CER against original text
@@ -318,12 +330,39 @@ def evaluate_audio_quality(audio_path, original_text, lang="vi"):
         }
 
 
+def start_batch_scheduler():
+    """Cross-request batching scheduler around the loaded model (if TTS_BATCH_WINDOW_MS is set)"""
+    global TTS_SCHEDULER
+
+    batch_window_ms = app.config.get('TTS_BATCH_WINDOW_MS', 0)
+    if batch_window_ms > 0:
+        TTS_SCHEDULER = BatchScheduler(
+            F5TTS_MODEL,
+            VOCODER,
+            mel_spec_type="vocos",
+            max_frames_per_batch=app.config.get('TTS_SCHEDULER_MAX_FRAMES', 8192),
+            batch_window=batch_window_ms / 1000.0,
+            device=DEVICE
+        ).start()
+        print(f"[INFO] Batch scheduler started (window={batch_window_ms}ms)")
+
+
+def with_model_lock(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with MODEL_LOCK:
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+@with_model_lock
 def load_f5tts_model():
     """
     FIXED: Load model EXACTLY like CLI - using YAML config!
     This is the critical fix!
     """
-    global F5TTS_MODEL, VOCODER
+    global F5TTS_MODEL, VOCODER, COMPILED_INFERENCE, MODEL_CACHE_TAG
 
     if F5TTS_MODEL is not None and VOCODER is not None:
         print("[INFO] Models already loaded, skipping...")
@@ -333,14 +372,16 @@ def load_f5tts_model():
     start_time = time.time()
 
     try:
+        ckpt_file = get_ckpt_file()
+
         # Validate files exist
         if not os.path.exists(VOCAB_FILE):
             raise FileNotFoundError(f"Vocab file not found: {VOCAB_FILE}")
-        if not os.path.exists(CKPT_FILE):
-            raise FileNotFoundError(f"Checkpoint file not found: {CKPT_FILE}")
+        if not os.path.exists(ckpt_file):
+            raise FileNotFoundError(f"Checkpoint file not found: {ckpt_file}")
 
         print(f"[INFO] Model: {MODEL_NAME}")
-        print(f"[INFO] Checkpoint: {CKPT_FILE}")
+        print(f"[INFO] Checkpoint: {ckpt_file}")
         print(f"[INFO] Vocab: {VOCAB_FILE}")
 
         # ========================================
@@ -372,23 +413,73 @@ def load_f5tts_model():
         model_cls = globals()[model_cfg.backbone]  # DiT or UNetT
         print(f"[INFO] Using model class: {model_cls.__name__}")
 
+        if app.config.get('TTS_BACKEND', 'torch') == 'onnx':
+            # Exported DiT + Vocos on onnxruntime, see src/f5_tts/infer/onnx_export.py
+            from f5_tts.infer.onnx_runtime import load_onnx_backend
+
+            F5TTS_MODEL, VOCODER = load_onnx_backend(
+                app.config.get('ONNX_DIT_FILE'),
+                app.config.get('ONNX_VOCODER_FILE'),
+                VOCAB_FILE,
+                num_threads=app.config.get('ONNX_NUM_THREADS') or None
+            )
+            MODEL_CACHE_TAG = compute_model_cache_tag(ckpt_file)
+            log_time(start_time, "Loaded ONNX model and vocoder")
+            start_batch_scheduler()
+            print("[SUCCESS] F5-TTS models loaded successfully (onnxruntime)!")
+            return
+
+        # int8 kernels only exist for CPU
+        quantize = app.config.get('TTS_QUANTIZE', False)
+        if quantize and DEVICE != "cpu":
+            print(f"[WARN] TTS_QUANTIZE is only supported on cpu, loading the fp model on {DEVICE}")
+            quantize = False
+        if quantize and app.config.get('TTS_DTYPE'):
+            print(f"[WARN] TTS_DTYPE={app.config['TTS_DTYPE']} is ignored, the int8 model runs in fp32")
+
         # Load model exactly like CLI
         F5TTS_MODEL = load_model(
             model_cls=model_cls,
             model_cfg=model_cfg.arch,  # Use arch from YAML!
-            ckpt_path=CKPT_FILE,
+            ckpt_path=ckpt_file,
             vocab_file=VOCAB_FILE,
             mel_spec_type="vocos",
-            device=DEVICE
+            device=DEVICE,
+            quantize=quantize,
+            quantized_ckpt_path=app.config.get('QUANTIZED_CKPT_FILE'),
+            dtype=None if quantize else app.config.get('TTS_DTYPE')
         )
 
         F5TTS_MODEL.eval()
-        log_time(start_time, "Loaded F5-TTS model")
+        MODEL_CACHE_TAG = compute_model_cache_tag(ckpt_file)
+        log_time(start_time, f"Loaded F5-TTS model ({'int8' if quantize else next(F5TTS_MODEL.parameters()).dtype})")
 
         # Load vocoder
-        VOCODER = load_vocoder(vocoder_name="vocos", device=DEVICE)
+        vocoder_local_path = app.config.get('VOCODER_LOCAL_PATH')
+        VOCODER = load_vocoder(
+            vocoder_name="vocos",
+            is_local=bool(vocoder_local_path) and os.path.isdir(vocoder_local_path),
+            local_path=vocoder_local_path,
+            device=DEVICE,
+            quantize=quantize,
+            quantized_path=app.config.get('QUANTIZED_VOCODER_FILE')
+        )
         log_time(start_time, "Loaded Vocoder")
 
+        # Opt-in compiled inference with sequence-length buckets
+        if app.config.get('TTS_COMPILE'):
+            COMPILED_INFERENCE = CompiledInference(
+                F5TTS_MODEL,
+                VOCODER,
+                mel_spec_type="vocos",
+                buckets=app.config.get('TTS_COMPILE_BUCKETS') or None
+            ).compile()
+            if app.config.get('TTS_COMPILE_WARMUP', True):
+                COMPILED_INFERENCE.warm_up()
+                log_time(start_time, "Compiled and warmed up buckets")
+
+        start_batch_scheduler()
+
         print("[SUCCESS] F5-TTS models loaded successfully!")
 
         # Print model info
@@ -401,6 +492,7 @@ def load_f5tts_model():
         raise
 
 
+@with_model_lock
 def load_whisper_model():
     """Load Whisper model"""
     global WHISPER_MODEL
@@ -413,7 +505,7 @@ def load_whisper_model():
     start_time = time.time()
 
     try:
-        WHISPER_MODEL = WhisperModel("base", device="cpu", compute_type="int8")
+        WHISPER_MODEL = WhisperModel(WHISPER_MODEL_SIZE, device="cpu", compute_type="int8")
         log_time(start_time, "Loaded Whisper model")
         print("[SUCCESS] Whisper model loaded successfully!")
     except Exception as e:
@@ -422,11 +514,23 @@ def load_whisper_model():
         raise
 
 
+@with_model_lock
 def unload_models():
     """Unload models to free VRAM"""
-    global F5TTS_MODEL, VOCODER, WHISPER_MODEL
+    global F5TTS_MODEL, VOCODER, WHISPER_MODEL, TTS_SCHEDULER, COMPILED_INFERENCE, MODEL_CACHE_TAG
 
     print("[CLEANUP] Unloading models to free VRAM...")
+    MODELS_READY.clear()
+    if PRELOAD_STATE["status"] == "ready":
+        PRELOAD_STATE["status"] = "unloaded"
+
+    if TTS_SCHEDULER is not None:
+        TTS_SCHEDULER.stop()
+        TTS_SCHEDULER = None
+        print("[INFO] Batch scheduler stopped")
+
+    COMPILED_INFERENCE = None
+    MODEL_CACHE_TAG = None
 
     if F5TTS_MODEL is not None:
         del F5TTS_MODEL
@@ -451,12 +555,233 @@ def unload_models():
     print("[SUCCESS] Models unloaded and VRAM freed")
 
 
+def warm_up_models():
+    """One short synthesis, so that the first request does not pay for a cold first ODE solve"""
+    ref_audio = app.config.get('TTS_WARMUP_REF_AUDIO')
+    ref_text = app.config.get('TTS_WARMUP_REF_TEXT') or ""
+    text_ref_path = os.path.join(os.path.dirname(ref_audio), "text-ref.txt")
+    if not ref_text and os.path.exists(text_ref_path):
+        with open(text_ref_path, "r", encoding="utf-8") as f:
+            ref_text = f.read().strip()
+
+    start_time = time.time()
+    generate_audio(
+        gen_text=app.config.get('TTS_WARMUP_TEXT'),
+        ref_audio_path=ref_audio,
+        ref_text=ref_text
+    )
+    log_time(start_time, "Warm-up synthesis")
+
+
+def preload_models():
+    """
+    Load F5-TTS, Vocos and Whisper and warm them up (TTS_PRELOAD), then mark the worker ready.
+    A failed attempt is retried with exponential backoff until the models are up.
+    """
+    PRELOAD_STATE.update(status="loading", error=None, seconds=None, attempts=0, retry_in=None)
+    start_time = time.time()
+    delay = app.config.get('TTS_PRELOAD_RETRY_SECONDS', 5)
+    while True:
+        PRELOAD_STATE["attempts"] += 1
+        try:
+            load_f5tts_model()
+            load_whisper_model()
+            if app.config.get('TTS_WARMUP', True):
+                PRELOAD_STATE["status"] = "warming_up"
+                warm_up_models()
+            with MODEL_LOCK:
+                # an unload during the warm-up leaves nothing to be ready with, load again
+                if F5TTS_MODEL is not None and VOCODER is not None and WHISPER_MODEL is not None:
+                    PRELOAD_STATE.update(status="ready", seconds=round(time.time() - start_time, 1), retry_in=None)
+                    MODELS_READY.set()
+                    break
+            PRELOAD_STATE["status"] = "loading"
+            continue
+        except Exception as e:
+            PRELOAD_STATE.update(status="failed", error=str(e), retry_in=delay)
+            print(f"[ERROR] Model preload failed (attempt {PRELOAD_STATE['attempts']}), retrying in {delay}s: {e}")
+            traceback.print_exc()
+        time.sleep(delay)
+        delay = min(delay * 2, app.config.get('TTS_PRELOAD_RETRY_MAX_SECONDS', 300))
+        PRELOAD_STATE.update(status="loading", retry_in=None)
+
+    print(f"[SUCCESS] Models preloaded and warm in {PRELOAD_STATE['seconds']}s")
+
+
+def render_story_paragraph(gen_text, ref_audio_path, ref_text):
+    """StoryRenderer synthesis callback, re-renders only the chunks an edit changed"""
+    sampling = get_sampling_params(app.config.get('STORY_RENDER_PRESET', 'quality'))
+    audio, sample_rate, segment_keys, num_synthesized = generate_audio_segmented(
+        gen_text, ref_audio_path, ref_text, sampling=sampling
+    )
+    return audio, sample_rate, {"segments": segment_keys, "synthesized": num_synthesized}
+
+
+def start_story_renderer():
+    """Background narration pre-rendering of stories queued by the admin (STORY_RENDER_CONCURRENCY)"""
+    global STORY_RENDERER
+    concurrency = app.config.get('STORY_RENDER_CONCURRENCY', 1)
+    if concurrency <= 0 or STORY_RENDERER is not None:
+        return
+    STORY_RENDERER = StoryRenderer(
+        app.config['DATABASE'],
+        render_story_paragraph,
+        output_dir=os.path.join(OUTPUT_DIR, "stories"),
+        url_prefix="/static/output/stories",
+        concurrency=concurrency,
+        lease_seconds=app.config.get('STORY_RENDER_LEASE_SECONDS', 600),
+        output_format=OUTPUT_FORMAT
+    )
+    STORY_RENDERER.start()
+
+
+def run_tts_job(params, context):
+    """TTSJobWorker synthesis callback, one queued /api/tts/jobs request"""
+    ref_text = params["ref_text"]
+    if not ref_text.strip():
+        context.report("transcribing")
+        ref_text = transcribe_audio(params["ref_audio_path"])
+        if ref_text is None:
+            raise RuntimeError("Failed to transcribe audio")
+
+    context.report("synthesizing", progress=0)
+    with app.app_context():
+        return synthesize_and_record(
+            params["text"],
+            params["voice_sample"],
+            params["ref_audio_path"],
+            ref_text,
+            params["speed"],
+            get_request_sampling_params(params),
+            preset=params.get("preset"),
+            progress_callback=context,
+            output_format=params.get("output_format")
+        )
+
+
+def cleanup_tts_job(params):
+    """An uploaded reference is kept until its job is finished for good"""
+    if params.get("uploaded") and os.path.exists(params["ref_audio_path"]):
+        os.remove(params["ref_audio_path"])
+
+
+def start_tts_job_worker():
+    """Background worker of /api/tts/jobs (TTS_JOB_CONCURRENCY)"""
+    global TTS_JOB_WORKER
+    concurrency = app.config.get('TTS_JOB_CONCURRENCY', 1)
+    if concurrency <= 0 or TTS_JOB_WORKER is not None:
+        return
+    TTS_JOB_WORKER = TTSJobWorker(
+        app.config['DATABASE'],
+        run_tts_job,
+        concurrency=concurrency,
+        lease_seconds=app.config.get('TTS_JOB_LEASE_SECONDS', 300),
+        cleanup=cleanup_tts_job
+    )
+    TTS_JOB_WORKER.start()
+
+
+def start_preload():
+    """
+    Preload in the background, so that the server (and gunicorn's worker heartbeat) is up meanwhile.
+    Also called after an unload, a preload still running (or retrying) picks the reload up itself.
+    """
+    global PRELOAD_THREAD
+    if not app.config.get('TTS_PRELOAD'):
+        return
+    if PRELOAD_THREAD is not None and PRELOAD_THREAD.is_alive():
+        return
+    PRELOAD_STATE["status"] = "starting"
+    PRELOAD_THREAD = threading.Thread(target=preload_models, name="model-preload", daemon=True)
+    PRELOAD_THREAD.start()
+
+
+def get_ckpt_file():
+    """
+    Serving checkpoint (EMA only, loads without the training state) if it was converted from the
+    current CKPT_FILE, else CKPT_FILE
+    """
+    serving_ckpt_file = app.config.get('SERVING_CKPT_FILE')
+    if not serving_ckpt_file or not os.path.exists(serving_ckpt_file):
+        return CKPT_FILE
+    if not is_serving_checkpoint_current(serving_ckpt_file, CKPT_FILE):
+        print(f"[WARN] {serving_ckpt_file} was not converted from the current {CKPT_FILE}, loading the training "
+              f"checkpoint (convert it again with src/f5_tts/infer/serving_checkpoint.py)")
+        return CKPT_FILE
+    return serving_ckpt_file
+
+
+def get_file_identity(path):
+    """Path, mtime and size of a weights file, so that a file replaced in place gets a new cache tag"""
+    if not path or not os.path.exists(path):
+        return {"path": path}
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "mtime": int(stat.st_mtime), "size": stat.st_size}
+
+
+def compute_model_cache_tag(ckpt_file):
+    """Everything about a model loaded from ckpt_file that changes its output"""
+    backend = app.config.get('TTS_BACKEND')
+    tag = {
+        "model": MODEL_NAME,
+        "ckpt_file": get_file_identity(ckpt_file),
+        "vocab_file": get_file_identity(VOCAB_FILE),
+        "backend": backend,
+        "dtype": app.config.get('TTS_DTYPE'),
+        "quantize": app.config.get('TTS_QUANTIZE'),
+    }
+    if backend == 'onnx':
+        tag["onnx_dit_file"] = get_file_identity(app.config.get('ONNX_DIT_FILE'))
+        tag["onnx_vocoder_file"] = get_file_identity(app.config.get('ONNX_VOCODER_FILE'))
+    return tag
+
+
+def get_model_cache_tag():
+    """Tag of the loaded model (taken when it was loaded, the files may be replaced since), part of the audio cache key"""
+    return MODEL_CACHE_TAG or compute_model_cache_tag(get_ckpt_file())
+
+
+def link_or_copy(src_path, dst_path):
+    """Hard link a cached file into OUTPUT_DIR (a copy across filesystems), so cache eviction keeps it"""
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copyfile(src_path, dst_path)
+
+
+def get_request_sampling_params(form):
+    """
+    Sampling settings of a request: preset (fast | balanced | quality) with optional
+    ode_method / nfe_step (1..128) overrides. Raises ValueError for unknown or out of range values.
+    """
+    return get_sampling_params(
+        preset=form.get("preset") or app.config.get('TTS_DEFAULT_PRESET', 'quality'),
+        nfe_step=form.get("nfe_step") or None,
+        ode_method=form.get("ode_method") or None,
+        cfg_strength=2.0,
+        sway_sampling_coef=-1.0
+    )
+
+
+def get_request_output_format(form):
+    """Output encoding of a request (output_format field, default OUTPUT_FORMAT), ValueError if unusable"""
+    output_format = form.get("output_format") or OUTPUT_FORMAT
+    if not is_format_available(output_format):
+        raise ValueError(f"Output format '{output_format}' is not supported on this server")
+    return output_format
+
+
 @torch.no_grad()
-def generate_audio(gen_text, ref_audio_path, ref_text, speed=1.0):
+def generate_audio(gen_text, ref_audio_path, ref_text, speed=1.0, sampling=None, return_spectrogram=False,
+                   progress_callback=None):
     """
     Generate audio exactly like CLI
+    sampling: dict from get_sampling_params (default: TTS_DEFAULT_PRESET)
+    progress_callback: per ODE step progress (see infer_batch_process), runs outside the batch scheduler
     """
     start_total = time.time()
+    if sampling is None:
+        sampling = get_sampling_params(app.config.get('TTS_DEFAULT_PRESET', 'quality'))
 
     try:
         # Load models if needed
@@ -467,38 +792,58 @@ def generate_audio(gen_text, ref_audio_path, ref_text, speed=1.0):
         print(f"  - ref_text ({len(ref_text)} chars): {ref_text[:100]}...")
         print(f"  - gen_text ({len(gen_text)} chars): {gen_text[:100]}...")
         print(f"  - speed: {speed}")
+        print(f"  - sampling: {sampling['nfe_step']} steps {sampling['ode_method']}")
         print(f"  - device: {DEVICE}")
 
-        # Preprocess audio and text exactly like CLI
+        # Preprocess audio and text exactly like CLI (cached per reference file content)
         print("[PREPROCESSING] Processing reference audio and text...")
-        processed_ref_audio, processed_ref_text = preprocess_ref_audio_text(
+        conditioning = CONDITIONING_CACHE.get(
             ref_audio_path,
             ref_text,
             clip_short=True,
-            show_info=print,
-            device=DEVICE
+            show_info=print
         )
 
         print(f"[INFO] Preprocessed:")
-        print(f"  - ref_audio: {processed_ref_audio}")
-        print(f"  - ref_text: {processed_ref_text[:100]}...")
-
-        # Generate with exact CLI parameters
-        audio_output, final_sample_rate, spectrogram = infer_process(
-            ref_audio=processed_ref_audio,
-            ref_text=processed_ref_text,
-            gen_text=gen_text,
-            model_obj=F5TTS_MODEL,
-            vocoder=VOCODER,
-            mel_spec_type="vocos",
-            speed=speed,
-            target_rms=0.1,
-            cross_fade_duration=0.15,
-            nfe_step=32,
-            cfg_strength=2.0,
-            sway_sampling_coef=-1.0,
-            device=DEVICE
-        )
+        print(f"  - ref_audio: {conditioning.audio.shape[-1] / TARGET_SAMPLE_RATE:.2f}s")
+        print(f"  - ref_text: {conditioning.ref_text[:100]}...")
+
+        if TTS_SCHEDULER is not None and progress_callback is None:
+            # Merge with concurrent requests into padded batches
+            gen_text_batches = split_gen_text(gen_text, conditioning.chars_per_sec)
+            job = TTS_SCHEDULER.submit(
+                conditioning,
+                conditioning.ref_text,
+                gen_text_batches,
+                target_rms=0.1,
+                cross_fade_duration=0.15,
+                nfe_step=sampling["nfe_step"],
+                cfg_strength=sampling["cfg_strength"],
+                sway_sampling_coef=sampling["sway_sampling_coef"],
+                speed=speed,
+                ode_method=sampling["ode_method"]
+            )
+            audio_output, final_sample_rate, spectrogram = job.result()
+        else:
+            # Generate with exact CLI parameters
+            audio_output, final_sample_rate, spectrogram = infer_process(
+                ref_audio=conditioning,
+                ref_text=conditioning.ref_text,
+                gen_text=gen_text,
+                model_obj=F5TTS_MODEL,
+                vocoder=VOCODER,
+                mel_spec_type="vocos",
+                speed=speed,
+                target_rms=0.1,
+                cross_fade_duration=0.15,
+                nfe_step=sampling["nfe_step"],
+                cfg_strength=sampling["cfg_strength"],
+                sway_sampling_coef=sampling["sway_sampling_coef"],
+                device=DEVICE,
+                max_frames_per_batch=app.config.get('TTS_MAX_FRAMES_PER_BATCH') or None,
+                ode_method=sampling["ode_method"],
+                progress_callback=progress_callback
+            )
 
         log_time(start_total, "Total generation time")
 
@@ -507,6 +852,9 @@ def generate_audio(gen_text, ref_audio_path, ref_text, speed=1.0):
         print(f"  - Sample rate: {final_sample_rate}")
         print(f"  - Duration: {len(audio_output) / final_sample_rate:.2f}s")
 
+        if return_spectrogram:
+            # log-mel [n_mels frames] the vocoder decoded, for /spectrogram/<audio_id>
+            return audio_output, final_sample_rate, spectrogram
         return audio_output, final_sample_rate
 
     except Exception as e:
@@ -515,8 +863,120 @@ def generate_audio(gen_text, ref_audio_path, ref_text, speed=1.0):
         raise
 
 
+@torch.no_grad()
+def generate_audio_segmented(gen_text, ref_audio_path, ref_text, speed=1.0, sampling=None):
+    """
+    generate_audio with a chunk-level cache (SEGMENT_CACHE): the text is chunked exactly like
+    infer_process, only chunks not yet synthesised with this voice and these settings are sampled,
+    and the result is cross-faded from the cached segments.
+    Returns (audio, sample_rate, segment_keys, num_synthesized).
+    """
+    if sampling is None:
+        sampling = get_sampling_params(app.config.get('TTS_DEFAULT_PRESET', 'quality'))
+    load_f5tts_model()
+
+    conditioning = CONDITIONING_CACHE.get(
+        ref_audio_path,
+        ref_text,
+        clip_short=True,
+        show_info=print
+    )
+    conditioning_key = CONDITIONING_CACHE.make_key(ref_audio_path, ref_text, clip_short=True)
+    gen_text_batches = split_gen_text(gen_text, conditioning.chars_per_sec)
+    model_tag = get_model_cache_tag()
+    segment_keys = [
+        SEGMENT_CACHE.make_key(chunk, conditioning_key, speed, sampling, model_tag=model_tag)
+        for chunk in gen_text_batches
+    ]
+
+    waves = []
+    for key in segment_keys:
+        cached = SEGMENT_CACHE.get_array(key)
+        waves.append(cached[0] if cached is not None else None)
+    missing = [i for i, wave in enumerate(waves) if wave is None]
+
+    if missing:
+        generated_waves, _, _ = next(infer_batch_process(
+            conditioning,
+            conditioning.ref_text,
+            [gen_text_batches[i] for i in missing],
+            F5TTS_MODEL,
+            VOCODER,
+            mel_spec_type="vocos",
+            progress=None,
+            target_rms=0.1,
+            cross_fade_duration=0.15,
+            nfe_step=sampling["nfe_step"],
+            cfg_strength=sampling["cfg_strength"],
+            sway_sampling_coef=sampling["sway_sampling_coef"],
+            speed=speed,
+            device=DEVICE,
+            max_frames_per_batch=app.config.get('TTS_MAX_FRAMES_PER_BATCH') or None,
+            ode_method=sampling["ode_method"],
+            return_segments=True
+        ))
+        for i, wave in zip(missing, generated_waves):
+            waves[i] = wave
+            SEGMENT_CACHE.put_array(segment_keys[i], wave, TARGET_SAMPLE_RATE)
+
+    print(f"[SEGMENTS] {len(waves) - len(missing)}/{len(waves)} chunks from cache, {len(missing)} synthesised")
+    audio = cross_fade_waves(waves, 0.15) if waves else np.zeros(0, dtype=np.float32)
+    return audio, TARGET_SAMPLE_RATE, segment_keys, len(missing)
+
+
+def generate_audio_stream(gen_text, ref_audio_path, ref_text, speed=1.0, chunk_size=4096, sampling=None):
+    """
+    Streaming variant of generate_audio: yields float32 audio slices of chunk_size samples
+    as soon as each text chunk is synthesised (cross-faded exactly like generate_audio)
+    """
+    load_f5tts_model()
+    if sampling is None:
+        sampling = get_sampling_params(app.config.get('TTS_DEFAULT_PRESET', 'quality'))
+
+    conditioning = CONDITIONING_CACHE.get(
+        ref_audio_path,
+        ref_text,
+        clip_short=True,
+        show_info=print
+    )
+    gen_text_batches = split_gen_text(gen_text, conditioning.chars_per_sec)
+
+    with torch.no_grad():
+        audio_stream = infer_batch_process(
+            conditioning,
+            conditioning.ref_text,
+            gen_text_batches,
+            F5TTS_MODEL,
+            VOCODER,
+            mel_spec_type="vocos",
+            progress=None,
+            target_rms=0.1,
+            cross_fade_duration=0.15,
+            nfe_step=sampling["nfe_step"],
+            cfg_strength=sampling["cfg_strength"],
+            sway_sampling_coef=sampling["sway_sampling_coef"],
+            speed=speed,
+            device=DEVICE,
+            streaming=True,
+            chunk_size=chunk_size,
+            ode_method=sampling["ode_method"]
+        )
+        for audio_chunk, _ in audio_stream:
+            yield np.asarray(audio_chunk, dtype=np.float32)
+
+
 def transcribe_audio(audio_path, max_attempts=3):
-    """Transcribe audio with retry"""
+    """Transcribe audio with retry, cached by decoded audio content in TRANSCRIPTION_CACHE"""
+    return TRANSCRIPTION_CACHE.get_or_transcribe(
+        audio_path,
+        WHISPER_ASR_MODEL,
+        "vi",
+        lambda: transcribe_audio_uncached(audio_path, max_attempts),
+        show_info=lambda msg: print(f"[INFO] {msg}")
+    )
+
+
+def transcribe_audio_uncached(audio_path, max_attempts=3):
     load_whisper_model()
 
     for attempt in range(1, max_attempts + 1):
@@ -549,6 +1009,170 @@ def home():
     return redirect(url_for('stories_page'))
 
 
+def resolve_reference(voice_sample, ref_text):
+    """
+    Resolve reference audio and text of a voice-cloning request.
+    Returns (audio_path, ref_text, uploaded, error_response); error_response is None on success.
+    """
+    audio_path = None
+    uploaded = ("audio" in request.files and request.files["audio"].filename != "")
+
+    if uploaded:
+        # Upload audio -> transcribe
+        file = request.files["audio"]
+        audio_path = os.path.join(OUTPUT_DIR, f"ref_{uuid.uuid4().hex}.wav")
+        file.save(audio_path)
+
+        print(f"[INFO] Transcribing uploaded audio...")
+        ref_text = transcribe_audio(audio_path)
+
+        if ref_text is None:
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+            return None, None, uploaded, (jsonify({"error": "Failed to transcribe audio"}), 500)
+
+    else:
+        # Use voice sample
+        if voice_sample == "male":
+            audio_path = os.path.join("static", "voices", "male.mp3")
+        elif voice_sample == "female":
+            audio_path = os.path.join("static", "voices", "female.mp3")
+
+        if not os.path.exists(audio_path):
+            audio_path_wav = audio_path.replace(".mp3", ".wav")
+            if os.path.exists(audio_path_wav):
+                audio_path = audio_path_wav
+            else:
+                return None, None, uploaded, (jsonify({"error": f"Voice sample not found: {voice_sample}"}), 404)
+
+        # Load ref_text
+        if not ref_text.strip():
+            text_ref_path = os.path.join("static", "voices", "text-ref.txt")
+            if os.path.exists(text_ref_path):
+                with open(text_ref_path, "r", encoding="utf-8") as f:
+                    ref_text = f.read().strip()
+            else:
+                ref_text = transcribe_audio(audio_path)
+
+    # Validate inputs
+    if not audio_path or not os.path.exists(audio_path):
+        return None, None, uploaded, (jsonify({"error": "Reference audio not found"}), 400)
+
+    if not ref_text or not ref_text.strip():
+        return None, None, uploaded, (jsonify({"error": "Reference text is empty"}), 400)
+
+    return audio_path, ref_text, uploaded, None
+
+
+def synthesize_and_record(gen_text, voice_sample, audio_path, ref_text, speed, sampling, preset=None,
+                          progress_callback=None, output_format=None):
+    """
+    Synthesise into OUTPUT_DIR (through AUDIO_CACHE) and add the history row, needs an app context.
+    Returns the /voice-cloning response fields, with the generated_audios audio_id.
+    """
+    output_format = output_format or OUTPUT_FORMAT
+    output_id = f"out_{uuid.uuid4().hex}"
+    output_filename = output_id + get_output_format(output_format)[0]
+    output_path = os.path.join(OUTPUT_DIR, output_filename)
+    spec_filename = f"{output_id}_spec.png"
+    mel_path = get_mel_path(output_path)
+
+    def generate():
+        # Generate audio
+        audio_data, sample_rate, mel = generate_audio(
+            gen_text=gen_text,
+            ref_audio_path=audio_path,
+            ref_text=ref_text,
+            speed=speed,
+            sampling=sampling,
+            return_spectrogram=True,
+            progress_callback=progress_callback
+        )
+
+        # Save output, the spectrogram image is rendered from the mel on first request
+        encode_file(output_path, audio_data, sample_rate, output_format)
+        if mel is not None:
+            np.save(mel_path, mel.astype(np.float16))
+        return output_path, {"mel": mel_path}
+
+    if AUDIO_CACHE is None:
+        generate()
+        cache_status = "disabled"
+    else:
+        cache_key = AUDIO_CACHE.make_key(
+            gen_text,
+            CONDITIONING_CACHE.make_key(audio_path, ref_text, clip_short=True),
+            speed,
+            sampling,
+            model_tag=get_model_cache_tag(),
+            output_format=output_format
+        )
+        entry, cache_status = AUDIO_CACHE.get_or_generate(cache_key, generate)
+        if cache_status != "miss":
+            try:
+                link_or_copy(entry.audio_path, output_path)
+                if "mel" in entry.extra_paths:
+                    link_or_copy(entry.extra_paths["mel"], mel_path)
+            except FileNotFoundError:
+                # evicted by another worker between the lookup and the link: a miss after all. Drop what
+                # was linked first, generate() must not write through a hard link into the cache
+                for path in (output_path, mel_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                entry = AUDIO_CACHE.put(cache_key, *generate())
+                cache_status = "miss"
+        print(f"[CACHE] Audio cache {cache_status}: {cache_key[:12]}")
+
+    # Calculate duration
+    audio_info = sf.info(output_path)
+    sample_rate = audio_info.samplerate
+    duration = audio_info.frames / sample_rate
+    file_size = os.path.getsize(output_path)
+    codec = get_output_format(output_format)[3].lower()
+
+    # Evaluate audio quality (WER/CER)
+    # eval_result = evaluate_audio_quality(output_path, gen_text, lang)
+
+    # Save to history
+    audio_id = save_audio_history(
+        text_input=gen_text,
+        voice_sample=voice_sample,
+        audio_path=f"/static/output/{output_filename}",
+        spectrogram_path=f"/static/output/{spec_filename}",
+        duration=duration,
+        codec=codec,
+        file_size=file_size
+    )
+
+    return {
+        "audio_id": audio_id,
+        "audio_url": f"/static/output/{output_filename}",
+        "output_format": output_format,
+        "mimetype": get_output_format(output_format)[1],
+        "codec": codec,
+        "file_size": file_size,
+        "spectrogram_url": f"/spectrogram/{audio_id}" if audio_id else None,
+        "sample_rate": sample_rate,
+        "duration": duration,
+        "duration_display": f"{duration:.2f}s",
+        "preset": preset or app.config.get('TTS_DEFAULT_PRESET', 'quality'),
+        "nfe_step": sampling["nfe_step"],
+        "ode_method": sampling["ode_method"],
+        # hit | coalesced (identical request in flight) | miss | disabled
+        "cache": cache_status,
+        "cache_hit": cache_status in ("hit", "coalesced"),
+        # Text statistics
+        "text_char_count": len(gen_text),
+        "text_word_count": len(gen_text.split()),
+        # Quality metrics (commented out)
+        # "wer": eval_result.get("wer"),
+        # "cer": eval_result.get("cer"),
+        # "wer_percent": eval_result.get("wer_percent", "N/A"),
+        # "cer_percent": eval_result.get("cer_percent", "N/A"),
+        # "transcribed_text": eval_result.get("transcribed_text", "")
+    }
+
+
 @app.route("/voice-cloning", methods=["GET", "POST"])
 def index():
     if request.method == "GET":
@@ -573,125 +1197,335 @@ def index():
         if not gen_text.strip():
             return jsonify({"error": "Text cannot be empty"}), 400
 
+        try:
+            sampling = get_request_sampling_params(request.form)
+            output_format = get_request_output_format(request.form)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         # Handle audio path and ref_text
-        audio_path = None
-        uploaded = ("audio" in request.files and request.files["audio"].filename != "")
+        audio_path, ref_text, uploaded, error = resolve_reference(voice_sample, ref_text)
+        if error:
+            return error
 
-        if uploaded:
-            # Upload audio -> transcribe
-            file = request.files["audio"]
-            audio_path = os.path.join(OUTPUT_DIR, f"ref_{uuid.uuid4().hex}.wav")
-            file.save(audio_path)
+        try:
+            result = synthesize_and_record(gen_text, voice_sample, audio_path, ref_text, speed, sampling,
+                                           preset=request.form.get("preset"), output_format=output_format)
+        finally:
+            # Cleanup
+            if uploaded and audio_path and os.path.exists(audio_path):
+                try:
+                    os.remove(audio_path)
+                except Exception as e:
+                    print(f"[WARN] Cleanup failed: {e}")
 
-            print(f"[INFO] Transcribing uploaded audio...")
-            ref_text = transcribe_audio(audio_path)
+        total_time = time.time() - request_start
+        print(f"[COMPLETE] Total time: {total_time:.3f}s")
+        print("=" * 60 + "\n")
 
-            if ref_text is None:
-                if os.path.exists(audio_path):
-                    os.remove(audio_path)
-                return jsonify({"error": "Failed to transcribe audio"}), 500
+        result.update({
+            "generation_time": f"{total_time:.2f}",
+            "generation_time_display": f"{total_time:.2f}s",
+        })
+        return jsonify(result)
 
-        else:
-            # Use voice sample
-            if voice_sample == "male":
-                audio_path = os.path.join("static", "voices", "male.mp3")
-            elif voice_sample == "female":
-                audio_path = os.path.join("static", "voices", "female.mp3")
-
-            if not os.path.exists(audio_path):
-                audio_path_wav = audio_path.replace(".mp3", ".wav")
-                if os.path.exists(audio_path_wav):
-                    audio_path = audio_path_wav
-                else:
-                    return jsonify({"error": f"Voice sample not found: {voice_sample}"}), 404
-
-            # Load ref_text
-            if not ref_text.strip():
-                text_ref_path = os.path.join("static", "voices", "text-ref.txt")
-                if os.path.exists(text_ref_path):
-                    with open(text_ref_path, "r", encoding="utf-8") as f:
-                        ref_text = f.read().strip()
-                else:
-                    ref_text = transcribe_audio(audio_path)
-
-        # Validate inputs
-        if not audio_path or not os.path.exists(audio_path):
-            return jsonify({"error": "Reference audio not found"}), 400
-
-        if not ref_text or not ref_text.strip():
-            return jsonify({"error": "Reference text is empty"}), 400
+    except Exception as e:
+        print("[EXCEPTION] Error:")
+        traceback.print_exc()
+        print("=" * 60 + "\n")
+        return jsonify({"error": str(e)}), 500
 
-        # Generate audio
-        audio_data, sample_rate = generate_audio(
-            gen_text=gen_text,
-            ref_audio_path=audio_path,
-            ref_text=ref_text,
-            speed=speed
-        )
 
-        # Save output
-        output_filename = f"out_{uuid.uuid4().hex}.wav"
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-        sf.write(output_path, audio_data, sample_rate)
+def wav_stream_header(sample_rate, num_channels=1, bits_per_sample=16):
+    """WAV header for a PCM stream of unknown length (sizes set to the maximum)"""
+    byte_rate = sample_rate * num_channels * bits_per_sample // 8
+    block_align = num_channels * bits_per_sample // 8
+    data_size = 0xFFFFFFFF - 36
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", data_size + 36, b"WAVE",
+        b"fmt ", 16, 1, num_channels, sample_rate, byte_rate, block_align, bits_per_sample,
+        b"data", data_size
+    )
+
 
-        # Cleanup
-        if uploaded and audio_path and os.path.exists(audio_path):
+def record_streamed_audio(encoded, output_filename, gen_text, voice_sample, cleanup_path=None):
+    """History row of a streamed response, its file was encoded while streaming (runs in background)"""
+    try:
+        if cleanup_path and os.path.exists(cleanup_path):
             try:
-                os.remove(audio_path)
+                os.remove(cleanup_path)
             except Exception as e:
                 print(f"[WARN] Cleanup failed: {e}")
 
-        # Create spectrogram
-        spec_filename = output_filename.replace(".wav", "_spec.png")
-        spec_path = os.path.join(OUTPUT_DIR, spec_filename)
-        save_spectrogram_from_audio(output_path, spec_path)
+        if encoded is None:
+            return
+
+        # rendered from the audio on first request of /spectrogram/<audio_id>
+        spec_filename = os.path.splitext(output_filename)[0] + "_spec.png"
+
+        with app.app_context():
+            save_audio_history(
+                text_input=gen_text,
+                voice_sample=voice_sample,
+                audio_path=f"/static/output/{output_filename}",
+                spectrogram_path=f"/static/output/{spec_filename}",
+                duration=encoded.duration,
+                codec=encoded.codec,
+                file_size=encoded.size
+            )
+        print(f"[STREAM] Saved streamed audio: {encoded.path} ({encoded.size / 1024:.0f} KiB {encoded.codec})")
+    except Exception as e:
+        print(f"[ERROR] Saving streamed audio failed: {e}")
+        traceback.print_exc()
 
-        # Calculate duration
-        duration = len(audio_data) / sample_rate
 
-        # Calculate text statistics
-        text_char_count = len(gen_text)
-        text_word_count = len(gen_text.split())
+@app.route("/voice-cloning/stream", methods=["POST"])
+def voice_cloning_stream():
+    """
+    Chunked response with the audio as it is synthesised: a WAV header followed by
+    16-bit PCM (format=wav, default), raw 16-bit little-endian PCM (format=pcm), or
+    Ogg/Opus (format=opus) and MP3 (format=mp3) encoded chunk by chunk.
+    The file (output_format) is encoded alongside, its history row is saved once streaming finishes.
+    """
+    request_start = time.time()
+    print("\n" + "=" * 60)
+    print(f"[REQUEST] New stream request at {time.strftime('%H:%M:%S')}")
 
-        # Evaluate audio quality (WER/CER)
-        # eval_result = evaluate_audio_quality(output_path, gen_text, lang)
+    try:
+        gen_text = request.form.get("text", "")
+        ref_text = request.form.get("ref_text", "")
+        speed = float(request.form.get("speed", "1.0"))
+        voice_sample = request.form.get("voice_sample", "male")
+        stream_format = request.form.get("format", "wav")
 
-        # Save to history
-        save_audio_history(
-            text_input=gen_text,
-            voice_sample=voice_sample,
-            audio_path=f"/static/output/{output_filename}",
-            spectrogram_path=f"/static/output/{spec_filename}",
-            duration=duration
-        )
+        if not gen_text.strip():
+            return jsonify({"error": "Text cannot be empty"}), 400
+        if stream_format not in ("wav", "pcm", "opus", "mp3"):
+            return jsonify({"error": f"Unsupported stream format: {stream_format}"}), 400
+        if stream_format in ("opus", "mp3") and not is_format_available(stream_format):
+            return jsonify({"error": f"Stream format '{stream_format}' is not supported on this server"}), 400
+        try:
+            sampling = get_request_sampling_params(request.form)
+            output_format = get_request_output_format(request.form)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        audio_path, ref_text, uploaded, error = resolve_reference(voice_sample, ref_text)
+        if error:
+            return error
+    except Exception as e:
+        print("[EXCEPTION] Error:")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
-        total_time = time.time() - request_start
-        print(f"[COMPLETE] Total time: {total_time:.3f}s")
-        print("=" * 60 + "\n")
+    output_filename = f"out_{uuid.uuid4().hex}" + get_output_format(output_format)[0]
+    chunk_size = app.config.get('TTS_STREAM_CHUNK_SIZE', 4096)
+
+    def generate():
+        encoder = StreamingEncoder(os.path.join(OUTPUT_DIR, output_filename), TARGET_SAMPLE_RATE, output_format)
+        encoded = None
+        first_chunk_time = None
+        try:
+            def audio_chunks():
+                nonlocal first_chunk_time
+                for audio_chunk in generate_audio_stream(gen_text, audio_path, ref_text, speed, chunk_size, sampling):
+                    if first_chunk_time is None:
+                        first_chunk_time = time.time() - request_start
+                        print(f"[STREAM] Time to first audio chunk: {first_chunk_time:.3f}s")
+                    encoder.write(audio_chunk)
+                    yield audio_chunk
+
+            if stream_format in ("opus", "mp3"):
+                yield from iter_encoded(audio_chunks(), TARGET_SAMPLE_RATE, stream_format)
+            else:
+                if stream_format == "wav":
+                    yield wav_stream_header(TARGET_SAMPLE_RATE)
+                for audio_chunk in audio_chunks():
+                    yield (np.clip(audio_chunk, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+            encoded = encoder.close()
+            total_time = time.time() - request_start
+            print(f"[COMPLETE] Stream finished: {encoded.duration:.2f}s of audio in {total_time:.3f}s")
+        except Exception as e:
+            print(f"[ERROR] Streaming failed: {e}")
+            traceback.print_exc()
+        finally:
+            if encoded is None:
+                # client disconnected or synthesis failed, do not keep a truncated file
+                print(f"[WARN] Stream aborted, discarding {encoder.frames / TARGET_SAMPLE_RATE:.2f}s of audio")
+                encoder.abort()
+            threading.Thread(
+                target=record_streamed_audio,
+                args=(encoded, output_filename, gen_text, voice_sample, audio_path if uploaded else None),
+                daemon=True
+            ).start()
+            print("=" * 60 + "\n")
+
+    if stream_format == "wav":
+        mimetype = "audio/wav"
+    elif stream_format == "pcm":
+        mimetype = f"audio/L16;rate={TARGET_SAMPLE_RATE};channels=1"
+    else:
+        mimetype = get_output_format(stream_format)[1]
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={
+            "X-Audio-Url": f"/static/output/{output_filename}",
+            "X-Sample-Rate": str(TARGET_SAMPLE_RATE),
+            "Cache-Control": "no-cache"
+        }
+    )
 
-        return jsonify({
-            "audio_url": f"/static/output/{output_filename}",
-            "spectrogram_url": f"/static/output/{spec_filename}",
-            "generation_time": f"{total_time:.2f}",
-            "generation_time_display": f"{total_time:.2f}s",
-            "sample_rate": sample_rate,
-            "duration": duration,
-            "duration_display": f"{duration:.2f}s",
-            # Text statistics
-            "text_char_count": text_char_count,
-            "text_word_count": text_word_count,
-            # Quality metrics (commented out)
-            # "wer": eval_result.get("wer"),
-            # "cer": eval_result.get("cer"),
-            # "wer_percent": eval_result.get("wer_percent", "N/A"),
-            # "cer_percent": eval_result.get("cer_percent", "N/A"),
-            # "transcribed_text": eval_result.get("transcribed_text", "")
-        })
 
+@app.route("/api/tts/jobs", methods=["POST"])
+def create_tts_job():
+    """
+    Queue a voice-cloning request (same form fields as /voice-cloning) and return at once.
+    Progress: GET /api/tts/jobs/<job_id> or the Server-Sent Events of /api/tts/jobs/<job_id>/events.
+    """
+    try:
+        gen_text = request.form.get("text", "")
+        ref_text = request.form.get("ref_text", "")
+        speed = float(request.form.get("speed", "1.0"))
+        voice_sample = request.form.get("voice_sample", "male")
+
+        if not gen_text.strip():
+            return jsonify({"error": "Text cannot be empty"}), 400
+        try:
+            get_request_sampling_params(request.form)
+            output_format = get_request_output_format(request.form)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        uploaded = ("audio" in request.files and request.files["audio"].filename != "")
+        if uploaded:
+            # transcribed by the worker, not on the request path
+            audio_path = os.path.join(OUTPUT_DIR, f"jobref_{uuid.uuid4().hex}.wav")
+            request.files["audio"].save(audio_path)
+        else:
+            audio_path, ref_text, _, error = resolve_reference(voice_sample, ref_text)
+            if error:
+                return error
+
+        job_id = create_job(get_db(), {
+            "text": gen_text,
+            "ref_text": ref_text,
+            "ref_audio_path": audio_path,
+            "uploaded": uploaded,
+            "voice_sample": voice_sample,
+            "speed": speed,
+            "preset": request.form.get("preset") or None,
+            "nfe_step": request.form.get("nfe_step") or None,
+            "ode_method": request.form.get("ode_method") or None,
+            "output_format": output_format
+        }, user_id=session.get('user_id'))
+        if TTS_JOB_WORKER is not None:
+            TTS_JOB_WORKER.notify()
+        print(f"[JOBS] Queued job {job_id}")
+
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/tts/jobs/{job_id}",
+            "events_url": f"/api/tts/jobs/{job_id}/events"
+        }), 202
     except Exception as e:
         print("[EXCEPTION] Error:")
         traceback.print_exc()
-        print("=" * 60 + "\n")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/tts/jobs/<job_id>", methods=["GET"])
+def get_tts_job(job_id):
+    """Status, progress (chunk, ODE step, ETA) and, once done, the result of a job"""
+    try:
+        job = get_job(get_db(), job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify({"status": "ok", "job": job})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/tts/jobs/<job_id>", methods=["DELETE"])
+def cancel_tts_job(job_id):
+    """Cancel a queued or running job"""
+    try:
+        db = get_db()
+        job = db.execute('SELECT status, params FROM tts_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        if not cancel_job(db, job_id):
+            return jsonify({"error": f"Job already {job['status']}"}), 409
+        if job['status'] == 'queued':
+            # a running job is cleaned up by its worker
+            cleanup_tts_job(json.loads(job['params']))
+        return jsonify({"status": "ok", "message": f"Cancelled job {job_id}"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/tts/jobs/<job_id>/events")
+def tts_job_events(job_id):
+    """
+    Server-Sent Events: `progress` on every change, then `done`, `failed` or `cancelled`.
+    The stream holds a request thread until the job ends, so it needs a threaded or async gunicorn
+    worker (render.yaml runs gthread); behind a sync worker poll GET /api/tts/jobs/<job_id> instead.
+    """
+    return Response(
+        stream_with_context(iter_job_events(app.config['DATABASE'], job_id)),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx would otherwise buffer the events
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+def get_mel_path(audio_path):
+    """Generated log-mel (float16 .npy) stored next to its out_*.wav"""
+    return os.path.splitext(audio_path)[0] + "_mel.npy"
+
+
+def save_spectrogram_from_mel(mel, output_path):
+    """Colormap the log-mel straight into a PNG (no pyplot figure), low frequencies at the bottom"""
+    mel = np.asarray(mel, dtype=np.float32)
+    vmax = float(mel.max())
+    matplotlib.image.imsave(output_path, mel, cmap="magma", origin="lower", vmin=max(float(mel.min()), vmax - 12.0), vmax=vmax)
+
+
+@app.route("/spectrogram/<int:audio_id>")
+def spectrogram(audio_id):
+    """Spectrogram PNG of a generated audio, rendered on first access and cached next to it"""
+    try:
+        db = get_db()
+        row = db.execute(
+            'SELECT audio_path, spectrogram_path FROM generated_audios WHERE audio_id = ?', (audio_id,)
+        ).fetchone()
+        if row is None or not row['audio_path']:
+            return jsonify({"error": "Audio not found"}), 404
+
+        audio_path = row['audio_path'].lstrip('/').replace('/', os.sep)
+        spec_path = (row['spectrogram_path'] or os.path.splitext(row['audio_path'])[0] + "_spec.png")
+        spec_path = spec_path.lstrip('/').replace('/', os.sep)
+
+        if not os.path.exists(spec_path):
+            mel_path = get_mel_path(audio_path)
+            if os.path.exists(mel_path):
+                save_spectrogram_from_mel(np.load(mel_path), spec_path)
+            elif os.path.exists(audio_path):
+                # streamed or older audio without a stored mel
+                save_spectrogram_from_audio(audio_path, spec_path)
+            if not os.path.exists(spec_path):
+                return jsonify({"error": "Spectrogram not available"}), 404
+
+        return send_file(os.path.abspath(spec_path), mimetype="image/png", max_age=86400)
+    except Exception as e:
+        print(f"[ERROR] Spectrogram failed: {e}")
         return jsonify({"error": str(e)}), 500
 
 
@@ -726,6 +1560,18 @@ def health():
     })
 
 
+@app.route("/ready")
+def ready():
+    """
+    Readiness for load balancers, separate from /health: with TTS_PRELOAD, 503 until models are
+    loaded and warmed up (and after /models/unload). Without preload, models load on first request.
+    """
+    if not app.config.get('TTS_PRELOAD'):
+        return jsonify({"ready": True, "preload": PRELOAD_STATE})
+    is_ready = MODELS_READY.is_set() and F5TTS_MODEL is not None and VOCODER is not None
+    return jsonify({"ready": is_ready, "preload": PRELOAD_STATE}), 200 if is_ready else 503
+
+
 # ==========================================
 # API ROUTES - VOICE SAMPLES
 # ==========================================
@@ -810,6 +1656,12 @@ def models_status():
         "f5tts_loaded": F5TTS_MODEL is not None,
         "vocoder_loaded": VOCODER is not None,
         "whisper_loaded": WHISPER_MODEL is not None,
+        "conditioning_cache": CONDITIONING_CACHE.stats(),
+        "transcription_cache": TRANSCRIPTION_CACHE.stats(),
+        "audio_cache": AUDIO_CACHE.stats() if AUDIO_CACHE is not None else {"enabled": False},
+        "segment_cache": SEGMENT_CACHE.stats(),
+        "tts_jobs": get_job_counts(get_db()),
+        "compiled_inference": COMPILED_INFERENCE.stats() if COMPILED_INFERENCE is not None else {"compiled": False},
         "device": DEVICE,
         "model_name": MODEL_NAME,
         "vocab_file": VOCAB_FILE,
@@ -817,10 +1669,22 @@ def models_status():
     })
 
 
+@app.route("/scheduler/stats")
+def scheduler_stats():
+    """Queue depth, batch fill ratio and wait times of the cross-request batch scheduler"""
+    if TTS_SCHEDULER is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **TTS_SCHEDULER.stats()})
+
+
 @app.route("/models/unload", methods=["POST"])
 def unload_models_endpoint():
     try:
         unload_models()
+        if app.config.get('TTS_PRELOAD'):
+            # /ready gates traffic on warm models here: load and warm up again, 503 meanwhile
+            start_preload()
+            return jsonify({"status": "ok", "message": "Models unloaded, reloading in the background"})
         return jsonify({"status": "ok", "message": "Models unloaded"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -872,7 +1736,8 @@ def cleanup_old_files():
         import glob
         cutoff_time = time.time() - 3600
         deleted_count = 0
-        for pattern in ["out_*.wav", "ref_*.wav", "out_*_spec.png", "debug_*.wav"]:
+        for pattern in ["out_*.wav", "out_*.ogg", "out_*.mp3", "ref_*.wav", "out_*_spec.png", "out_*_mel.npy",
+                        "debug_*.wav"]:
             for filepath in glob.glob(os.path.join(OUTPUT_DIR, pattern)):
                 if os.path.getmtime(filepath) < cutoff_time:
                     os.remove(filepath)
@@ -888,6 +1753,8 @@ def api_get_history():
     try:
         limit = request.args.get('limit', 20, type=int)
         history = get_audio_history(limit)
+        for item in history:
+            item["spectrogram_url"] = url_for('spectrogram', audio_id=item["audio_id"])
         return jsonify({"status": "ok", "history": history})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -906,6 +1773,15 @@ def api_delete_history(audio_id):
         return jsonify({"error": str(e)}), 500
 
 
+if __name__ != "__main__":
+    # gunicorn app:app (without --preload): every worker loads and warms up its own models
+    with app.app_context():
+        migrate_history_table(get_db())
+    start_preload()
+    start_story_renderer()
+    start_tts_job_worker()
+
+
 if __name__ == "__main__":
     print("\n" + "=" * 60)
     print("F5-TTS Flask Server")
@@ -917,7 +1793,16 @@ if __name__ == "__main__":
     # Initialize database
     init_db()
     
-    print("[INFO] Models will load on first request")
+    if app.config.get('TTS_PRELOAD'):
+        print("[INFO] Preloading models in the background, /ready returns 503 until warm")
+        # the debug reloader imports this file in a watcher process too, preload only in the serving child
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            start_preload()
+    else:
+        print("[INFO] Models will load on first request")
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_story_renderer()
+        start_tts_job_worker()
     print("\n[SERVER] http://0.0.0.0:5000")
     print("=" * 60 + "\n")
     app.run(host="0.0.0.0", port=5000, debug=True, threaded=True)
@@ -37,6 +37,77 @@ class Config:
     # Audio Settings
     OUTPUT_DIR = 'static/output'
     VOICE_DIR = 'static/voices'
+    # Frame budget for batching text chunks in one CFM.sample call (0 = one chunk at a time)
+    TTS_MAX_FRAMES_PER_BATCH = int(os.environ.get('TTS_MAX_FRAMES_PER_BATCH') or 0)
+    # Cross-request batching: collect jobs for this many ms before sampling (0 = disabled)
+    TTS_BATCH_WINDOW_MS = int(os.environ.get('TTS_BATCH_WINDOW_MS') or 0)
+    TTS_SCHEDULER_MAX_FRAMES = int(os.environ.get('TTS_SCHEDULER_MAX_FRAMES') or 8192)
+    # Preprocessed reference voices (in-memory LRU size, on-disk store)
+    CONDITIONING_CACHE_DIR = os.environ.get('CONDITIONING_CACHE_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'cache', 'conditioning')
+    CONDITIONING_CACHE_SIZE = int(os.environ.get('CONDITIONING_CACHE_SIZE') or 16)
+    # Synthesised audio by normalised text, voice, speed and sampling settings, LRU-evicted above the size limit
+    TTS_AUDIO_CACHE = os.environ.get('TTS_AUDIO_CACHE', '1').lower() in ('1', 'true', 'yes')
+    AUDIO_CACHE_DIR = os.environ.get('AUDIO_CACHE_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'cache', 'audio')
+    AUDIO_CACHE_MAX_MB = int(os.environ.get('AUDIO_CACHE_MAX_MB') or 2048)
+    # Background narration of every active story x voice (admin create/update, render_stories.py)
+    STORY_RENDER_CONCURRENCY = int(os.environ.get('STORY_RENDER_CONCURRENCY') or 1)  # 0 = no renderer here
+    STORY_RENDER_PRESET = os.environ.get('STORY_RENDER_PRESET') or 'quality'
+    STORY_RENDER_LEASE_SECONDS = int(os.environ.get('STORY_RENDER_LEASE_SECONDS') or 600)
+    # Encoding of generated audio files, a request may ask for another with output_format:
+    # wav (float) | pcm16 | opus (Ogg, ~29 kbps) | mp3 (~64 kbps), see src/f5_tts/infer/audio_encoding.py
+    OUTPUT_FORMAT = os.environ.get('OUTPUT_FORMAT') or 'mp3'
+    # Asynchronous synthesis jobs (/api/tts/jobs), concurrency across all processes sharing the database
+    TTS_JOB_CONCURRENCY = int(os.environ.get('TTS_JOB_CONCURRENCY') or 1)  # 0 = no job worker here
+    TTS_JOB_LEASE_SECONDS = int(os.environ.get('TTS_JOB_LEASE_SECONDS') or 300)
+    # Cached text chunks of narrations (float WAV), an edit re-synthesises only the chunks it changed
+    SEGMENT_CACHE_DIR = os.environ.get('SEGMENT_CACHE_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'cache', 'segments')
+    SEGMENT_CACHE_MAX_MB = int(os.environ.get('SEGMENT_CACHE_MAX_MB') or 4096)
+    # Reference transcriptions (SQLite sidecar of app.db, shared by all workers)
+    TRANSCRIPTION_CACHE_DB = os.environ.get('TRANSCRIPTION_CACHE_DB') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'transcriptions.db')
+    # Sampling preset used when a request does not choose one: fast | balanced | quality
+    TTS_DEFAULT_PRESET = os.environ.get('TTS_DEFAULT_PRESET') or 'quality'
+    # torch.compile of the transformer blocks and vocoder, with sequence lengths rounded up to buckets (frames)
+    TTS_COMPILE = os.environ.get('TTS_COMPILE', '0').lower() in ('1', 'true', 'yes')
+    TTS_COMPILE_BUCKETS = [int(b) for b in (os.environ.get('TTS_COMPILE_BUCKETS') or '').split(',') if b.strip()]
+    TTS_COMPILE_WARMUP = os.environ.get('TTS_COMPILE_WARMUP', '1').lower() in ('1', 'true', 'yes')
+    # Dynamic int8 model and vocoder for CPU serving, pre-quantized weights are created on first start
+    TTS_QUANTIZE = os.environ.get('TTS_QUANTIZE', '0').lower() in ('1', 'true', 'yes')
+    QUANTIZED_CKPT_FILE = os.environ.get('QUANTIZED_CKPT_FILE') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'ckpts', 'quantized', 'model_int8.pt')
+    QUANTIZED_VOCODER_FILE = os.environ.get('QUANTIZED_VOCODER_FILE') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'ckpts', 'quantized', 'vocos_int8.pt')
+    # Model dtype: fp32 | fp16 | bf16, empty = fp16 on CUDA, else fp32 (bf16 for CPUs with native bf16 matmul)
+    TTS_DTYPE = os.environ.get('TTS_DTYPE') or None
+    # EMA-only serving checkpoint, used instead of the training checkpoint when it exists and was converted from it
+    # (python src/f5_tts/infer/serving_checkpoint.py -c <model_last.pt> -o <this file> --vocoder_dir <VOCODER_LOCAL_PATH>)
+    SERVING_CKPT_FILE = os.environ.get('SERVING_CKPT_FILE') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'ckpts', 'your_training_dataset', 'model_serving.safetensors')
+    # Local Vocos directory (config.yaml + pytorch_model.bin), the Hugging Face hub is used if it does not exist
+    VOCODER_LOCAL_PATH = os.environ.get('VOCODER_LOCAL_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'ckpts', 'vocos-mel-24khz')
+    # Inference backend: torch | onnx (exported DiT + Vocos on onnxruntime, see src/f5_tts/infer/onnx_export.py)
+    TTS_BACKEND = os.environ.get('TTS_BACKEND') or 'torch'
+    ONNX_DIT_FILE = os.environ.get('ONNX_DIT_FILE') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'ckpts', 'onnx', 'dit.onnx')
+    ONNX_VOCODER_FILE = os.environ.get('ONNX_VOCODER_FILE') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'ckpts', 'onnx', 'vocos.onnx')
+    ONNX_NUM_THREADS = int(os.environ.get('ONNX_NUM_THREADS') or 0)
+    # Load F5-TTS, Vocos and Whisper at boot and warm up with one synthesis; /ready is 503 until done
+    TTS_PRELOAD = os.environ.get('TTS_PRELOAD', '0').lower() in ('1', 'true', 'yes')
+    TTS_WARMUP = os.environ.get('TTS_WARMUP', '1').lower() in ('1', 'true', 'yes')
+    # A failed preload is retried after this many seconds, doubling up to the maximum
+    TTS_PRELOAD_RETRY_SECONDS = int(os.environ.get('TTS_PRELOAD_RETRY_SECONDS') or 5)
+    TTS_PRELOAD_RETRY_MAX_SECONDS = int(os.environ.get('TTS_PRELOAD_RETRY_MAX_SECONDS') or 300)
+    TTS_WARMUP_REF_AUDIO = os.environ.get('TTS_WARMUP_REF_AUDIO') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'static', 'voices', 'male.mp3')
+    TTS_WARMUP_REF_TEXT = os.environ.get('TTS_WARMUP_REF_TEXT') or ''  # default: text-ref.txt next to the audio
+    TTS_WARMUP_TEXT = os.environ.get('TTS_WARMUP_TEXT') or 'Xin chào, đây là câu khởi động mô hình.'
+    # Samples per HTTP chunk of /voice-cloning/stream
+    TTS_STREAM_CHUNK_SIZE = int(os.environ.get('TTS_STREAM_CHUNK_SIZE') or 4096)
     
     # Pagination
     STORIES_PER_PAGE = 12
@@ -66,6 +137,9 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DATABASE = ':memory:'
+    TRANSCRIPTION_CACHE_DB = ':memory:'
+    STORY_RENDER_CONCURRENCY = 0
+    TTS_JOB_CONCURRENCY = 0
 
 
 # Config dictionary
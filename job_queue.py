@@ -0,0 +1,166 @@
+"""
+Leased Job Queue for Story Telling App
+Background workers over a SQLite job table, shared by the story renderer (story_render.py) and
+the asynchronous synthesis jobs (tts_jobs.py).
+
+A worker claims a queued job with one atomic UPDATE and keeps a lease on it by heartbeating;
+running jobs whose heartbeat stops (crashed or restarted process) are re-queued, or failed after
+max_attempts. The concurrency limit holds across all processes sharing the database.
+"""
+
+import sqlite3
+import threading
+import uuid
+
+
+def connect(database):
+    """Own connection for worker threads, the CLI and event streams (request handlers use flask g)"""
+    db = sqlite3.connect(database, timeout=30)
+    db.row_factory = sqlite3.Row
+    return db
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class LeasedJobWorker:
+    """
+    Background threads that claim queued jobs of `table` and run(db, job) them. The table has the
+    job_id, status (queued | running | done | failed | cancelled), progress, attempts, error, worker,
+    started_at, heartbeat_at and finished_at columns; jobs are claimed in insertion order.
+    run() marks the job done itself; JobCancelled or another exception from it cancels, re-queues or
+    fails the job. job_finished(job) runs once a job is finished for good without run() completing it.
+    At most `concurrency` jobs run at once across every process using the database.
+    """
+
+    table = None
+    name = 'Job worker'
+    thread_name = 'job'
+    log_tag = 'JOBS'
+    claimed_progress = None  # progress a claimed job restarts from, None keeps the last one
+
+    def __init__(self, database, concurrency=1, poll_interval=1.0, lease_seconds=600, max_attempts=2):
+        self.database = database
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f'{self.thread_name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[{self.log_tag}] {self.name} started ({self.concurrency} threads)")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def notify(self):
+        """A job was queued in this process, claim it now instead of at the next poll"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+            except Exception as e:
+                print(f"[{self.log_tag} ERROR] {e}")
+                self._stop.wait(self.poll_interval)
+
+    def run_until_empty(self):
+        """Run queued jobs in this thread until none are left (bulk CLI)"""
+        count = 0
+        while self.run_once():
+            count += 1
+        return count
+
+    def recover_stale_jobs(self, db):
+        """Jobs of a crashed or restarted worker stop heartbeating: retry them, or fail them after max_attempts"""
+        stale = f'-{int(self.lease_seconds)} seconds'
+        lost = db.execute(f'''
+            SELECT * FROM {self.table} WHERE status = 'running' AND heartbeat_at < datetime('now', ?) AND attempts >= ?
+        ''', (stale, self.max_attempts)).fetchall()
+        db.execute(f'''
+            UPDATE {self.table} SET status = 'failed', error = 'worker lost too many times',
+                finished_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND heartbeat_at < datetime('now', ?) AND attempts >= ?
+        ''', (stale, self.max_attempts))
+        db.execute(f'''
+            UPDATE {self.table} SET status = 'queued', worker = NULL
+            WHERE status = 'running' AND heartbeat_at < datetime('now', ?)
+        ''', (stale,))
+        db.commit()
+        for job in lost:
+            self.job_finished(job)
+
+    def claim(self, db):
+        """Atomically take the oldest queued job if fewer than `concurrency` jobs are running"""
+        token = uuid.uuid4().hex
+        db.execute(f'''
+            UPDATE {self.table} SET status = 'running', worker = ?, attempts = attempts + 1,
+                progress = COALESCE(?, progress), error = NULL,
+                started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+            WHERE job_id = (SELECT job_id FROM {self.table} WHERE status = 'queued' ORDER BY rowid LIMIT 1)
+              AND (SELECT COUNT(*) FROM {self.table} WHERE status = 'running') < ?
+        ''', (token, self.claimed_progress, self.concurrency))
+        db.commit()
+        return db.execute(f"SELECT * FROM {self.table} WHERE worker = ? AND status = 'running'", (token,)).fetchone()
+
+    def run_once(self):
+        """Claim and run one job; False when there was nothing to claim"""
+        db = connect(self.database)
+        try:
+            self.recover_stale_jobs(db)
+            job = self.claim(db)
+            if job is None:
+                return False
+
+            try:
+                self.run(db, job)
+            except JobCancelled:
+                print(f"[{self.log_tag}] Job {job['job_id']} cancelled")
+                self.job_finished(job)
+            except Exception as e:
+                print(f"[{self.log_tag} ERROR] Job {job['job_id']} failed: {e}")
+                self.fail(db, job, e)
+            return True
+        finally:
+            db.close()
+
+    def fail(self, db, job, error):
+        """Re-queue a job whose run raised, or fail it for good after max_attempts"""
+        status = 'failed' if job['attempts'] >= self.max_attempts else 'queued'
+        db.execute(f'''
+            UPDATE {self.table} SET status = ?, error = ?, worker = NULL,
+                finished_at = CASE WHEN ? = 'failed' THEN CURRENT_TIMESTAMP END
+            WHERE job_id = ? AND status = 'running'
+        ''', (status, str(error), status, job['job_id']))
+        db.commit()
+        if status == 'failed':
+            self.job_finished(job)
+
+    def heartbeat(self, db, job, progress):
+        """Record progress and renew the lease; raises JobCancelled if the job was cancelled meanwhile"""
+        cursor = db.execute(f'''
+            UPDATE {self.table} SET progress = ?, heartbeat_at = CURRENT_TIMESTAMP WHERE job_id = ? AND status = 'running'
+        ''', (progress, job['job_id']))
+        db.commit()
+        if cursor.rowcount == 0:
+            raise JobCancelled()
+
+    def run(self, db, job):
+        raise NotImplementedError
+
+    def job_finished(self, job):
+        """Hook: the job is cancelled, failed or lost for good"""
@@ -0,0 +1,71 @@
+"""
+Bulk narration pre-rendering of the story catalogue.
+
+Queues a render job for every active story x active voice whose narration is missing or stale
+(see story_render.py). The web app's background renderer picks them up; with --run they are
+rendered in this process instead (models are loaded here).
+
+    python render_stories.py                  # queue the whole catalogue
+    python render_stories.py --story-id 3 --force
+    python render_stories.py --run --concurrency 2
+"""
+
+import argparse
+import os
+import threading
+
+from story_render import StoryRenderer, connect, enqueue_all_stories, enqueue_story, get_render_status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render story narrations")
+    parser.add_argument("--story-id", type=int, default=None, help="only this story")
+    parser.add_argument("--force", action="store_true", help="re-render existing narrations too")
+    parser.add_argument("--run", action="store_true", help="render the queue in this process until it is empty")
+    parser.add_argument("--concurrency", type=int, default=None, help="with --run, default STORY_RENDER_CONCURRENCY")
+    args = parser.parse_args()
+
+    concurrency = args.concurrency or int(os.environ.get("STORY_RENDER_CONCURRENCY") or 1)
+    # importing the app must not start its background story renderer or /api/tts/jobs worker here
+    os.environ["STORY_RENDER_CONCURRENCY"] = "0"
+    os.environ["TTS_JOB_CONCURRENCY"] = "0"
+    from config import get_config
+
+    database = get_config().DATABASE
+    db = connect(database)
+    try:
+        if args.story_id is not None:
+            queued = enqueue_story(db, args.story_id, force=args.force)
+        else:
+            queued = enqueue_all_stories(db, force=args.force)
+        print(f"[RENDER] Queued {queued} job(s)")
+    finally:
+        db.close()
+
+    if args.run:
+        import app
+
+        renderer = StoryRenderer(
+            database,
+            app.render_story_paragraph,
+            output_dir=os.path.join(app.OUTPUT_DIR, "stories"),
+            url_prefix="/static/output/stories",
+            concurrency=concurrency,
+            lease_seconds=get_config().STORY_RENDER_LEASE_SECONDS,
+            output_format=app.OUTPUT_FORMAT
+        )
+        threads = [threading.Thread(target=renderer.run_until_empty) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    db = connect(database)
+    try:
+        print(f"[RENDER] Status: {get_render_status(db)['counts']}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
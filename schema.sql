@@ -175,10 +175,74 @@ CREATE TABLE IF NOT EXISTS generated_audios (
     audio_path TEXT NOT NULL,
     spectrogram_path TEXT,
     duration REAL,
+    codec TEXT,  -- float | pcm_16 | opus | mpeg_layer_iii
+    file_size INTEGER,  -- bytes
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE SET NULL
 );
 
+-- =============================================
+-- STORY PRE-RENDERING (story_render.py)
+-- =============================================
+
+-- Hàng đợi dựng bản kể: mỗi truyện x giọng đọc x nội dung
+CREATE TABLE IF NOT EXISTS story_render_jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    story_id INTEGER NOT NULL,
+    voice_id INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued | running | done | failed | cancelled
+    progress REAL DEFAULT 0,
+    attempts INTEGER DEFAULT 0,
+    error TEXT,
+    worker TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME,
+    heartbeat_at DATETIME,
+    finished_at DATETIME,
+    UNIQUE (story_id, voice_id, content_hash),
+    FOREIGN KEY (story_id) REFERENCES stories(story_id) ON DELETE CASCADE,
+    FOREIGN KEY (voice_id) REFERENCES voice_samples(sample_id) ON DELETE CASCADE
+);
+
+-- Bản kể đã dựng của truyện theo giọng đọc
+CREATE TABLE IF NOT EXISTS story_audio (
+    story_id INTEGER NOT NULL,
+    voice_id INTEGER NOT NULL,
+    audio_path TEXT NOT NULL,
+    duration REAL,
+    content_hash TEXT NOT NULL,
+    job_id INTEGER,
+    segments TEXT,  -- JSON list of segment cache keys in narration order
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (story_id, voice_id),
+    FOREIGN KEY (story_id) REFERENCES stories(story_id) ON DELETE CASCADE,
+    FOREIGN KEY (voice_id) REFERENCES voice_samples(sample_id) ON DELETE CASCADE
+);
+
+-- =============================================
+-- ASYNCHRONOUS SYNTHESIS JOBS (tts_jobs.py)
+-- =============================================
+
+-- Hàng đợi tổng hợp giọng nói: /api/tts/jobs
+CREATE TABLE IF NOT EXISTS tts_jobs (
+    job_id TEXT PRIMARY KEY,
+    user_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued | running | done | failed | cancelled
+    params TEXT NOT NULL,  -- JSON request: text, reference audio and text, speed, sampling
+    progress TEXT,  -- JSON {stage, chunk, chunks, step, steps, progress, eta}
+    result TEXT,  -- JSON response, as returned by /voice-cloning
+    audio_id INTEGER,
+    attempts INTEGER DEFAULT 0,
+    error TEXT,
+    worker TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME,
+    heartbeat_at DATETIME,
+    finished_at DATETIME,
+    FOREIGN KEY (audio_id) REFERENCES generated_audios(audio_id) ON DELETE SET NULL
+);
+
 -- =============================================
 -- INDEXES FOR PERFORMANCE
 -- =============================================
@@ -192,6 +256,8 @@ CREATE INDEX IF NOT EXISTS idx_history_user ON listening_history(user_id);
 CREATE INDEX IF NOT EXISTS idx_history_story ON listening_history(story_id);
 CREATE INDEX IF NOT EXISTS idx_favorites_user ON user_favorites(user_id);
 CREATE INDEX IF NOT EXISTS idx_favorites_story ON user_favorites(story_id);
+CREATE INDEX IF NOT EXISTS idx_render_jobs_status ON story_render_jobs(status);
+CREATE INDEX IF NOT EXISTS idx_tts_jobs_status ON tts_jobs(status);
 
 -- =============================================
 -- SAMPLE DATA
@@ -8,6 +8,7 @@ from cached_path import cached_path
 from omegaconf import OmegaConf
 
 from f5_tts.infer.utils_infer import (
+    get_sampling_params,
     load_model,
     load_vocoder,
     transcribe,
@@ -31,6 +32,7 @@ class F5TTS:
         vocoder_local_path=None,
         device=None,
         hf_cache_dir=None,
+        dtype=None,
     ):
         model_cfg = OmegaConf.load(str(files("f5_tts").joinpath(f"configs/{model}.yaml")))
         model_cls = globals()[model_cfg.model.backbone]
@@ -82,7 +84,15 @@ class F5TTS:
                 cached_path(f"hf://SWivid/{repo_name}/{model}/model_{ckpt_step}.{ckpt_type}", cache_dir=hf_cache_dir)
             )
         self.ema_model = load_model(
-            model_cls, model_arc, ckpt_file, self.mel_spec_type, vocab_file, self.ode_method, self.use_ema, self.device
+            model_cls,
+            model_arc,
+            ckpt_file,
+            self.mel_spec_type,
+            vocab_file,
+            self.ode_method,
+            self.use_ema,
+            self.device,
+            dtype=dtype,
         )
 
     def transcribe(self, ref_audio, language=None):
@@ -115,7 +125,18 @@ class F5TTS:
         file_wave=None,
         file_spec=None,
         seed=None,
+        max_frames_per_batch=None,
+        preset=None,
+        ode_method=None,
+        cfg_schedule=None,
     ):
+        # preset: fast | balanced | quality, replaces nfe_step (and ode_method unless given)
+        if preset is not None:
+            sampling_params = get_sampling_params(preset, ode_method=ode_method)
+            nfe_step, ode_method = sampling_params["nfe_step"], sampling_params["ode_method"]
+        elif ode_method is not None:
+            ode_method = get_sampling_params(nfe_step=nfe_step, ode_method=ode_method)["ode_method"]
+
         if seed is None:
             self.seed = random.randint(0, sys.maxsize)
         seed_everything(self.seed)
@@ -139,6 +160,9 @@ class F5TTS:
             speed=speed,
             fix_duration=fix_duration,
             device=self.device,
+            max_frames_per_batch=max_frames_per_batch,
+            ode_method=ode_method,
+            cfg_schedule=cfg_schedule,
         )
 
         if file_wave is not None:
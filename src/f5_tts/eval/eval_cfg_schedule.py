@@ -0,0 +1,65 @@
+# Benchmark CFG schedules (guidance interval, decaying strength, null_pred reuse) against
+# constant classifier-free guidance on every step, at one sampling preset.
+#
+# e.g.
+# python src/f5_tts/eval/eval_cfg_schedule.py -n F5TTS_Base -c ckpts/your_training_dataset/model_last.pt \
+#     -v data/Emilia_ZH_EN_pinyin/vocab.txt -r static/voices/male.mp3 -t texts_vi.txt -l vi -p quality
+
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import argparse
+from importlib.resources import files
+
+import torch
+
+from f5_tts.eval.eval_sampling_presets import add_common_args, load_gen_texts, save_results, score, synthesize
+from f5_tts.infer.utils_infer import get_sampling_params, sampling_presets
+from f5_tts.model import CFGSchedule
+
+rel_path = str(files("f5_tts").joinpath("../../"))
+
+cfg_schedules = {
+    "constant": None,  # baseline, guidance on every step
+    "interval_0.0-0.6": CFGSchedule(interval=(0.0, 0.6)),
+    "interval_0.1-0.8": CFGSchedule(interval=(0.1, 0.8)),
+    "linear_decay": CFGSchedule(decay="linear", min_strength=0.5),
+    "cosine_decay": CFGSchedule(decay="cosine", min_strength=0.0),
+    "reuse_2": CFGSchedule(reuse_every=2),
+    "reuse_3": CFGSchedule(reuse_every=3),
+    "interval_0.0-0.6_reuse_2": CFGSchedule(interval=(0.0, 0.6), reuse_every=2),
+}
+
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description="CFG schedules vs constant CFG"))
+    parser.add_argument("-p", "--preset", default="quality", choices=list(sampling_presets))
+    parser.add_argument("-m", "--ode_method", default=None)
+    parser.add_argument("--schedules", default=",".join(cfg_schedules), help="names from cfg_schedules")
+    parser.add_argument("-o", "--output_dir", default=f"{rel_path}/results/cfg_schedule")
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    gen_texts = load_gen_texts(args.gen_file)
+
+    combos = []
+    for name in args.schedules.split(","):
+        sampling = get_sampling_params(args.preset, ode_method=args.ode_method)
+        sampling["cfg_schedule"] = cfg_schedules[name]
+        combos.append((f"{args.preset}_{name}", sampling))
+
+    results, ref_file = synthesize(args, combos, gen_texts, device)
+    score(args, results, gen_texts, ref_file)
+
+    baseline = results[0]
+    for result in results:
+        result["speedup"] = baseline["latency"] / result["latency"]
+        print(f"{result['name']}: {result['speedup']:.2f}x vs {baseline['name']}")
+
+    save_results(results, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# Parity of the onnxruntime backend with PyTorch on a tiny randomly initialised DiT and Vocos:
+# exports both, then compares one CFG-fused DiT forward, full euler sampling (same noise) and
+# vocoding, and exits non-zero if any max abs difference exceeds its tolerance.
+#
+# e.g.
+# python src/f5_tts/eval/eval_onnx_parity.py
+
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import argparse
+import tempfile
+
+import numpy as np
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+from f5_tts.infer.onnx_export import export_dit, export_vocos
+from f5_tts.infer.onnx_runtime import ONNXCFM, ONNXVocos
+from f5_tts.infer.utils_infer import get_sample_duration
+from f5_tts.model import CFM, DiT
+
+tiny_dit_cfg = dict(dim=64, depth=2, heads=2, dim_head=32, ff_mult=2, text_dim=32, conv_layers=1)
+vocab = list("abcdefghijklmnopqrstuvwxyz ,.")
+mel_dim = 100
+
+
+def build_tiny_model():
+    vocab_char_map = {c: i for i, c in enumerate(vocab)}
+    model = CFM(
+        transformer=DiT(**tiny_dit_cfg, text_num_embeds=len(vocab), mel_dim=mel_dim),
+        odeint_kwargs=dict(method="euler"),
+        vocab_char_map=vocab_char_map,
+    ).eval()
+    # DiT zero-initialises AdaLN and output layers, which would make every prediction 0
+    with torch.no_grad():
+        for param in model.transformer.parameters():
+            param.normal_(std=0.05)
+    return model, vocab_char_map
+
+
+def build_tiny_vocos():
+    from vocos import Vocos
+    from vocos.feature_extractors import MelSpectrogramFeatures
+    from vocos.heads import ISTFTHead
+    from vocos.models import VocosBackbone
+
+    return Vocos(
+        MelSpectrogramFeatures(sample_rate=24000, n_fft=1024, hop_length=256, n_mels=mel_dim, padding="center"),
+        VocosBackbone(input_channels=mel_dim, dim=64, intermediate_dim=128, num_layers=2),
+        ISTFTHead(dim=64, n_fft=1024, hop_length=256, padding="same"),
+    ).eval()
+
+
+def get_noise(durations, seed):
+    """y0 exactly as CFM.sample draws it for this seed"""
+    y0 = []
+    for dur in durations:
+        torch.manual_seed(seed)
+        y0.append(torch.randn(dur, mel_dim))
+    return pad_sequence(y0, padding_value=0, batch_first=True)
+
+
+def max_abs_diff(a, b):
+    return float(np.abs(np.asarray(a, dtype=np.float32) - np.asarray(b, dtype=np.float32)).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="onnxruntime vs PyTorch parity on a tiny random config")
+    parser.add_argument("-s", "--seed", default=0, type=int)
+    parser.add_argument("--nfe_step", default=8, type=int)
+    parser.add_argument("--forward_atol", default=1e-4, type=float)
+    parser.add_argument("--sample_atol", default=1e-3, type=float)
+    parser.add_argument("--vocoder_atol", default=1e-3, type=float)
+    parser.add_argument("--skip_vocoder", action="store_true", help="no vocos package installed")
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    model, vocab_char_map = build_tiny_model()
+    sampling = dict(steps=args.nfe_step, cfg_strength=2.0, sway_sampling_coef=-1.0)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir, torch.no_grad():
+        export_dit(model, os.path.join(tmp_dir, "dit.onnx"))
+        onnx_model = ONNXCFM(os.path.join(tmp_dir, "dit.onnx"), vocab_char_map)
+
+        # one forward, padded batch of 2
+        x, cond = torch.randn(2, 96, mel_dim), torch.randn(2, 96, mel_dim)
+        text = torch.randint(0, len(vocab), (2, 40))
+        text[1, 30:] = -1
+        time = torch.rand(2)
+        mask = torch.arange(96)[None, :] < torch.tensor([96, 80])[:, None]
+        expected = model.transformer(x, cond, text, time, False, False, mask=mask, cfg_infer=True)
+        pred, null_pred = onnx_model.run_dit(x.numpy(), cond.numpy(), text.numpy(), time.numpy(), mask.numpy())
+        results["forward"] = (max_abs_diff(np.concatenate([pred, null_pred]), expected), args.forward_atol)
+
+        # full sampling: single item (no mask in torch) and a padded batch
+        for name, texts, durations in [
+            ("sample_single", ["hello world, this is a test."], [120]),
+            ("sample_batch", ["hello world.", "a slightly longer second sentence, padded."], [90, 140]),
+        ]:
+            ref = torch.randn(len(texts), 32, mel_dim)
+            texts = [list(t) for t in texts]
+            expected, _ = model.sample(ref, texts, torch.tensor(durations), seed=args.seed, **sampling)
+            y0 = get_noise([get_sample_duration(d, len(t), ref.shape[1]) for t, d in zip(texts, durations)], args.seed)
+            out = onnx_model.sample_numpy(ref.numpy(), texts, durations, y0=y0.numpy(), **sampling)
+            results[name] = (max_abs_diff(out, expected), args.sample_atol)
+
+        if not args.skip_vocoder:
+            vocoder = build_tiny_vocos()
+            export_vocos(vocoder, os.path.join(tmp_dir, "vocos.onnx"))
+            onnx_vocoder = ONNXVocos(os.path.join(tmp_dir, "vocos.onnx"))
+            mel = torch.randn(2, mel_dim, 150)
+            expected = vocoder.decode(mel)
+            results["vocoder"] = (max_abs_diff(onnx_vocoder.decode_numpy(mel.numpy()), expected), args.vocoder_atol)
+
+    failed = False
+    for name, (diff, atol) in results.items():
+        status = "ok" if diff <= atol else "FAIL"
+        failed |= diff > atol
+        print(f"{name:<14} max abs diff {diff:.2e} (atol {atol:.0e}) {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Size per minute of audio and encode speed of every output format (audio_encoding.py), written
+# whole and streamed in synthesis-sized chunks; exits non-zero if Opus or MP3 is not at least
+# --min_ratio times smaller than the float WAV the app used to write.
+#
+# e.g.
+# python src/f5_tts/eval/eval_output_formats.py --audio tests/infer_cli_basic.wav
+
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+from f5_tts.infer.audio_encoding import OUTPUT_FORMATS, encode_file, is_format_available, iter_encoded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audio", default="tests/infer_cli_basic.wav")
+    parser.add_argument("--sample_rate", type=int, default=24000)
+    parser.add_argument("--chunk_size", type=int, default=4096, help="samples per streamed chunk")
+    parser.add_argument("--min_ratio", type=float, default=10.0)
+    args = parser.parse_args()
+
+    audio, sample_rate = sf.read(args.audio, dtype="float32", always_2d=True)
+    audio = audio.mean(axis=1)
+    if sample_rate != args.sample_rate:
+        # linear resampling is enough for a size comparison
+        positions = np.arange(int(len(audio) * args.sample_rate / sample_rate)) * sample_rate / args.sample_rate
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+        sample_rate = args.sample_rate
+    minutes = len(audio) / sample_rate / 60
+    chunks = [audio[i : i + args.chunk_size] for i in range(0, len(audio), args.chunk_size)]
+    print(f"{args.audio}: {len(audio) / sample_rate:.1f}s at {sample_rate} Hz, {len(chunks)} chunks")
+
+    sizes = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, (extension, _, _, _, _) in OUTPUT_FORMATS.items():
+            if not is_format_available(name):
+                print(f"{name:>6}: not supported by libsndfile {sf.__libsndfile_version__}")
+                continue
+
+            start = time.time()
+            encoded = encode_file(os.path.join(tmp_dir, f"out_{name}{extension}"), audio, sample_rate, name)
+            encode_time = time.time() - start
+
+            start = time.time()
+            first_byte = None
+            streamed = 0
+            for data in iter_encoded(chunks, sample_rate, name):
+                if first_byte is None:
+                    first_byte = time.time() - start
+                streamed += len(data)
+
+            decoded, _ = sf.read(encoded.path, dtype="float32")
+            sizes[name] = encoded.size
+            print(
+                f"{name:>6}: {encoded.size / minutes / 1024:8.0f} KiB/min  "
+                f"{encoded.size * 8 / (len(audio) / sample_rate) / 1000:6.1f} kbps  "
+                f"encode {len(audio) / sample_rate / encode_time:6.0f}x realtime  "
+                f"streamed {streamed / minutes / 1024:8.0f} KiB/min, first bytes after {first_byte * 1000:.1f} ms  "
+                f"decoded {len(decoded) / sample_rate:.2f}s"
+            )
+
+    failed = False
+    for name in ["opus", "mp3"]:
+        if name in sizes:
+            ratio = sizes["wav"] / sizes[name]
+            print(f"{name} is {ratio:.1f}x smaller than float wav")
+            failed |= ratio < args.min_ratio
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
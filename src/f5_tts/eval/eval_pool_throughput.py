@@ -0,0 +1,129 @@
+# Throughput of F5TTSPool on one CPU machine: sweep workers x threads-per-worker, submit the same
+# request mix to every configuration and report requests/s, generated audio seconds per second
+# and latency percentiles.
+#
+# e.g.
+# python src/f5_tts/eval/eval_pool_throughput.py -n F5TTS_Base -c ckpts/your_training_dataset/model_last.pt \
+#     -v data/Emilia_ZH_EN_pinyin/vocab.txt -r static/voices/male.mp3 -rt "..." -t texts_vi.txt \
+#     -w 1,2,4,8 -th 2,4,8,16 --num_requests 32
+
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import argparse
+import json
+import time
+from importlib.resources import files
+
+import numpy as np
+
+from f5_tts.pool import F5TTSPool, get_available_cpus
+
+rel_path = str(files("f5_tts").joinpath("../../"))
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="F5TTSPool throughput over workers x threads per worker")
+    parser.add_argument("-n", "--model", default="F5TTS_Base", help="config name under f5_tts/configs")
+    parser.add_argument("-c", "--ckpt_file", required=True)
+    parser.add_argument("-v", "--vocab_file", default="")
+    parser.add_argument("-r", "--ref_audio", required=True)
+    parser.add_argument("-rt", "--ref_text", required=True, help="given, so that workers do not load whisper")
+    parser.add_argument("-t", "--gen_file", required=True, help="text file, one request per line (cycled)")
+    parser.add_argument("-w", "--workers", default="1,2,4,8")
+    parser.add_argument("-th", "--threads", default="1,2,4,8")
+    parser.add_argument("-p", "--preset", default="fast", help="sampling preset of every request")
+    parser.add_argument("--num_requests", default=32, type=int)
+    parser.add_argument("--dtype", default=None, help="fp32 | bf16 model weights")
+    parser.add_argument("-o", "--output_dir", default=f"{rel_path}/results/pool_throughput")
+    return parser.parse_args()
+
+
+def run_config(args, num_workers, threads_per_worker, gen_texts):
+    start = time.time()
+    pool = F5TTSPool(
+        num_workers=num_workers,
+        threads_per_worker=threads_per_worker,
+        model=args.model,
+        ckpt_file=args.ckpt_file,
+        vocab_file=args.vocab_file,
+        dtype=args.dtype,
+    )
+    load_time = time.time() - start
+
+    with pool:
+        request = dict(ref_file=args.ref_audio, ref_text=args.ref_text, preset=args.preset)
+
+        # one request per worker first, so that no worker is measured cold
+        for future in [pool.submit(gen_text=gen_texts[0], **request) for _ in range(num_workers)]:
+            future.result()
+
+        start = time.time()
+        submitted, done_times = [], {}
+        for i in range(args.num_requests):
+            future = pool.submit(gen_text=gen_texts[i % len(gen_texts)], **request)
+            future.add_done_callback(lambda _, i=i: done_times.__setitem__(i, time.time()))
+            submitted.append((time.time(), future))
+
+        audio_seconds = 0.0
+        for submit_time, future in submitted:
+            wav, sr, _ = future.result()
+            audio_seconds += len(wav) / sr
+        wall_time = time.time() - start
+        latencies = [done_times[i] - submit_time for i, (submit_time, _) in enumerate(submitted)]
+
+    return {
+        "workers": num_workers,
+        "threads_per_worker": threads_per_worker,
+        "load_time": round(load_time, 1),
+        "requests_per_s": args.num_requests / wall_time,
+        "audio_s_per_s": audio_seconds / wall_time,
+        "p50_latency": float(np.percentile(latencies, 50)),
+        "p95_latency": float(np.percentile(latencies, 95)),
+    }
+
+
+def format_table(results):
+    lines = [
+        "| workers | threads | load (s) | req/s | audio s/s | p50 (s) | p95 (s) |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        lines.append(
+            f"| {r['workers']} | {r['threads_per_worker']} | {r['load_time']} | {r['requests_per_s']:.2f} | "
+            f"{r['audio_s_per_s']:.2f} | {r['p50_latency']:.2f} | {r['p95_latency']:.2f} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    args = get_args()
+    num_cpus = len(get_available_cpus())
+    with open(args.gen_file, encoding="utf-8") as f:
+        gen_texts = [line.strip() for line in f if line.strip()]
+
+    results = []
+    for num_workers in [int(w) for w in args.workers.split(",")]:
+        for threads_per_worker in [int(t) for t in args.threads.split(",")]:
+            if num_workers * threads_per_worker > num_cpus:
+                print(f"skip {num_workers} x {threads_per_worker}: more than {num_cpus} cores")
+                continue
+            result = run_config(args, num_workers, threads_per_worker, gen_texts)
+            print(json.dumps(result))
+            results.append(result)
+
+    table = format_table(results)
+    print(table)
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, "results.jsonl"), "w") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+    with open(os.path.join(args.output_dir, "results.md"), "w") as f:
+        f.write(table + "\n")
+    print(f"Results saved to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Regression check of the dynamic int8 model / vocoder against fp32 on CPU:
+# synthesize the same texts with both, score WER / CER (and speaker similarity if a WavLM
+# checkpoint is given) and fail if int8 is worse than fp32 by more than the given margins.
+#
+# e.g.
+# python src/f5_tts/eval/eval_quantization.py -n F5TTS_Base -c ckpts/your_training_dataset/model_last.pt \
+#     -v data/Emilia_ZH_EN_pinyin/vocab.txt -r static/voices/male.mp3 -t texts_vi.txt -l vi \
+#     --quantized_ckpt_file ckpts/quantized/model_int8.pt --wavlm_ckpt ../checkpoints/UniSpeech/wavlm_large_finetune.pth
+
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import argparse
+from importlib.resources import files
+
+from f5_tts.eval.eval_sampling_presets import add_common_args, load_gen_texts, save_results, score, synthesize
+from f5_tts.infer.utils_infer import get_sampling_params, sampling_presets
+
+rel_path = str(files("f5_tts").joinpath("../../"))
+
+
+def main():
+    parser = add_common_args(argparse.ArgumentParser(description="int8 vs fp32 regression check"))
+    parser.add_argument("-p", "--preset", default="quality", choices=list(sampling_presets))
+    parser.add_argument("--quantized_ckpt_file", default=None, help="pre-quantized model, created if missing")
+    parser.add_argument("--quantized_vocoder_file", default=None, help="pre-quantized vocoder, created if missing")
+    parser.add_argument("--max_wer_increase", default=0.02, type=float, help="absolute, e.g. 0.02 = 2 points")
+    parser.add_argument("--max_sim_drop", default=0.02, type=float)
+    parser.add_argument("-o", "--output_dir", default=f"{rel_path}/results/quantization")
+    args = parser.parse_args()
+
+    gen_texts = load_gen_texts(args.gen_file)
+    sampling = get_sampling_params(args.preset)
+
+    results, ref_file = synthesize(args, [("fp32", sampling)], gen_texts, "cpu")
+    int8_results, _ = synthesize(
+        args,
+        [("int8", sampling)],
+        gen_texts,
+        "cpu",
+        model_kwargs=dict(quantize=True, quantized_ckpt_path=args.quantized_ckpt_file),
+        vocoder_kwargs=dict(quantize=True, quantized_path=args.quantized_vocoder_file),
+    )
+    results += int8_results
+    score(args, results, gen_texts, ref_file)
+
+    fp32, int8 = results
+    int8["speedup"] = fp32["latency"] / int8["latency"]
+    save_results(results, args.output_dir)
+
+    failures = []
+    if int8["wer"] - fp32["wer"] > args.max_wer_increase:
+        failures.append(f"WER {fp32['wer']:.2%} -> {int8['wer']:.2%}")
+    if "sim" in int8 and fp32["sim"] - int8["sim"] > args.max_sim_drop:
+        failures.append(f"SIM {fp32['sim']:.3f} -> {int8['sim']:.3f}")
+
+    print(f"int8 speedup: {int8['speedup']:.2f}x")
+    if failures:
+        print(f"REGRESSION: {', '.join(failures)}")
+        sys.exit(1)
+    print("int8 within tolerance of fp32")
+
+
+if __name__ == "__main__":
+    main()
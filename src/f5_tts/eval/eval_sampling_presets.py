@@ -0,0 +1,208 @@
+# Latency vs quality of the sampling presets (fast / balanced / quality) and ODE solvers
+# on our own checkpoint: synthesize a text list with every combination, then score WER / CER
+# (and optionally speaker similarity) of the outputs.
+#
+# e.g.
+# python src/f5_tts/eval/eval_sampling_presets.py -n F5TTS_Base -c ckpts/your_training_dataset/model_last.pt \
+#     -v data/Emilia_ZH_EN_pinyin/vocab.txt -r static/voices/male.mp3 -t texts_vi.txt -l vi
+
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import argparse
+import json
+import time
+from importlib.resources import files
+
+import numpy as np
+import soundfile as sf
+import torch
+from omegaconf import OmegaConf
+from tqdm import tqdm
+
+from f5_tts.eval.utils_eval import calculate_cer, calculate_wer, load_asr_model, run_sim
+from f5_tts.infer.utils_infer import (
+    get_sampling_params,
+    infer_process,
+    load_model,
+    load_ref_audio,
+    load_vocoder,
+    ode_methods,
+    prepare_ref_conditioning,
+    preprocess_ref_audio_text,
+    sampling_presets,
+)
+from f5_tts.model import DiT, UNetT  # noqa: F401. used for config
+
+evals_per_step = {"euler": 1, "midpoint": 2, "heun2": 2}
+
+rel_path = str(files("f5_tts").joinpath("../../"))
+
+
+def add_common_args(parser):
+    parser.add_argument("-n", "--model", default="F5TTS_Base", help="config name under f5_tts/configs")
+    parser.add_argument("-c", "--ckpt_file", required=True)
+    parser.add_argument("-v", "--vocab_file", default="")
+    parser.add_argument("-r", "--ref_audio", required=True)
+    parser.add_argument("-rt", "--ref_text", default="", help="leave empty to auto-transcribe")
+    parser.add_argument("-t", "--gen_file", required=True, help="text file, one sentence or paragraph per line")
+    parser.add_argument("-l", "--lang", default="vi", help="language passed to whisper")
+    parser.add_argument("-s", "--seed", default=0, type=int)
+    parser.add_argument("--asr_ckpt_dir", default="", help="faster-whisper model (default large-v3)")
+    parser.add_argument("--wavlm_ckpt", default=None, help="wavlm_large_finetune.pth, enables speaker similarity")
+    return parser
+
+
+def get_args():
+    parser = add_common_args(argparse.ArgumentParser(description="latency vs quality table of sampling presets"))
+    parser.add_argument("-p", "--presets", default=",".join(sampling_presets))
+    parser.add_argument("-m", "--ode_methods", default="euler,midpoint,heun")
+    parser.add_argument("-o", "--output_dir", default=f"{rel_path}/results/sampling_presets")
+    return parser.parse_args()
+
+
+def load_gen_texts(gen_file):
+    with open(gen_file, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def synthesize(args, combos, gen_texts, device, model_kwargs=None, vocoder_kwargs=None):
+    """
+    combos: (name, infer_process kwargs); returns one result dict per combo with latency and RTF.
+    model_kwargs / vocoder_kwargs are passed on to load_model / load_vocoder.
+    """
+    model_cfg = OmegaConf.load(str(files("f5_tts").joinpath(f"configs/{args.model}.yaml")))
+    model_cls = globals()[model_cfg.model.backbone]
+    mel_spec_type = model_cfg.model.mel_spec.mel_spec_type
+
+    model = load_model(
+        model_cls,
+        model_cfg.model.arch,
+        args.ckpt_file,
+        mel_spec_type=mel_spec_type,
+        vocab_file=args.vocab_file,
+        device=device,
+        **(model_kwargs or {}),
+    )
+    vocoder = load_vocoder(vocoder_name=mel_spec_type, device=device, **(vocoder_kwargs or {}))
+
+    ref_file, ref_text = preprocess_ref_audio_text(args.ref_audio, args.ref_text)
+    conditioning = prepare_ref_conditioning(load_ref_audio(ref_file), ref_text, mel_spec=model.mel_spec, device=device)
+
+    # warm-up, so that the first combination is not charged for cuda init / kernel selection
+    infer_process(conditioning, conditioning.ref_text, gen_texts[0], model, vocoder, mel_spec_type, progress=None)
+
+    results = []
+    for name, sampling in combos:
+        wav_dir = os.path.join(args.output_dir, name)
+        os.makedirs(wav_dir, exist_ok=True)
+
+        latencies, durations = [], []
+        for i, gen_text in enumerate(tqdm(gen_texts, desc=name)):
+            torch.manual_seed(args.seed)
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+            start = time.time()
+            wave, sr, _ = infer_process(
+                conditioning,
+                conditioning.ref_text,
+                gen_text,
+                model,
+                vocoder,
+                mel_spec_type,
+                show_info=lambda *_: None,
+                progress=None,
+                device=device,
+                **sampling,
+            )
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+            latencies.append(time.time() - start)
+            durations.append(len(wave) / sr)
+            sf.write(os.path.join(wav_dir, f"{i}.wav"), wave, sr)
+
+        results.append(
+            {
+                "name": name,
+                "nfe_step": sampling["nfe_step"],
+                "ode_method": sampling["ode_method"],
+                "nfe": sampling["nfe_step"] * evals_per_step.get(sampling["ode_method"], 1),
+                "cfg": str(sampling.get("cfg_schedule") or "constant"),
+                "latency": float(np.mean(latencies)),
+                "rtf": float(np.sum(latencies) / np.sum(durations)),
+                "wav_dir": wav_dir,
+            }
+        )
+
+    del model, vocoder
+    torch.cuda.empty_cache()
+    return results, ref_file
+
+
+def score(args, results, gen_texts, ref_file):
+    asr_model = load_asr_model(args.lang, ckpt_dir=args.asr_ckpt_dir)
+    for result in results:
+        wers, cers = [], []
+        for i, gen_text in enumerate(gen_texts):
+            segments, _ = asr_model.transcribe(os.path.join(result["wav_dir"], f"{i}.wav"), language=args.lang)
+            hypo = " ".join(segment.text.strip() for segment in segments)
+            wers.append(calculate_wer(gen_text, hypo))
+            cers.append(calculate_cer(gen_text, hypo))
+        result["wer"] = float(np.mean(wers))
+        result["cer"] = float(np.mean(cers))
+
+    if args.wavlm_ckpt:
+        for result in results:
+            test_set = [(os.path.join(result["wav_dir"], f"{i}.wav"), ref_file, None) for i in range(len(gen_texts))]
+            sims = run_sim((0, test_set, args.wavlm_ckpt))
+            result["sim"] = float(np.mean([s["sim"] for s in sims]))
+
+
+def format_table(results):
+    lines = [
+        "| name | steps | ode | NFE | cfg | latency (s) | RTF | WER | CER | SIM |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        sim = f"{r['sim']:.3f}" if "sim" in r else "-"
+        lines.append(
+            f"| {r['name']} | {r['nfe_step']} | {r['ode_method']} | {r['nfe']} | {r['cfg']} | {r['latency']:.2f} | "
+            f"{r['rtf']:.3f} | {r['wer']:.2%} | {r['cer']:.2%} | {sim} |"
+        )
+    return "\n".join(lines)
+
+
+def save_results(results, output_dir):
+    table = format_table(results)
+    print(table)
+
+    with open(os.path.join(output_dir, "results.jsonl"), "w") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    with open(os.path.join(output_dir, "results.md"), "w") as f:
+        f.write(table + "\n")
+    print(f"Results saved to {output_dir}")
+
+
+def main():
+    args = get_args()
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    gen_texts = load_gen_texts(args.gen_file)
+
+    combos = []
+    for preset in args.presets.split(","):
+        for ode_method in args.ode_methods.split(","):
+            if ode_method not in ode_methods:
+                raise ValueError(f"Unknown ODE method '{ode_method}', choose from {', '.join(ode_methods)}")
+            combos.append((f"{preset}_{ode_method}", get_sampling_params(preset, ode_method=ode_method)))
+
+    results, ref_file = synthesize(args, combos, gen_texts, device)
+    score(args, results, gen_texts, ref_file)
+    save_results(results, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Text frontend micro-benchmarks on long Vietnamese stories: convert_char_to_pinyin through jieba and
+# through the direct non-CJK path, list_str_to_idx with a dict lookup per char and with the compiled
+# VocabTable, and the reference text tokenised per chunk or once per voice. Exits non-zero if the fast
+# paths do not give exactly the tokens and ids of the jieba / dict paths (stories, edge cases, random text).
+#
+# e.g.
+# python src/f5_tts/eval/eval_text_frontend.py --stories data/sample_stories.json --repeat 20
+
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import argparse
+import json
+import random
+import time
+
+import jieba
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+from f5_tts.infer.utils_infer import chunk_text, convert_ref_text
+from f5_tts.model.utils import convert_char_to_pinyin, get_vocab_table, list_str_to_idx
+
+EDGE_CASES = [
+    "Chàng trai nói: “Tôi đi đây!” rồi đi.",
+    "3.5% lãi, v1.2.3 – a-b_c.d, 10.000đ; x&y #1 +84 912.345.678",
+    "C++ và c# là ngôn ngữ, AT&T là công ty",
+    "dòng 1\r\ndòng 2\n\n\tthụt  lề và khoảng trắng",
+    "xin chào 你好 世界 và 〇",
+    "emoji 😀 Ωμέγα Привет ﬁ …",
+    "",
+]
+
+
+def load_stories(path):
+    """Story texts: the "content" of every story in a .json list (as data/sample_stories.json), else the whole file"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return [story["content"] for story in json.load(f)]
+        return [f.read()]
+
+
+def random_texts(count, length, seed=0):
+    rng = random.Random(seed)
+    alphabet = "aàáạảãâăeêioôơuưyđAZ09 .,-_+#&%:;'\"“”‘’!?\r\n\t …–ếộữ"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, length))) for _ in range(count)]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def dict_list_str_to_idx(text, vocab_char_map, padding_value=-1):
+    list_idx_tensors = [torch.tensor([vocab_char_map.get(c, 0) for c in t]) for t in text]
+    return pad_sequence(list_idx_tensors, padding_value=padding_value, batch_first=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stories", default="data/sample_stories.json")
+    parser.add_argument("--vocab", default="data/Emilia_ZH_EN_pinyin/vocab.txt")
+    parser.add_argument("--ref_text", default="Xin chào, đây là giọng đọc mẫu của tôi. ")
+    parser.add_argument("--max_chars", type=int, default=200, help="chunk size, as the app splits stories")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--random", type=int, default=2000, help="random texts compared on top of the stories")
+    args = parser.parse_args()
+
+    stories = load_stories(args.stories)
+    story = "\n\n".join(stories)
+    print(f"{len(stories)} stories, {len(story)} chars")
+    failed = False
+
+    # exact same tokens as jieba
+    jieba.setLogLevel(60)
+    start = time.perf_counter()
+    jieba.initialize()
+    print(f"jieba dictionary load: {(time.perf_counter() - start) * 1000:.0f} ms (skipped by the non-CJK path)")
+    texts = stories + EDGE_CASES + random_texts(args.random, 80)
+    mismatches = [
+        t for t in texts
+        if convert_char_to_pinyin([t]) != convert_char_to_pinyin([t], fast_non_cjk=False)
+    ]
+    print(f"tokens: {len(texts) - len(mismatches)}/{len(texts)} texts identical to the jieba path")
+    for t in mismatches[:5]:
+        print(f"  mismatch: {t!r}")
+    failed |= bool(mismatches)
+
+    _, jieba_time = timed(lambda: convert_char_to_pinyin([story], fast_non_cjk=False), args.repeat)
+    fast_chars, fast_time = timed(lambda: convert_char_to_pinyin([story]), args.repeat)
+    print(
+        f"convert_char_to_pinyin: jieba {jieba_time * 1000:.1f} ms, non-CJK path {fast_time * 1000:.1f} ms "
+        f"({jieba_time / fast_time:.1f}x, {len(story) / fast_time / 1e6:.1f}M chars/s)"
+    )
+
+    # reference text once per voice, as prepare_batch_inputs does
+    chunks = chunk_text(story, max_chars=args.max_chars)
+    joint = convert_char_to_pinyin([args.ref_text + chunk for chunk in chunks], fast_non_cjk=False)
+
+    def per_voice():
+        ref_chars = list(convert_ref_text(args.ref_text))
+        return [ref_chars + chars for chars in convert_char_to_pinyin(chunks)]
+
+    memoized, memo_time = timed(per_voice, args.repeat)
+    _, joint_time = timed(lambda: convert_char_to_pinyin([args.ref_text + chunk for chunk in chunks]), args.repeat)
+    print(
+        f"{len(chunks)} chunks with the reference text: {joint_time * 1000:.1f} ms tokenised per chunk, "
+        f"{memo_time * 1000:.1f} ms once per voice"
+    )
+    if memoized != joint:
+        print("  mismatch between per-voice and per-chunk reference tokens")
+        failed = True
+
+    # token ids
+    if os.path.exists(args.vocab):
+        vocab_char_map = {}
+        with open(args.vocab, encoding="utf-8") as f:
+            for i, char in enumerate(f):
+                vocab_char_map[char[:-1]] = i
+        batches = [memoized, [fast_chars[0]], convert_char_to_pinyin([t for t in EDGE_CASES if t])]
+        for batch in batches:
+            if not torch.equal(list_str_to_idx(batch, vocab_char_map), dict_list_str_to_idx(batch, vocab_char_map)):
+                print("  mismatch between VocabTable and dict ids")
+                failed = True
+        _, compile_time = timed(lambda: get_vocab_table(dict(vocab_char_map)), 1)
+        _, dict_time = timed(lambda: dict_list_str_to_idx(memoized, vocab_char_map), args.repeat)
+        _, table_time = timed(lambda: list_str_to_idx(memoized, vocab_char_map), args.repeat)
+        print(
+            f"list_str_to_idx ({len(memoized)} x {max(map(len, memoized))}): dict {dict_time * 1000:.2f} ms, "
+            f"VocabTable {table_time * 1000:.2f} ms ({dict_time / table_time:.1f}x), "
+            f"compiled once in {compile_time * 1000:.1f} ms"
+        )
+    else:
+        print(f"{args.vocab} not found, list_str_to_idx skipped")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
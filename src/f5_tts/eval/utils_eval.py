@@ -291,11 +291,14 @@ def load_asr_model(lang, ckpt_dir=""):
             # spk_model = os.path.join(ckpt_dir, "cam++"),
             disable_update=True,
         )  # following seed-tts setting
-    elif lang == "en":
+    else:  # multilingual whisper for en and other languages
         from faster_whisper import WhisperModel
 
         model_size = "large-v3" if ckpt_dir == "" else ckpt_dir
-        model = WhisperModel(model_size, device="cuda", compute_type="float16")
+        if torch.cuda.is_available():
+            model = WhisperModel(model_size, device="cuda", compute_type="float16")
+        else:
+            model = WhisperModel(model_size, device="cpu", compute_type="int8")
     return model
 
 
@@ -373,6 +376,77 @@ def run_asr_wer(args):
     return wer_results
 
 
+# WER / CER by plain edit distance, language independent (used by the app and eval_sampling_presets)
+
+
+def calculate_wer(reference, hypothesis):
+    """
+    Calculate Word Error Rate (WER)
+    WER = (S + D + I) / N
+    where S = substitutions, D = deletions, I = insertions, N = words in reference
+    """
+    ref_words = reference.lower().split()
+    hyp_words = hypothesis.lower().split()
+
+    # Dynamic programming for edit distance
+    d = [[0] * (len(hyp_words) + 1) for _ in range(len(ref_words) + 1)]
+
+    for i in range(len(ref_words) + 1):
+        d[i][0] = i
+    for j in range(len(hyp_words) + 1):
+        d[0][j] = j
+
+    for i in range(1, len(ref_words) + 1):
+        for j in range(1, len(hyp_words) + 1):
+            if ref_words[i-1] == hyp_words[j-1]:
+                d[i][j] = d[i-1][j-1]
+            else:
+                d[i][j] = min(
+                    d[i-1][j] + 1,      # deletion
+                    d[i][j-1] + 1,      # insertion
+                    d[i-1][j-1] + 1     # substitution
+                )
+
+    if len(ref_words) == 0:
+        return 0.0 if len(hyp_words) == 0 else 1.0
+
+    return d[len(ref_words)][len(hyp_words)] / len(ref_words)
+
+
+def calculate_cer(reference, hypothesis):
+    """
+    Calculate Character Error Rate (CER)
+    CER = (S + D + I) / N
+    where S = substitutions, D = deletions, I = insertions, N = characters in reference
+    """
+    ref_chars = list(reference.lower().replace(" ", ""))
+    hyp_chars = list(hypothesis.lower().replace(" ", ""))
+
+    # Dynamic programming for edit distance
+    d = [[0] * (len(hyp_chars) + 1) for _ in range(len(ref_chars) + 1)]
+
+    for i in range(len(ref_chars) + 1):
+        d[i][0] = i
+    for j in range(len(hyp_chars) + 1):
+        d[0][j] = j
+
+    for i in range(1, len(ref_chars) + 1):
+        for j in range(1, len(hyp_chars) + 1):
+            if ref_chars[i-1] == hyp_chars[j-1]:
+                d[i][j] = d[i-1][j-1]
+            else:
+                d[i][j] = min(
+                    d[i-1][j] + 1,
+                    d[i][j-1] + 1,
+                    d[i-1][j-1] + 1
+                )
+
+    if len(ref_chars) == 0:
+        return 0.0 if len(hyp_chars) == 0 else 1.0
+
+    return d[len(ref_chars)][len(hyp_chars)] / len(ref_chars)
+
+
 # SIM Evaluation
 
 
@@ -0,0 +1,244 @@
+# Content-addressed cache of synthesised audio
+# Keyed by the normalised text, the reference conditioning key and every sampling parameter, so
+# re-generating the same paragraph with the same voice is a file lookup instead of a full ODE solve.
+# Files live on disk with an LRU index in SQLite (shared by gunicorn workers, evicted by total size);
+# identical requests in flight in one process wait for the same generation instead of starting their own.
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+
+import soundfile as sf
+
+# bump when generation changes its output for the same parameters
+CACHE_VERSION = 1
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class AudioCacheEntry:
+    def __init__(self, key, audio_path, sample_rate, duration, extra_paths=None):
+        self.key = key
+        self.audio_path = audio_path
+        self.sample_rate = sample_rate
+        self.duration = duration
+        self.extra_paths = extra_paths or {}  # e.g. {"mel": path}
+
+
+class AudioCache:
+    def __init__(self, cache_dir, max_bytes=2 * 1024**3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Future of AudioCacheEntry
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = None
+        self._pid = None
+        with self._lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    sample_rate INTEGER NOT NULL,
+                    duration REAL NOT NULL,
+                    extra TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    @property
+    def connection(self):
+        """One connection per process (reopened after a fork, e.g. gunicorn --preload), used under the lock"""
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(os.path.join(self.cache_dir, "index.db"), timeout=30, check_same_thread=False)
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def make_key(gen_text, conditioning_key, speed, sampling, seed=None, model_tag=None, output_format=None):
+        """sha1 of normalised text, reference conditioning key, speed, sampling settings, seed, model and encoding"""
+        params = {
+            "version": CACHE_VERSION,
+            "text": normalize_text(gen_text),
+            "conditioning": conditioning_key,
+            "speed": round(float(speed), 4),
+            "sampling": {k: str(v) if not isinstance(v, (int, float)) else v for k, v in sorted(sampling.items())},
+            "seed": seed,
+            "model": model_tag,
+        }
+        if output_format is not None:
+            params["output_format"] = output_format
+        return hashlib.sha1(json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _path(self, key, name="audio", ext=".wav"):
+        return os.path.join(self.cache_dir, key[:2], f"{key}_{name}{ext}")
+
+    def get(self, key):
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT sample_rate, duration, extra FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            extra_paths = json.loads(row[2])
+            # the audio keeps the extension of its encoding, entries without one are .wav
+            audio_path = extra_paths.pop("audio", None) or self._path(key)
+            entry = AudioCacheEntry(key, audio_path, row[0], row[1], extra_paths)
+            if not os.path.exists(entry.audio_path):
+                # removed behind our back (cleanup, disk full), forget it
+                with self.connection:
+                    self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+                )
+        return entry
+
+    def put(self, key, audio_path, extra_files=None):
+        """
+        Copy a generated audio file and optional extra files ({name: path}, e.g. its spectrogram) in,
+        then evict least recently used entries above max_bytes. Files larger than max_bytes together
+        are not stored, the returned entry then points at the given files.
+        """
+        info = sf.info(audio_path)
+        files = [
+            (name, src_path)
+            for name, src_path in [("audio", audio_path)] + list((extra_files or {}).items())
+            if src_path and os.path.exists(src_path)
+        ]
+        if sum(os.path.getsize(src_path) for _, src_path in files) > self.max_bytes:
+            # would evict every other entry, then itself
+            extra_paths = {name: src_path for name, src_path in files if name != "audio"}
+            return AudioCacheEntry(key, audio_path, info.samplerate, info.duration, extra_paths)
+        os.makedirs(os.path.dirname(self._path(key)), exist_ok=True)
+
+        size = 0
+        paths = {}
+        for name, src_path in files:
+            dst_path = self._path(key, name, os.path.splitext(src_path)[1])
+            # copy then rename, so that concurrent workers never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst_path), suffix=".tmp")
+            os.close(fd)
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, dst_path)
+            size += os.path.getsize(dst_path)
+            paths[name] = dst_path
+
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (key, sample_rate, duration, extra, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, info.samplerate, info.duration, json.dumps(paths), size, now, now),
+            )
+        self.evict(keep=key)
+        audio_path = paths.pop("audio")
+        return AudioCacheEntry(key, audio_path, info.samplerate, info.duration, paths)
+
+    def put_array(self, key, audio, sample_rate):
+        """Store a float waveform losslessly (32-bit float WAV), e.g. one text chunk of a narration"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".wav")
+        os.close(fd)
+        try:
+            sf.write(tmp_path, audio, sample_rate, subtype="FLOAT")
+            return self.put(key, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_array(self, key):
+        """(audio float32, sample_rate) of a cached entry, None on a miss"""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        audio, sample_rate = sf.read(entry.audio_path, dtype="float32")
+        return audio, sample_rate
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the total size is within max_bytes, except keep"""
+        with self._lock:
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for key, size, extra in self.connection.execute(
+                "SELECT key, size, extra FROM entries ORDER BY last_access ASC"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue  # just written, the caller is about to use it
+                evicted.append(key)
+                total -= size
+                for path in {self._path(key)} | set(json.loads(extra).values()):
+                    if os.path.exists(path):
+                        os.remove(path)
+            with self.connection:
+                self.connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in evicted])
+
+    def get_or_generate(self, key, generate_fn):
+        """
+        Return (entry, status): status is "hit" (on disk), "coalesced" (waited for an identical request
+        in flight) or "miss". generate_fn() writes the audio and returns (audio_path, extra_files), it runs
+        only on a miss.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry, "hit"
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            self.coalesced += 1
+            return future.result(), "coalesced"
+
+        self.misses += 1
+        try:
+            audio_path, extra_files = generate_fn()
+            entry = self.put(key, audio_path, extra_files)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(entry)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return entry, "miss"
+
+    def stats(self):
+        with self._lock:
+            entries, size = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            return {
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "in_flight": len(self._in_flight),
+                "cache_dir": self.cache_dir,
+            }
@@ -0,0 +1,199 @@
+# Output encodings of synthesised audio: float WAV, 16-bit PCM WAV, Ogg/Opus and MP3
+# Encoded incrementally through libsndfile as chunks are produced, to a file or to a byte stream
+# (HTTP streaming), so a long narration is never held twice in memory and the first compressed
+# bytes leave as soon as the first chunk is synthesised.
+# Opus and MP3 need libsndfile >= 1.1 (bundled with soundfile >= 0.12); at 24 kHz mono a float WAV
+# is 768 kbps, the default levels give about 29 kbps Opus and 64 kbps CBR MP3.
+import os
+
+import numpy as np
+import soundfile as sf
+
+OUTPUT_FORMATS = {
+    # name: (extension, mimetype, libsndfile format, subtype, default compression level)
+    "wav": (".wav", "audio/wav", "WAV", "FLOAT", None),
+    "pcm16": (".wav", "audio/wav", "WAV", "PCM_16", None),
+    "opus": (".ogg", "audio/ogg", "OGG", "OPUS", 0.9),
+    "mp3": (".mp3", "audio/mpeg", "MP3", "MPEG_LAYER_III", 0.6),
+}
+
+
+def get_output_format(name):
+    """(extension, mimetype, format, subtype, compression level) of an output format, ValueError if unknown"""
+    if name not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{name}', expected one of {', '.join(OUTPUT_FORMATS)}")
+    return OUTPUT_FORMATS[name]
+
+
+def is_format_available(name):
+    """Whether the installed libsndfile can write this format"""
+    _, _, file_format, subtype, _ = get_output_format(name)
+    return file_format in sf.available_formats() and subtype in sf.available_subtypes(file_format)
+
+
+class EncodedAudio:
+    def __init__(self, path, output_format, sample_rate, frames, size):
+        self.path = path
+        self.output_format = output_format
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.size = size  # bytes
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    @property
+    def codec(self):
+        return OUTPUT_FORMATS[self.output_format][3].lower()
+
+    @property
+    def mimetype(self):
+        return OUTPUT_FORMATS[self.output_format][1]
+
+
+class ByteStreamSink:
+    """
+    Write-only file object for libsndfile that hands out the bytes written so far with take().
+    Rewrites of bytes already handed out (header updates on close) are dropped, a stream cannot seek back.
+    """
+
+    def __init__(self):
+        self._pending = bytearray()
+        self._taken = 0
+        self._pos = 0
+        self._size = 0
+
+    def write(self, data):
+        data = bytes(data)
+        end = self._pos + len(data)
+        if end > self._taken:
+            start = max(self._pos, self._taken)
+            offset = start - self._taken
+            if offset > len(self._pending):
+                self._pending.extend(b"\0" * (offset - len(self._pending)))
+            self._pending[offset : offset + end - start] = data[start - self._pos :]
+        self._pos = end
+        self._size = max(self._size, end)
+        return len(data)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self._size
+        self._pos = offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def read(self, size=-1):
+        return b""
+
+    @property
+    def size(self):
+        return self._size
+
+    def take(self):
+        data = bytes(self._pending)
+        self._taken += len(data)
+        self._pending.clear()
+        return data
+
+
+class StreamingEncoder:
+    """
+    Incremental encoder, write(chunk) float32 mono chunks as they are synthesised and close() at the end.
+    target is a path (written to a temporary file and renamed on close, so readers never see a partial
+    file) or a ByteStreamSink.
+    """
+
+    def __init__(self, target, sample_rate, output_format="wav", compression_level=None):
+        _, _, file_format, subtype, default_level = get_output_format(output_format)
+        if not is_format_available(output_format):
+            raise ValueError(f"Output format '{output_format}' is not supported by libsndfile {sf.__libsndfile_version__}")
+
+        self.target = target
+        self.sample_rate = sample_rate
+        self.output_format = output_format
+        self.frames = 0
+        self._tmp_path = f"{target}.tmp" if isinstance(target, str) else None
+
+        kwargs = {}
+        level = default_level if compression_level is None else compression_level
+        if level is not None:
+            kwargs["compression_level"] = level
+        if output_format == "mp3":
+            # constant bitrate, so that the size per minute is predictable (libsndfile's Opus encoder has no mode)
+            kwargs["bitrate_mode"] = "CONSTANT"
+        self._file = sf.SoundFile(
+            self._tmp_path or target, "w", samplerate=sample_rate, channels=1,
+            format=file_format, subtype=subtype, **kwargs,
+        )
+
+    def write(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if self.output_format != "wav":
+            # integer and lossy codecs wrap or distort above full scale
+            chunk = np.clip(chunk, -1.0, 1.0)
+        self._file.write(chunk)
+        self.frames += len(chunk)
+
+    def close(self):
+        """Finish the file, returns EncodedAudio (size is that of the file, or of all bytes streamed)"""
+        self._file.close()
+        if self._tmp_path is not None:
+            os.replace(self._tmp_path, self.target)
+            size = os.path.getsize(self.target)
+        else:
+            size = self.target.size
+        return EncodedAudio(
+            self.target if isinstance(self.target, str) else None,
+            self.output_format, self.sample_rate, self.frames, size,
+        )
+
+    def abort(self):
+        """Drop a partial file (client disconnected, synthesis failed)"""
+        self._file.close()
+        if self._tmp_path is not None and os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def encode_file(path, audio, sample_rate, output_format="wav", compression_level=None):
+    """Write a whole waveform, returns EncodedAudio"""
+    encoder = StreamingEncoder(path, sample_rate, output_format, compression_level)
+    try:
+        encoder.write(audio)
+    except BaseException:
+        encoder.abort()
+        raise
+    return encoder.close()
+
+
+def iter_encoded(audio_chunks, sample_rate, output_format, compression_level=None):
+    """Encode an iterable of float32 chunks into a byte stream, yielding bytes as soon as the codec emits them"""
+    sink = ByteStreamSink()
+    encoder = StreamingEncoder(sink, sample_rate, output_format, compression_level)
+    try:
+        for chunk in audio_chunks:
+            encoder.write(chunk)
+            data = sink.take()
+            if data:
+                yield data
+    except BaseException:
+        encoder.abort()
+        raise
+    encoder.close()
+    data = sink.take()
+    if data:
+        yield data
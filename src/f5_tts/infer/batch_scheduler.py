@@ -0,0 +1,280 @@
+# Cross-request dynamic batching for CFM sampling
+# Jobs from concurrent requests (possibly different voices) are collected for a short
+# window and their text chunks merged into padded CFM.sample batches under a frame budget.
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+from f5_tts.infer.utils_infer import (
+    cross_fade_duration,
+    cfg_strength,
+    decode_generated,
+    cross_fade_waves,
+    mel_spec_type,
+    nfe_step,
+    prepare_batch_inputs,
+    sample_batch,
+    speed,
+    sway_sampling_coef,
+    target_rms,
+    target_sample_rate,
+)
+from f5_tts.model import CFGSchedule
+
+logger = logging.getLogger(__name__)
+
+
+class SynthesisJob:
+    """One synthesis request, split into text chunks that are sampled as separate batch items."""
+
+    def __init__(self, cond, ref_audio_len, rms, texts, durations, sampling_key, options):
+        self.cond = cond
+        self.ref_audio_len = ref_audio_len
+        self.rms = rms
+        self.texts = texts
+        self.durations = durations
+        self.sampling_key = sampling_key  # only jobs with equal sampling params share a CFM.sample call
+        self.options = options
+
+        self.future = Future()
+        self.waves = [None] * len(texts)
+        self.spectrograms = [None] * len(texts)
+        self.remaining = len(texts)
+        self.submitted_at = time.time()
+        self.started_at = None
+
+
+class BatchScheduler:
+    """
+    In-process scheduler merging pending synthesis jobs into padded CFM.sample batches.
+
+    submit() has the same arguments as infer_batch_process and returns a Future resolving
+    to (final_wave, sample_rate, combined_spectrogram). A worker thread waits up to
+    batch_window seconds after the oldest pending chunk for more work, then packs chunks
+    in arrival order into one batch while batch_size * longest_duration <= max_frames_per_batch.
+    """
+
+    def __init__(
+        self,
+        model_obj,
+        vocoder,
+        mel_spec_type=mel_spec_type,
+        max_frames_per_batch=8192,
+        batch_window=0.05,
+        device=None,
+        stats_window=200,
+    ):
+        self.model_obj = model_obj
+        self.vocoder = vocoder
+        self.mel_spec_type = mel_spec_type
+        self.max_frames_per_batch = max_frames_per_batch
+        self.batch_window = batch_window
+        self.device = device
+
+        self._pending = deque()  # (job, chunk index)
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+        # metrics
+        self._jobs_done = 0
+        self._batches_done = 0
+        self._wait_times = deque(maxlen=stats_window)
+        self._fill_ratios = deque(maxlen=stats_window)
+        self._batch_sizes = deque(maxlen=stats_window)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="f5tts-batch-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            pending, self._pending = self._pending, deque()
+            self._condition.notify_all()
+        for job, _ in pending:
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("Batch scheduler stopped"))
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(
+        self,
+        ref_audio,
+        ref_text,
+        gen_text_batches,
+        target_rms=target_rms,
+        cross_fade_duration=cross_fade_duration,
+        nfe_step=nfe_step,
+        cfg_strength=cfg_strength,
+        sway_sampling_coef=sway_sampling_coef,
+        speed=speed,
+        fix_duration=None,
+        ode_method=None,
+        cfg_schedule=None,
+    ):
+        cond, ref_audio_len, rms, texts, durations = prepare_batch_inputs(
+            ref_audio,
+            ref_text,
+            gen_text_batches,
+            self.model_obj,
+            target_rms=target_rms,
+            speed=speed,
+            fix_duration=fix_duration,
+            device=self.device,
+        )
+        job = SynthesisJob(
+            cond,
+            ref_audio_len,
+            rms,
+            texts,
+            durations,
+            sampling_key=(nfe_step, cfg_strength, sway_sampling_coef, ode_method, CFGSchedule.from_config(cfg_schedule)),
+            options=dict(target_rms=target_rms, cross_fade_duration=cross_fade_duration),
+        )
+
+        if not texts:
+            job.future.set_result((np.array([]), target_sample_rate, None))
+            return job.future
+
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("Batch scheduler stopped")
+            self._pending.extend((job, i) for i in range(len(texts)))
+            self._condition.notify_all()
+        return job.future
+
+    def stats(self):
+        with self._condition:
+            queue_depth = len(self._pending)
+            pending_jobs = len({id(job) for job, _ in self._pending})
+            wait_times = list(self._wait_times)
+            fill_ratios = list(self._fill_ratios)
+            batch_sizes = list(self._batch_sizes)
+            return {
+                "queue_depth": queue_depth,
+                "pending_jobs": pending_jobs,
+                "jobs_done": self._jobs_done,
+                "batches_done": self._batches_done,
+                "batch_window": self.batch_window,
+                "max_frames_per_batch": self.max_frames_per_batch,
+                "avg_batch_size": float(np.mean(batch_sizes)) if batch_sizes else None,
+                "avg_fill_ratio": float(np.mean(fill_ratios)) if fill_ratios else None,
+                "avg_wait_time": float(np.mean(wait_times)) if wait_times else None,
+                "max_wait_time": float(np.max(wait_times)) if wait_times else None,
+            }
+
+    def _batch_full(self):
+        """Whether the chunks _take_batch would batch with the oldest one fill the budget (called with the lock held)"""
+        sampling_key = self._pending[0][0].sampling_key
+        frames = [job.durations[i] for job, i in self._pending if job.sampling_key == sampling_key]
+        return len(frames) * max(frames) >= self.max_frames_per_batch
+
+    def _take_batch(self):
+        """Pop the next batch of compatible chunks in arrival order (called with the lock held)"""
+        sampling_key = self._pending[0][0].sampling_key
+        batch, rest = [], deque()
+        longest = 0
+        for job, i in self._pending:
+            if job.future.done():  # another chunk of this job failed, drop the rest
+                continue
+            duration = job.durations[i]
+            fits = (len(batch) + 1) * max(longest, duration) <= self.max_frames_per_batch
+            if job.sampling_key == sampling_key and (fits or not batch):
+                batch.append((job, i))
+                longest = max(longest, duration)
+            else:
+                rest.append((job, i))
+        self._pending = rest
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+
+                # wait for more work until the window of the oldest chunk closes or the budget is full
+                deadline = self._pending[0][0].submitted_at + self.batch_window
+                while not self._stopped and not self._batch_full():
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._stopped:
+                    return
+
+                batch = self._take_batch()
+
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        nfe, cfg, sway, method, schedule = batch[0][0].sampling_key
+        durations = [job.durations[i] for job, i in batch]
+
+        now = time.time()
+        with self._condition:
+            for job, _ in batch:
+                if job.started_at is None:
+                    job.started_at = now
+                    self._wait_times.append(now - job.submitted_at)
+            self._batch_sizes.append(len(batch))
+            self._fill_ratios.append(sum(durations) / self.max_frames_per_batch)
+            self._batches_done += 1
+
+        try:
+            with torch.inference_mode():
+                generated_mels = sample_batch(
+                    self.model_obj,
+                    [job.cond for job, _ in batch],
+                    [job.texts[i] for job, i in batch],
+                    durations,
+                    nfe_step=nfe,
+                    cfg_strength=cfg,
+                    sway_sampling_coef=sway,
+                    ode_method=method,
+                    cfg_schedule=schedule,
+                )
+                for (job, i), generated in zip(batch, generated_mels):
+                    if job.future.done():  # an earlier chunk of this job already failed
+                        continue
+                    job.waves[i], job.spectrograms[i] = decode_generated(
+                        generated,
+                        job.ref_audio_len,
+                        self.vocoder,
+                        self.mel_spec_type,
+                        rms=job.rms,
+                        target_rms=job.options["target_rms"],
+                    )
+                    job.remaining -= 1
+                    if job.remaining == 0:
+                        self._finish(job)
+                del generated_mels
+            torch.cuda.empty_cache()
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} chunks failed: {e}")
+            for job, _ in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+
+    def _finish(self, job):
+        final_wave = cross_fade_waves(job.waves, job.options["cross_fade_duration"])
+        combined_spectrogram = np.concatenate(job.spectrograms, axis=1)
+        job.future.set_result((final_wave, target_sample_rate, combined_spectrogram))
+        with self._condition:
+            self._jobs_done += 1
+        logger.info(
+            f"Job with {len(job.waves)} chunks done, waited {job.started_at - job.submitted_at:.3f}s, "
+            f"total {time.time() - job.submitted_at:.3f}s"
+        )
@@ -0,0 +1,203 @@
+# Opt-in torch.compile inference path (mainly for CPU serving)
+# Sampled sequence lengths are rounded up to a few buckets (padding masked in CFM.sample) and
+# vocoder inputs are padded the same way, so compiled graphs are reused instead of recompiled
+# for every new duration.
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+import torch
+import torch.nn.functional as F
+
+from f5_tts.infer.utils_infer import hop_length, mel_spec_type, n_mel_channels
+from f5_tts.model import DiT, UNetT
+from f5_tts.model.utils import get_bucket
+
+logger = logging.getLogger(__name__)
+
+# mel frames (24 kHz, hop 256: ~93.75 frames per second), up to the 4096 frames CFM.sample allows
+default_buckets = [256, 512, 768, 1024, 1280, 1536, 2048, 2560, 3072, 4096]
+
+# log mel of silence (MelSpec clamps at 1e-5 before the log)
+mel_padding_value = -11.5129
+
+
+def get_compile_targets(transformer):
+    """Submodules of a backbone doing the per-step heavy lifting"""
+    if isinstance(transformer, DiT):
+        return list(transformer.transformer_blocks)
+    if isinstance(transformer, UNetT):
+        return [module for (_, _, attn, _, ff) in transformer.layers for module in (attn, ff)]
+    raise ValueError(f"Compiled inference supports DiT and UNetT, got {type(transformer).__name__}")
+
+
+class CompiledInference:
+    """
+    Compiles the transformer blocks of a CFM model (DiT or UNetT) and its vocoder with torch.compile
+    and keeps track of compile time, graph reuse and latency per (kind, batch, bucket).
+
+    The first call of a new shape pays for compilation and is recorded as compile time; later calls
+    with the same shape are cache hits. Sequences longer than the largest bucket run unbucketed
+    (and recompile), they are reported under bucket None.
+    """
+
+    def __init__(self, model_obj, vocoder=None, mel_spec_type=mel_spec_type, buckets=None, mode=None, batch_sizes=(1,)):
+        self.model_obj = model_obj
+        self.vocoder = vocoder
+        self.mel_spec_type = mel_spec_type
+        self.buckets = sorted(buckets or default_buckets)
+        self.mode = mode
+        self.batch_sizes = tuple(batch_sizes)  # request batch sizes warmed up and budgeted for
+
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._compile_times = {}
+        self._hits = defaultdict(int)
+        self._latencies = defaultdict(lambda: deque(maxlen=200))
+        self._warming_up = False
+        self.compiled = False
+
+    def compile(self):
+        if self.compiled:
+            return self
+
+        self._raise_cache_size_limit(self.batch_sizes)
+        for module in get_compile_targets(self.model_obj.transformer):
+            module.compile(dynamic=False, mode=self.mode)
+        self.model_obj.duration_buckets = self.buckets
+        self._wrap_sample()
+
+        if self.vocoder is not None:
+            if self.mel_spec_type == "vocos":
+                self.vocoder.backbone.compile(dynamic=False, mode=self.mode)
+                self.vocoder.decode = self._wrap_vocoder(self.vocoder.decode)
+            else:
+                self.vocoder.compile(dynamic=False, mode=self.mode)
+                self.vocoder.forward = self._wrap_vocoder(self.vocoder.forward)
+
+        self.compiled = True
+        logger.info(f"Compiled inference enabled, buckets: {self.buckets}")
+        return self
+
+    def traced_variants(self, batch_sizes):
+        """
+        Graphs torch.compile keeps for the bucketed shapes of these request batch sizes. Compiled modules
+        share the code object of nn.Module._call_impl, whose cache holds one entry per module and input
+        shape: transformer blocks see b (conditional only steps) and 2b (fused CFG) rows per bucket, always
+        with a padding mask, the vocoder b rows per bucket.
+        """
+        block_batches = {rows for batch in batch_sizes for rows in (batch, 2 * batch)}
+        variants = len(get_compile_targets(self.model_obj.transformer)) * len(block_batches) * len(self.buckets)
+        if self.vocoder is not None:
+            variants += len(set(batch_sizes)) * len(self.buckets)
+        return variants
+
+    def _raise_cache_size_limit(self, batch_sizes):
+        # past the limit dynamo silently runs a module eagerly
+        variants = self.traced_variants(batch_sizes)
+        config = torch._dynamo.config
+        config.cache_size_limit = max(config.cache_size_limit, variants)
+        if hasattr(config, "accumulated_cache_size_limit"):
+            config.accumulated_cache_size_limit = max(config.accumulated_cache_size_limit, variants)
+
+    def _record(self, key, elapsed):
+        with self._lock:
+            if key not in self._seen or self._warming_up:
+                self._seen.add(key)
+                self._compile_times[key] = self._compile_times.get(key, 0.0) + elapsed
+            else:
+                self._hits[key] += 1
+                self._latencies[key].append(elapsed)
+
+    def _wrap_sample(self):
+        sample = self.model_obj.sample
+
+        def timed_sample(*args, **kwargs):
+            start = time.time()
+            out, trajectory = sample(*args, **kwargs)
+            length = out.shape[1]
+            bucket = length if length in self.buckets else None
+            self._record(("model", out.shape[0], bucket), time.time() - start)
+            return out, trajectory
+
+        self.model_obj.sample = timed_sample
+
+    def _wrap_vocoder(self, decode):
+        def bucketed_decode(mel):  # mel: b d n
+            start = time.time()
+            frames = mel.shape[-1]
+            bucket = get_bucket(frames, self.buckets)
+            if bucket > frames:
+                mel = F.pad(mel, (0, bucket - frames), value=mel_padding_value)
+            wave = decode(mel)
+            if bucket > frames:
+                wave = wave[..., : wave.shape[-1] - (bucket - frames) * hop_length]
+            self._record(("vocoder", mel.shape[0], bucket if bucket in self.buckets else None), time.time() - start)
+            return wave
+
+        return bucketed_decode
+
+    @torch.inference_mode()
+    def warm_up(self, buckets=None, batch_sizes=None, nfe_step=2, cfg_strength=2.0):
+        """
+        Compile the graphs of the given buckets ahead of the first request (all buckets by default).
+        Durations are one frame short of the bucket, so the padded, masked shapes of real requests are
+        traced, with the fused CFG batch (cfg_strength) and the conditional only batch (cfg-free steps).
+        """
+        self.compile()
+        batch_sizes = tuple(batch_sizes or self.batch_sizes)
+        self._raise_cache_size_limit(set(self.batch_sizes) | set(batch_sizes))
+        device = next(self.model_obj.parameters()).device
+        dtype = next(self.model_obj.parameters()).dtype
+        start = time.time()
+
+        self._warming_up = True  # every warm-up call of a shape compiles, none is a cache hit
+        try:
+            for bucket in buckets or self.buckets:
+                for batch in batch_sizes:
+                    ref_len = bucket // 2
+                    for strength in (cfg_strength, 0.0):
+                        self.model_obj.sample(
+                            cond=torch.zeros(batch, ref_len, n_mel_channels, device=device, dtype=dtype),
+                            text=[["a"] * (ref_len // 4)] * batch,
+                            duration=bucket - 1,
+                            steps=nfe_step,
+                            cfg_strength=strength,
+                            sway_sampling_coef=-1.0,
+                        )
+                    if self.vocoder is not None:
+                        mel = torch.zeros(batch, n_mel_channels, bucket - 1, device=device)
+                        if self.mel_spec_type == "vocos":
+                            self.vocoder.decode(mel)
+                        else:
+                            self.vocoder(mel)
+                logger.info(f"Warmed up bucket {bucket} in {time.time() - start:.1f}s")
+        finally:
+            self._warming_up = False
+
+        logger.info(f"Compiled inference warm-up done in {time.time() - start:.1f}s")
+
+    def stats(self):
+        with self._lock:
+            per_bucket = []
+            for key in sorted(self._seen, key=lambda k: (k[0], k[1], k[2] or 1 << 30)):
+                kind, batch, bucket = key
+                latencies = list(self._latencies.get(key, []))
+                per_bucket.append(
+                    {
+                        "kind": kind,
+                        "batch": batch,
+                        "bucket": bucket,
+                        "compile_time": round(self._compile_times[key], 3),
+                        "cache_hits": self._hits[key],
+                        "avg_latency": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                    }
+                )
+            return {
+                "compiled": self.compiled,
+                "buckets": self.buckets,
+                "total_compile_time": round(sum(self._compile_times.values()), 3),
+                "cache_hits": sum(self._hits.values()),
+                "per_bucket": per_bucket,
+            }
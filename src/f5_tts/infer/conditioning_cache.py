@@ -0,0 +1,144 @@
+# Content-addressed cache of preprocessed reference voices
+# Skips the pydub decode / silence clipping / transcription / resample / mel pipeline
+# for reference audio that was seen before, in memory (LRU) and across restarts (on disk).
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import torch
+
+from f5_tts.infer.utils_infer import (
+    hop_length,
+    load_ref_audio,
+    mel_spec_type,
+    n_fft,
+    n_mel_channels,
+    prepare_ref_conditioning,
+    preprocess_ref_audio_text,
+    target_rms,
+    target_sample_rate,
+    win_length,
+    ReferenceConditioning,
+)
+
+# bump when preprocess_ref_audio_text / prepare_ref_conditioning change their output
+CACHE_VERSION = 1
+
+
+class ConditioningCache:
+    def __init__(self, cache_dir=None, max_items=16, target_rms=target_rms, mel_spec_type=mel_spec_type):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.target_rms = target_rms
+        self.mel_spec_type = mel_spec_type
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, ref_audio_orig, ref_text="", clip_short=True):
+        """md5 of the raw reference file plus every parameter the preprocessing depends on"""
+        with open(ref_audio_orig, "rb") as f:
+            audio_hash = hashlib.md5(f.read()).hexdigest()
+        params = {
+            "version": CACHE_VERSION,
+            "ref_text": ref_text.strip(),
+            "clip_short": clip_short,
+            "target_rms": self.target_rms,
+            "target_sample_rate": target_sample_rate,
+            "mel": [self.mel_spec_type, n_fft, hop_length, win_length, n_mel_channels],
+        }
+        params_hash = hashlib.md5(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        return f"{audio_hash}_{params_hash[:16]}"
+
+    def get(self, ref_audio_orig, ref_text="", clip_short=True, show_info=print):
+        """Return the ReferenceConditioning of a reference file, preprocessing it only on a cache miss"""
+        key = self.make_key(ref_audio_orig, ref_text, clip_short)
+
+        with self._lock:
+            conditioning = self._entries.get(key)
+            if conditioning is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return conditioning
+
+        conditioning = self._load(key)
+        if conditioning is not None:
+            show_info("Using cached reference conditioning...")
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            conditioning = self._create(ref_audio_orig, ref_text, clip_short, show_info)
+            self._save(key, conditioning)
+
+        with self._lock:
+            self._entries[key] = conditioning
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+        return conditioning
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self._entries),
+                "max_items": self.max_items,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "cache_dir": self.cache_dir,
+            }
+
+    def _create(self, ref_audio_orig, ref_text, clip_short, show_info):
+        processed_audio, processed_text = preprocess_ref_audio_text(
+            ref_audio_orig, ref_text, clip_short=clip_short, show_info=show_info
+        )
+        try:
+            audio, sr = load_ref_audio(processed_audio, show_info=show_info)
+        finally:
+            # preprocess_ref_audio_text leaves its trimmed copy in a temp file
+            if processed_audio != ref_audio_orig and os.path.exists(processed_audio):
+                os.remove(processed_audio)
+
+        return prepare_ref_conditioning(
+            (audio, sr), processed_text, target_rms=self.target_rms, mel_spec_type=self.mel_spec_type, device="cpu"
+        )
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pt")
+
+    def _load(self, key):
+        if not self.cache_dir or not os.path.exists(self._path(key)):
+            return None
+        try:
+            return ReferenceConditioning.from_dict(torch.load(self._path(key), map_location="cpu", weights_only=True))
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable conditioning cache entry {key}: {e}")
+            return None
+
+    def _save(self, key, conditioning):
+        if not self.cache_dir:
+            return
+        # write then rename, so that concurrent workers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            torch.save(conditioning.to_dict(), tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            print(f"⚠️ Could not write conditioning cache entry {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -27,6 +27,7 @@ from f5_tts.infer.utils_infer import (
     preprocess_ref_audio_text,
     remove_silence_for_generated_wav,
 )
+from f5_tts.infer.transcription_cache import get_transcription_cache
 from f5_tts.model import DiT, UNetT  # noqa: F401. used for config
 
 parser = argparse.ArgumentParser(
@@ -357,9 +358,9 @@ def validate_and_process_audio(audio_path, min_duration=3.0, max_duration=15.0):
         return False, f"Failed to validate audio: {str(e)}", None
 
 
-def transcribe_with_whisper(whisper_model, audio_path, language="vi"):
-    """Transcribe audio file with error handling and quality checks."""
-    try:
+def transcribe_with_whisper(whisper_model, audio_path, language="vi", asr_model="faster-whisper/base/vad"):
+    """Transcribe audio file with error handling and quality checks (cached by audio content)."""
+    def run_whisper():
         print(f"  -> Transcribing {audio_path} with Faster-Whisper (language: {language})...")
 
         # Transcribe with word-level timestamps for better accuracy
@@ -371,14 +372,17 @@ def transcribe_with_whisper(whisper_model, audio_path, language="vi"):
             vad_parameters=dict(min_silence_duration_ms=500)
         )
 
-        transcription = "".join([segment.text for segment in segments]).strip()
+        # Clean up transcription
+        return re.sub(r'\s+', ' ', "".join([segment.text for segment in segments]).strip())  # Remove extra spaces
+
+    try:
+        transcription = get_transcription_cache().get_or_transcribe(
+            audio_path, asr_model, language, run_whisper, show_info=lambda msg: print(f"  -> {msg}")
+        )
 
         if not transcription:
             raise ValueError(f"Transcription is empty for {audio_path}. Audio may contain no speech.")
 
-        # Clean up transcription
-        transcription = re.sub(r'\s+', ' ', transcription)  # Remove extra spaces
-
         print(f"  -> Transcribed successfully: {transcription[:100]}{'...' if len(transcription) > 100 else ''}")
         return transcription
 
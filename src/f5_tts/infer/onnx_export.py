@@ -0,0 +1,174 @@
+# Export DiT (CFG-fused forward) and Vocos (decode up to the spectrum) to ONNX for the onnxruntime backend
+# in onnx_runtime.py
+#
+# e.g.
+# python src/f5_tts/infer/onnx_export.py -n F5TTS_Base -c ckpts/your_training_dataset/model_last.pt \
+#     -v data/Emilia_ZH_EN_pinyin/vocab.txt -o ckpts/onnx
+
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import argparse
+from importlib.resources import files
+
+import torch
+from omegaconf import OmegaConf
+from torch import nn
+
+from f5_tts.infer.onnx_runtime import DIT_FORMAT, VOCOS_FORMAT
+from f5_tts.infer.utils_infer import load_model, load_vocoder
+from f5_tts.model import DiT, UNetT  # noqa: F401. used for config
+
+default_opset_version = 17  # scaled_dot_product_attention needs >= 14
+
+
+class DiTCFGForward(nn.Module):
+    """DiT.forward with cfg_infer: x, cond, text, time [b], mask [b n] -> cond & uncond prediction [2b n d]"""
+
+    def __init__(self, transformer: DiT):
+        super().__init__()
+        self.transformer = transformer
+
+    def forward(self, x, cond, text, time, mask):
+        return self.transformer(
+            x=x, cond=cond, text=text, time=time, drop_audio_cond=False, drop_text=False, mask=mask, cfg_infer=True
+        )
+
+
+class VocosSpectrum(nn.Module):
+    """Vocos.decode up to the complex spectrum (real, imag), the inverse STFT is done by onnx_runtime.istft"""
+
+    def __init__(self, vocoder):
+        super().__init__()
+        self.backbone = vocoder.backbone
+        self.out = vocoder.head.out
+
+    def forward(self, mel):  # b d n
+        x = self.out(self.backbone(mel)).transpose(1, 2)
+        mag, p = x.chunk(2, dim=1)
+        mag = torch.clip(torch.exp(mag), max=1e2)  # as vocos.heads.ISTFTHead
+        return mag * torch.cos(p), mag * torch.sin(p)
+
+
+def set_metadata(path, metadata):
+    import onnx
+
+    model = onnx.load(path)
+    onnx.helper.set_model_props(model, {key: str(value) for key, value in metadata.items()})
+    onnx.save(model, path)
+
+
+def export_dit(model, path, opset_version=default_opset_version):
+    """Export model.transformer (DiT) of a CFM model, the model is moved to cpu / fp32"""
+    transformer = model.transformer
+    if not isinstance(transformer, DiT):
+        raise ValueError(f"ONNX export supports DiT, got {type(transformer).__name__}")
+    wrapper = DiTCFGForward(transformer.to("cpu", dtype=torch.float32)).eval()
+
+    mel_dim = transformer.input_embed.mel_dim
+    text_num_embeds = transformer.text_embed.text_embed.num_embeddings - 1
+    batch, seq_len, text_len = 2, 256, 64
+    inputs = (
+        torch.randn(batch, seq_len, mel_dim),
+        torch.randn(batch, seq_len, mel_dim),
+        torch.randint(0, text_num_embeds, (batch, text_len)),
+        torch.rand(batch),
+        torch.ones(batch, seq_len, dtype=torch.bool),
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            inputs,
+            path,
+            input_names=["x", "cond", "text", "time", "mask"],
+            output_names=["pred"],
+            dynamic_axes={
+                "x": {0: "batch", 1: "seq_len"},
+                "cond": {0: "batch", 1: "seq_len"},
+                "text": {0: "batch", 1: "text_len"},
+                "time": {0: "batch"},
+                "mask": {0: "batch", 1: "seq_len"},
+                "pred": {0: "cfg_batch", 1: "seq_len"},
+            },
+            opset_version=opset_version,
+            do_constant_folding=True,
+        )
+    set_metadata(path, {"format": DIT_FORMAT, "mel_dim": mel_dim, "text_num_embeds": text_num_embeds})
+    print(f"Exported DiT to {path}")
+
+
+def export_vocos(vocoder, path, opset_version=default_opset_version):
+    istft = vocoder.head.istft
+    if istft.win_length != istft.n_fft:
+        raise ValueError("onnx_runtime.istft expects win_length == n_fft")
+    wrapper = VocosSpectrum(vocoder.to("cpu", dtype=torch.float32)).eval()
+    mel_dim = vocoder.backbone.embed.in_channels
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            (torch.randn(1, mel_dim, 256),),
+            path,
+            input_names=["mel"],
+            output_names=["real", "imag"],
+            dynamic_axes={
+                "mel": {0: "batch", 2: "frames"},
+                "real": {0: "batch", 2: "frames"},
+                "imag": {0: "batch", 2: "frames"},
+            },
+            opset_version=opset_version,
+            do_constant_folding=True,
+        )
+    set_metadata(
+        path,
+        {
+            "format": VOCOS_FORMAT,
+            "n_fft": istft.n_fft,
+            "hop_length": istft.hop_length,
+            "win_length": istft.win_length,
+            "padding": istft.padding,
+        },
+    )
+    print(f"Exported Vocos to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export DiT and Vocos for the onnxruntime backend")
+    parser.add_argument("-n", "--model", default="F5TTS_Base", help="config name under f5_tts/configs")
+    parser.add_argument("-c", "--ckpt_file", required=True)
+    parser.add_argument("-v", "--vocab_file", default="")
+    parser.add_argument("-o", "--output_dir", default="ckpts/onnx")
+    parser.add_argument("--vocoder_local_path", default=None)
+    parser.add_argument("--opset_version", default=default_opset_version, type=int)
+    args = parser.parse_args()
+
+    model_cfg = OmegaConf.load(str(files("f5_tts").joinpath(f"configs/{args.model}.yaml")))
+    model_cls = globals()[model_cfg.model.backbone]
+    mel_spec_type = model_cfg.model.mel_spec.mel_spec_type
+    if mel_spec_type != "vocos":
+        raise ValueError("ONNX export supports the vocos vocoder only")
+
+    model = load_model(
+        model_cls,
+        model_cfg.model.arch,
+        args.ckpt_file,
+        mel_spec_type=mel_spec_type,
+        vocab_file=args.vocab_file,
+        device="cpu",
+        dtype="fp32",
+    )
+    vocoder = load_vocoder(
+        mel_spec_type, args.vocoder_local_path is not None, args.vocoder_local_path or "", device="cpu"
+    )
+
+    export_dit(model, os.path.join(args.output_dir, "dit.onnx"), opset_version=args.opset_version)
+    export_vocos(vocoder, os.path.join(args.output_dir, "vocos.onnx"), opset_version=args.opset_version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# onnxruntime execution backend
+# Runs the Euler / sway-sampling loop of CFM.sample in NumPy around an exported DiT (see onnx_export.py)
+# and decodes mels with an exported Vocos, whose inverse STFT has no ONNX export and is done here.
+# sample_numpy / decode_numpy only need numpy and onnxruntime. sample / decode wrap them for the
+# torch tensors infer_batch_process passes around, so ONNXCFM and ONNXVocos stand in for
+# (model_obj, vocoder) there.
+import numpy as np
+import onnxruntime as ort
+
+DIT_FORMAT = "f5_tts_dit_cfg"
+VOCOS_FORMAT = "f5_tts_vocos_spectrum"
+
+
+def get_session(path, providers=None, num_threads=None):
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return ort.InferenceSession(path, sess_options=options, providers=providers or ["CPUExecutionProvider"])
+
+
+def get_metadata(session, expected_format):
+    metadata = session.get_modelmeta().custom_metadata_map
+    if metadata.get("format") != expected_format:
+        raise ValueError(f"Not a {expected_format} export (format: {metadata.get('format')}), see onnx_export.py")
+    return metadata
+
+
+def text_to_ids(text, vocab_char_map, padding_value=-1):
+    """numpy list_str_to_idx: int64 [b nt] padded with -1"""
+    ids = np.full((len(text), max(len(t) for t in text)), padding_value, dtype=np.int64)
+    for i, t in enumerate(text):
+        ids[i, : len(t)] = [vocab_char_map.get(c, 0) for c in t]
+    return ids
+
+
+def get_sway_time_steps(steps, sway_sampling_coef=None, t_start=0.0):
+    t = np.linspace(t_start, 1, steps + 1, dtype=np.float32)
+    if sway_sampling_coef is not None:
+        t = t + sway_sampling_coef * (np.cos(np.pi / 2 * t) - 1 + t)
+    return t.astype(np.float32)
+
+
+class ONNXCFM:
+    """
+    CFM.sample with the euler solver on an exported DiT. Every step is one onnxruntime call of the
+    cond & uncond batch (the graph is exported with CFG fused), so a cfg_schedule only changes the
+    guidance strength per step and never skips the unconditional half.
+    """
+
+    def __init__(self, dit_path, vocab_char_map, mel_spec=None, providers=None, num_threads=None):
+        self.session = get_session(dit_path, providers=providers, num_threads=num_threads)
+        metadata = get_metadata(self.session, DIT_FORMAT)
+        self.num_channels = int(metadata["mel_dim"])
+        self.vocab_char_map = vocab_char_map
+        self.mel_spec = mel_spec  # reference audio -> mel in prepare_batch_inputs, a MelSpec is created if None
+        self.device = "cpu"
+
+    def run_dit(self, x, cond, text, time, mask):
+        (pred,) = self.session.run(None, {"x": x, "cond": cond, "text": text, "time": time, "mask": mask})
+        return np.split(pred, 2, axis=0)  # cond, uncond
+
+    def sample_numpy(
+        self,
+        cond,  # float32 [b n d] reference mel
+        text,  # int64 [b nt], -1 padded, or list of char lists
+        duration,  # int or int [b]
+        lens=None,  # int [b] reference lengths
+        steps=32,
+        cfg_strength=1.0,
+        sway_sampling_coef=None,
+        seed=None,
+        max_duration=4096,
+        cfg_schedule=None,
+        y0=None,  # float32 [b max_duration d], e.g. the torch noise for parity checks
+        step_callback=None,
+    ):
+        if isinstance(text, list):
+            text = text_to_ids(text, self.vocab_char_map)
+        cond = np.asarray(cond, dtype=np.float32)
+        batch, cond_seq_len = cond.shape[:2]
+        lens = np.full((batch,), cond_seq_len, dtype=np.int64) if lens is None else np.asarray(lens, dtype=np.int64)
+
+        # same duration bounds as CFM.sample
+        duration = np.broadcast_to(np.asarray(duration, dtype=np.int64), (batch,))
+        duration = np.maximum(np.maximum((text != -1).sum(axis=-1), lens) + 1, duration)
+        duration = np.minimum(duration, max_duration)
+        max_duration = int(duration.max())
+
+        cond = np.pad(cond, ((0, 0), (0, max_duration - cond_seq_len), (0, 0)))
+        cond_mask = (np.arange(max_duration)[None, :] < lens[:, None])[..., None]
+        step_cond = np.where(cond_mask, cond, 0.0).astype(np.float32)
+        mask = np.arange(max_duration)[None, :] < duration[:, None]
+
+        if y0 is None:
+            rng = np.random.default_rng(seed)
+            y0 = np.zeros((batch, max_duration, self.num_channels), dtype=np.float32)
+            for i, dur in enumerate(duration):
+                y0[i, :dur] = rng.standard_normal((dur, self.num_channels), dtype=np.float32)
+
+        t = get_sway_time_steps(steps, sway_sampling_coef)
+        x = np.asarray(y0, dtype=np.float32)
+        for i, (t0, t1) in enumerate(zip(t[:-1], t[1:])):
+            if step_callback is not None:
+                step_callback(i + 1, len(t) - 1)
+            strength = cfg_strength if cfg_schedule is None else cfg_schedule.strength(float(t0), cfg_strength)
+            pred, null_pred = self.run_dit(x, step_cond, text, np.full((batch,), t0, dtype=np.float32), mask)
+            x = x + (t1 - t0) * (pred + (pred - null_pred) * strength)
+
+        return np.where(cond_mask, cond, x).astype(np.float32)
+
+    def sample(
+        self,
+        cond,
+        text,
+        duration,
+        *,
+        lens=None,
+        steps=32,
+        cfg_strength=1.0,
+        sway_sampling_coef=None,
+        seed=None,
+        max_duration=4096,
+        fuse_cfg=True,  # always fused in the exported graph
+        ode_method=None,
+        cfg_schedule=None,
+        step_callback=None,
+    ):
+        """Same call as CFM.sample for torch inputs, returns (out, None) as there is no trajectory"""
+        import torch
+
+        from f5_tts.model.cfm import CFGSchedule
+
+        if ode_method not in (None, "euler"):
+            raise ValueError(f"The onnx backend only implements the euler solver, got '{ode_method}'")
+        if cond.ndim == 2:
+            raise ValueError("The onnx backend needs the reference as mel [b n d], not raw audio")
+
+        def to_numpy(value):
+            return value.detach().cpu().numpy() if isinstance(value, torch.Tensor) else value
+
+        out = self.sample_numpy(
+            to_numpy(cond.float()),
+            to_numpy(text),
+            to_numpy(duration),
+            lens=to_numpy(lens),
+            steps=steps,
+            cfg_strength=cfg_strength,
+            sway_sampling_coef=sway_sampling_coef,
+            seed=seed,
+            max_duration=max_duration,
+            cfg_schedule=CFGSchedule.from_config(cfg_schedule),
+            step_callback=step_callback,
+        )
+        return torch.from_numpy(out).to(cond.device), None
+
+
+def hann_window(win_length):
+    """periodic Hann window, as torch.hann_window"""
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(win_length) / win_length)).astype(np.float32)
+
+
+def istft(real, imag, n_fft, hop_length, win_length, padding="same"):
+    """
+    Inverse STFT of a [b n_fft//2+1 frames] spectrum, matching vocos.spectral_ops.ISTFT (win_length == n_fft):
+    "same" trims (win_length - hop_length) // 2 on both sides, "center" n_fft // 2 like torch.istft.
+    """
+    window = hann_window(win_length)
+    frames = np.fft.irfft(real + 1j * imag, n_fft, axis=1).astype(np.float32)
+    frames *= window[None, :, None]
+    batch, _, num_frames = frames.shape
+
+    # overlap-add, one vectorized add per hop within the window when win_length is a multiple of hop_length
+    output_size = (num_frames - 1) * hop_length + win_length
+    y = np.zeros((batch, output_size), dtype=np.float32)
+    envelope = np.zeros(output_size, dtype=np.float32)
+    if win_length % hop_length == 0:
+        for k in range(win_length // hop_length):
+            part = slice(k * hop_length, (k + 1) * hop_length)
+            out = slice(k * hop_length, k * hop_length + num_frames * hop_length)
+            y[:, out] += frames[:, part, :].transpose(0, 2, 1).reshape(batch, -1)
+            envelope[out] += np.tile(window[part] ** 2, num_frames)
+    else:
+        for i in range(num_frames):
+            y[:, i * hop_length : i * hop_length + win_length] += frames[:, :, i]
+            envelope[i * hop_length : i * hop_length + win_length] += window**2
+
+    pad = (win_length - hop_length) // 2 if padding == "same" else n_fft // 2
+    y, envelope = y[:, pad : output_size - pad], envelope[pad : output_size - pad]
+    return y / np.maximum(envelope, 1e-11)
+
+
+class ONNXVocos:
+    """Vocos.decode on an exported backbone + head: onnxruntime up to the spectrum, inverse STFT in numpy"""
+
+    def __init__(self, vocoder_path, providers=None, num_threads=None):
+        self.session = get_session(vocoder_path, providers=providers, num_threads=num_threads)
+        metadata = get_metadata(self.session, VOCOS_FORMAT)
+        self.n_fft = int(metadata["n_fft"])
+        self.hop_length = int(metadata["hop_length"])
+        self.win_length = int(metadata["win_length"])
+        self.padding = metadata["padding"]
+
+    def decode_numpy(self, mel):  # mel: float32 [b d n] -> [b nw]
+        real, imag = self.session.run(None, {"mel": np.asarray(mel, dtype=np.float32)})
+        return istft(real, imag, self.n_fft, self.hop_length, self.win_length, padding=self.padding)
+
+    def decode(self, mel):
+        import torch
+
+        return torch.from_numpy(self.decode_numpy(mel.detach().float().cpu().numpy())).to(mel.device)
+
+
+def load_onnx_backend(dit_path, vocoder_path, vocab_file, providers=None, num_threads=None):
+    """(model_obj, vocoder) for infer_process / infer_batch_process running on onnxruntime"""
+    from f5_tts.model.utils import get_tokenizer
+
+    vocab_char_map, _ = get_tokenizer(vocab_file, "custom")
+    model_obj = ONNXCFM(dit_path, vocab_char_map, providers=providers, num_threads=num_threads)
+    vocoder = ONNXVocos(vocoder_path, providers=providers, num_threads=num_threads)
+    return model_obj, vocoder
@@ -0,0 +1,124 @@
+# Dynamic int8 quantization for CPU serving
+# The attention / feed-forward nn.Linear layers of the backbone and the Vocos backbone run as
+# int8 matmuls with weights quantized once and activations quantized on the fly. Quantized
+# weights are saved to a checkpoint so that serving nodes do not quantize at every startup.
+import os
+import tempfile
+
+import torch
+from torch import nn
+
+from f5_tts.model.modules import Attention, FeedForward
+
+QUANTIZATION = "dynamic_int8"
+
+
+def get_quantizable_linears(module, parent_types=(Attention, FeedForward)):
+    """Names of the nn.Linear layers inside attention / feed-forward blocks"""
+    names = set()
+    for name, parent in module.named_modules():
+        if isinstance(parent, parent_types):
+            for sub_name, sub in parent.named_modules():
+                if isinstance(sub, nn.Linear):
+                    names.add(f"{name}.{sub_name}" if name else sub_name)
+    return names
+
+
+def quantize_model(model):
+    """In-place dynamic int8 quantization of the attention / FF linears of a CFM model (cpu, fp32)"""
+    model = model.to("cpu", dtype=torch.float32)
+    torch.ao.quantization.quantize_dynamic(
+        model.transformer, qconfig_spec=get_quantizable_linears(model.transformer), dtype=torch.qint8, inplace=True
+    )
+    if hasattr(model.transformer, "clear_time_cache"):
+        model.transformer.clear_time_cache()
+    return model
+
+
+def quantize_vocoder(vocoder):
+    """In-place dynamic int8 quantization of the Vocos backbone linears (cpu, fp32)"""
+    vocoder = vocoder.to("cpu", dtype=torch.float32)
+    torch.ao.quantization.quantize_dynamic(vocoder.backbone, qconfig_spec={nn.Linear}, dtype=torch.qint8, inplace=True)
+    return vocoder
+
+
+def get_source_info(path):
+    """Identity of the fp32 weights a quantized checkpoint is made from (path, mtime, size), None if not a file"""
+    if not path or not os.path.isfile(path):
+        return None
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "mtime": int(stat.st_mtime), "size": stat.st_size}
+
+
+def is_quantized_current(path, source_path):
+    """Whether path is a quantized checkpoint made from the current weights at source_path"""
+    if not path or not os.path.exists(path):
+        return False
+    checkpoint = torch.load(path, map_location="cpu", weights_only=True, mmap=True)
+    return checkpoint.get("source") == get_source_info(source_path)
+
+
+def save_quantized(module, path, source_path=None):
+    """
+    Write the state dict of a quantized module, tagged so that it is not mistaken for an fp32 checkpoint,
+    with the identity of the fp32 weights it was made from
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(fd)
+    try:
+        torch.save(
+            {"quantization": QUANTIZATION, "source": get_source_info(source_path), "model_state_dict": module.state_dict()},
+            tmp_path,
+        )
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"Saved {QUANTIZATION} checkpoint to {path}")
+
+
+def load_quantized(module, path):
+    checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+    if checkpoint.get("quantization") != QUANTIZATION:
+        raise ValueError(f"{path} is not a {QUANTIZATION} checkpoint")
+    module.load_state_dict(checkpoint["model_state_dict"])
+    return module
+
+
+def load_quantized_model(model, ckpt_path, quantized_ckpt_path=None, use_ema=True):
+    """
+    Quantized CFM model: loaded from quantized_ckpt_path if it was made from the current ckpt_path,
+    otherwise the fp32 checkpoint is loaded, quantized and (if quantized_ckpt_path is given) saved there.
+    """
+    from f5_tts.infer.utils_infer import load_checkpoint
+
+    if is_quantized_current(quantized_ckpt_path, ckpt_path):
+        print(f"Load {QUANTIZATION} model from {quantized_ckpt_path}")
+        model = quantize_model(model)  # same module structure, weights are overwritten below
+        return load_quantized(model, quantized_ckpt_path).eval()
+
+    if quantized_ckpt_path and os.path.exists(quantized_ckpt_path):
+        print(f"{quantized_ckpt_path} was quantized from other weights than {ckpt_path}, quantizing again")
+    model = load_checkpoint(model, ckpt_path, "cpu", dtype=torch.float32, use_ema=use_ema)
+    model = quantize_model(model)
+    if quantized_ckpt_path:
+        save_quantized(model, quantized_ckpt_path, source_path=ckpt_path)
+    return model.eval()
+
+
+def load_quantized_vocoder(vocoder, quantized_path=None, source_path=None):
+    """
+    Same as load_quantized_model for an already constructed Vocos (source_path: its fp32 weights file),
+    which must hold the fp32 weights unless quantized_path is current (see is_quantized_current)
+    """
+    if is_quantized_current(quantized_path, source_path):
+        print(f"Load {QUANTIZATION} vocoder from {quantized_path}")
+        return load_quantized(quantize_vocoder(vocoder), quantized_path).eval()
+
+    if quantized_path and os.path.exists(quantized_path):
+        print(f"{quantized_path} was quantized from other weights than {source_path}, quantizing again")
+    vocoder = quantize_vocoder(vocoder)
+    if quantized_path:
+        save_quantized(vocoder, quantized_path, source_path=source_path)
+    return vocoder.eval()
@@ -0,0 +1,166 @@
+# Serving checkpoint: EMA weights only, keys as in CFM.state_dict(), fp16 / bf16 safetensors
+# load_model memory-maps it into a model built on the meta device (load_state_dict(assign=True)), so
+# startup neither reads optimizer state nor holds the weights twice.
+#
+# e.g.
+# python src/f5_tts/infer/serving_checkpoint.py -c ckpts/your_training_dataset/model_last.pt \
+#     -o ckpts/your_training_dataset/model_serving.safetensors --dtype fp16 --vocoder_dir ckpts/vocos-mel-24khz
+
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+import argparse
+import shutil
+
+import torch
+from safetensors import safe_open
+from safetensors.torch import load_file, save_file
+
+from f5_tts.infer.utils_infer import get_dtype, normalize_ema_state_dict
+from f5_tts.model.modules import precompute_freqs_cis
+
+SERVING_FORMAT = "f5_tts_serving"
+
+
+def get_source_metadata(checkpoint_path):
+    """Identity of the training checkpoint a serving checkpoint is extracted from (safetensors metadata is str)"""
+    stat = os.stat(checkpoint_path)
+    return {
+        "source_path": os.path.abspath(checkpoint_path),
+        "source_mtime": str(int(stat.st_mtime)),
+        "source_size": str(stat.st_size),
+    }
+
+
+def extract_and_save_ema_model(checkpoint_path: str, new_checkpoint_path: str, safetensors: bool, dtype=None) -> str:
+    """
+    Prune a training checkpoint to its EMA weights ("Prune Checkpoint" of finetune_gradio.py).
+    With dtype (fp16 | bf16 | fp32) the serving checkpoint is written instead: normalised keys,
+    weights cast to dtype, always safetensors.
+    """
+    try:
+        if checkpoint_path.endswith(".safetensors"):
+            checkpoint = {"ema_model_state_dict": load_file(checkpoint_path, device="cpu")}
+        else:
+            checkpoint = torch.load(checkpoint_path, map_location="cpu", weights_only=True, mmap=True)
+        print("Original Checkpoint Keys:", checkpoint.keys())
+
+        ema_model_state_dict = checkpoint.get("ema_model_state_dict", None)
+        if ema_model_state_dict is None:
+            return "No 'ema_model_state_dict' found in the checkpoint."
+
+        if dtype is not None:
+            torch_dtype = get_dtype(dtype)
+            state_dict = {
+                key: (value.to(torch_dtype) if value.is_floating_point() else value).contiguous()
+                for key, value in normalize_ema_state_dict(ema_model_state_dict).items()
+            }
+            new_checkpoint_path = os.path.splitext(new_checkpoint_path)[0] + ".safetensors"
+            metadata = {"format": SERVING_FORMAT, "dtype": str(torch_dtype), **get_source_metadata(checkpoint_path)}
+            save_file(state_dict, new_checkpoint_path, metadata=metadata)
+        elif safetensors:
+            new_checkpoint_path = new_checkpoint_path.replace(".pt", ".safetensors")
+            save_file(ema_model_state_dict, new_checkpoint_path)
+        else:
+            new_checkpoint_path = new_checkpoint_path.replace(".safetensors", ".pt")
+            new_checkpoint = {"ema_model_state_dict": ema_model_state_dict}
+            torch.save(new_checkpoint, new_checkpoint_path)
+
+        return f"New checkpoint saved at: {new_checkpoint_path}"
+
+    except Exception as e:
+        return f"An error occurred: {e}"
+
+
+def is_serving_checkpoint(ckpt_path):
+    if not ckpt_path.endswith(".safetensors"):
+        return False
+    with safe_open(ckpt_path, framework="pt") as f:
+        return (f.metadata() or {}).get("format") == SERVING_FORMAT
+
+
+def is_serving_checkpoint_current(ckpt_path, source_path):
+    """
+    Whether a serving checkpoint was extracted from the training checkpoint now at source_path
+    (always True if source_path does not exist, e.g. a deployment shipping only the serving file)
+    """
+    if not source_path or not os.path.exists(source_path):
+        return True
+    with safe_open(ckpt_path, framework="pt") as f:
+        metadata = f.metadata() or {}
+    source = get_source_metadata(source_path)
+    return all(metadata.get(key) == value for key, value in source.items())
+
+
+def materialize_meta_buffers(model, dtype):
+    """Non-persistent buffers are not in the checkpoint and stay on meta after assign-loading, recompute them"""
+    for module_name, module in model.named_modules():
+        for name, buffer in list(module.named_buffers(recurse=False)):
+            if not buffer.is_meta:
+                continue
+            if name == "dummy":  # MelSpec device tracker
+                value = torch.tensor(0)
+            elif name == "freqs_cis":  # TextEmbedding sinus position table [max_pos dim]
+                value = precompute_freqs_cis(buffer.shape[1], buffer.shape[0])
+            else:
+                raise RuntimeError(f"Cannot rebuild buffer '{module_name}.{name}' of a meta-initialised model")
+            # floating buffers follow the model dtype, as after model.to(dtype) in load_checkpoint
+            module.register_buffer(name, value.to(dtype) if value.is_floating_point() else value, persistent=False)
+
+
+def load_serving_checkpoint(build_model, ckpt_path, device, dtype, source_path=None):
+    """
+    build_model() constructs the CFM; it is built on meta and takes the memory-mapped tensors as its weights.
+    With source_path, ValueError if the serving checkpoint was not extracted from that training checkpoint.
+    """
+    if not is_serving_checkpoint_current(ckpt_path, source_path):
+        raise ValueError(f"{ckpt_path} was not extracted from {source_path}, convert it again")
+
+    with torch.device("meta"):
+        model = build_model()
+
+    state_dict = load_file(ckpt_path, device="cpu")
+    state_dict = {
+        key: value.to(dtype) if value.is_floating_point() else value for key, value in state_dict.items()
+    }
+    model.load_state_dict(state_dict, assign=True)
+    del state_dict
+    materialize_meta_buffers(model, dtype)
+
+    return model.to(device)
+
+
+def save_local_vocoder(output_dir, repo_id="charactr/vocos-mel-24khz", hf_cache_dir=None):
+    """Copy the Vocos config and weights to a directory for load_vocoder(is_local=True, local_path=output_dir)"""
+    from huggingface_hub import hf_hub_download
+
+    os.makedirs(output_dir, exist_ok=True)
+    for filename in ["config.yaml", "pytorch_model.bin"]:
+        shutil.copyfile(
+            hf_hub_download(repo_id=repo_id, cache_dir=hf_cache_dir, filename=filename),
+            os.path.join(output_dir, filename),
+        )
+    print(f"Vocoder saved at: {output_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a training checkpoint to a serving checkpoint")
+    parser.add_argument("-c", "--ckpt_file", required=True, help="model_*.pt or EMA .safetensors")
+    parser.add_argument("-o", "--output_file", required=True)
+    parser.add_argument("--dtype", default="fp16", choices=["fp16", "bf16", "fp32"])
+    parser.add_argument("--vocoder_dir", default=None, help="also copy Vocos here, to load it without the hub")
+    args = parser.parse_args()
+
+    message = extract_and_save_ema_model(args.ckpt_file, args.output_file, safetensors=True, dtype=args.dtype)
+    print(message)
+    if not message.startswith("New checkpoint saved"):
+        sys.exit(1)
+
+    if args.vocoder_dir:
+        save_local_vocoder(args.vocoder_dir)
+
+
+if __name__ == "__main__":
+    main()
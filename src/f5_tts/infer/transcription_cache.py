@@ -0,0 +1,123 @@
+# Persistent cache of reference transcriptions, shared by every ASR entry point
+# (app.transcribe_audio, utils_infer.preprocess_ref_audio_text, infer_cli.transcribe_with_whisper).
+# Keyed by a hash of the decoded samples, so the same clip re-uploaded under another name or
+# container still hits, plus the ASR model and language. SQLite, so gunicorn workers share it
+# and it survives restarts.
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from pydub import AudioSegment
+
+default_db_path = os.environ.get("F5TTS_TRANSCRIPTION_CACHE") or os.path.join(
+    os.path.expanduser("~"), ".cache", "f5_tts", "transcriptions.db"
+)
+
+
+def audio_hash(audio):
+    """sha1 of the decoded PCM samples and their format, audio is a path or a pydub AudioSegment"""
+    if not isinstance(audio, AudioSegment):
+        audio = AudioSegment.from_file(audio)
+    h = hashlib.sha1(f"{audio.frame_rate}/{audio.channels}/{audio.sample_width}/".encode())
+    h.update(audio.raw_data)
+    return h.hexdigest()
+
+
+class TranscriptionCache:
+    def __init__(self, db_path=default_db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = None
+        self._pid = None
+        with self._lock, self.connection:
+            if db_path != ":memory:":
+                self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """CREATE TABLE IF NOT EXISTS transcriptions (
+                    audio_hash TEXT NOT NULL,
+                    asr_model TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (audio_hash, asr_model, language)
+                )"""
+            )
+
+    @property
+    def connection(self):
+        """One connection per process (reopened after a fork, e.g. gunicorn --preload), used under the lock"""
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key_hash, asr_model, language=None):
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT text FROM transcriptions WHERE audio_hash = ? AND asr_model = ? AND language = ?",
+                (key_hash, asr_model, language or "auto"),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key_hash, asr_model, language, text):
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO transcriptions (audio_hash, asr_model, language, text, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key_hash, asr_model, language or "auto", text, time.time()),
+            )
+
+    def get_or_transcribe(self, audio, asr_model, language, transcribe_fn, show_info=print):
+        """
+        Cached transcription of audio (path or AudioSegment), else transcribe_fn() and store it.
+        Empty results are not stored, so a failed transcription is retried next time.
+        """
+        try:
+            key_hash = audio_hash(audio)
+        except Exception as e:
+            show_info(f"⚠️ Error computing audio hash: {e}")
+            return transcribe_fn()
+
+        text = self.get(key_hash, asr_model, language)
+        if text is not None:
+            self.hits += 1
+            show_info("Using cached reference text...")
+            return text
+
+        self.misses += 1
+        text = transcribe_fn()
+        if text and text.strip():
+            self.put(key_hash, asr_model, language, text)
+        return text
+
+    def stats(self):
+        with self._lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM transcriptions").fetchone()[0]
+        return {"db_path": self.db_path, "entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_transcription_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TranscriptionCache(default_db_path)
+        return _default_cache
+
+
+def set_transcription_cache(db_path):
+    """Point the process-wide cache (used by utils_infer and infer_cli) at db_path"""
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = TranscriptionCache(db_path)
+        return _default_cache
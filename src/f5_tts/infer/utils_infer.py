@@ -7,9 +7,10 @@ from concurrent.futures import ThreadPoolExecutor
 os.environ["PYTORCH_ENABLE_MPS_FALLBACK"] = "1"
 sys.path.append(f"{os.path.dirname(os.path.abspath(__file__))}/../../third_party/BigVGAN/")
 
-import hashlib
 import re
+import struct
 import tempfile
+from functools import lru_cache
 from importlib.resources import files
 
 import matplotlib
@@ -20,18 +21,20 @@ import numpy as np
 import torch
 import torchaudio
 import tqdm
+from torch.nn.utils.rnn import pad_sequence
 from huggingface_hub import snapshot_download, hf_hub_download
 from pydub import AudioSegment, silence
 from transformers import pipeline
 from vocos import Vocos
 
+from f5_tts.infer.transcription_cache import get_transcription_cache
 from f5_tts.model import CFM
+from f5_tts.model.modules import MelSpec
 from f5_tts.model.utils import (
     get_tokenizer,
     convert_char_to_pinyin,
 )
 
-_ref_audio_cache = {}
 
 device = (
     "cuda"
@@ -59,6 +62,26 @@ cfg_strength = 2.0
 sway_sampling_coef = -1.0
 speed = 1.0
 fix_duration = None
+max_frames_per_batch = None
+fuse_cfg = True
+
+# nfe_step is the number of ODE steps; midpoint and heun cost two model evaluations per step
+sampling_presets = {
+    "fast": dict(nfe_step=8, ode_method="euler"),
+    "balanced": dict(nfe_step=16, ode_method="euler"),
+    "quality": dict(nfe_step=32, ode_method="euler"),
+}
+ode_methods = {"euler": "euler", "midpoint": "midpoint", "heun": "heun2", "heun2": "heun2"}  # name -> torchdiffeq
+max_nfe_step = 128  # per-request nfe_step overrides are bounded to 1..max_nfe_step
+# model weight / activation dtypes, mel extraction, ODE state and vocoder input stay fp32
+dtypes = {
+    "fp32": torch.float32,
+    "float32": torch.float32,
+    "fp16": torch.float16,
+    "float16": torch.float16,
+    "bf16": torch.bfloat16,
+    "bfloat16": torch.bfloat16,
+}
 
 
 # -----------------------------------------
@@ -191,18 +214,41 @@ def force_split_sentence(sentence, max_chars):
     return chunks
 
 
-def load_vocoder(vocoder_name="vocos", is_local=False, local_path="", device=device, hf_cache_dir=None):
+def load_vocoder(
+        vocoder_name="vocos",
+        is_local=False,
+        local_path="",
+        device=device,
+        hf_cache_dir=None,
+        quantize=False,
+        quantized_path=None,
+):
+    """
+    quantize: dynamic int8 Vocos backbone (cpu only), loaded from / saved to quantized_path if given
+    """
+    if quantize and vocoder_name != "vocos":
+        raise ValueError("int8 quantization is only supported for the vocos vocoder")
+
     if vocoder_name == "vocos":
         if is_local:
             print(f"Load vocos from local path {local_path}")
             config_path = f"{local_path}/config.yaml"
             model_path = f"{local_path}/pytorch_model.bin"
+            for path in (config_path, model_path):
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"Local vocoder file not found: {path}")
         else:
             print("Download Vocos from huggingface charactr/vocos-mel-24khz")
             repo_id = "charactr/vocos-mel-24khz"
             config_path = hf_hub_download(repo_id=repo_id, cache_dir=hf_cache_dir, filename="config.yaml")
             model_path = hf_hub_download(repo_id=repo_id, cache_dir=hf_cache_dir, filename="pytorch_model.bin")
         vocoder = Vocos.from_hparams(config_path)
+        if quantize:
+            from f5_tts.infer.quantization import is_quantized_current, load_quantized_vocoder
+
+            if is_quantized_current(quantized_path, model_path):
+                return load_quantized_vocoder(vocoder, quantized_path, source_path=model_path)
+
         state_dict = torch.load(model_path, map_location="cpu", weights_only=True)
         from vocos.feature_extractors import EncodecFeatures
 
@@ -213,6 +259,8 @@ def load_vocoder(vocoder_name="vocos", is_local=False, local_path="", device=dev
             }
             state_dict.update(encodec_parameters)
         vocoder.load_state_dict(state_dict)
+        if quantize:
+            return load_quantized_vocoder(vocoder, quantized_path, source_path=model_path)
         vocoder = vocoder.eval().to(device)
     elif vocoder_name == "bigvgan":
         try:
@@ -231,6 +279,7 @@ def load_vocoder(vocoder_name="vocos", is_local=False, local_path="", device=dev
 
 
 asr_pipe = None
+asr_model_name = "openai/whisper-large-v3-turbo"
 
 
 def initialize_asr_pipeline(device: str = device, dtype=None):
@@ -245,7 +294,7 @@ def initialize_asr_pipeline(device: str = device, dtype=None):
     global asr_pipe
     asr_pipe = pipeline(
         "automatic-speech-recognition",
-        model="openai/whisper-large-v3-turbo",
+        model=asr_model_name,
         torch_dtype=dtype,
         device=device,
     )
@@ -276,15 +325,42 @@ def transcribe(ref_audio, language=None):
         return ""
 
 
+def get_dtype(dtype):
+    """None (auto: fp16 on capable CUDA, else fp32), a torch.dtype or a name: fp32 | fp16 | bf16"""
+    if dtype is None or isinstance(dtype, torch.dtype):
+        return dtype
+    name = str(dtype).lower().removeprefix("torch.")
+    if name not in dtypes:
+        raise ValueError(f"Unknown dtype '{dtype}', choose from {', '.join(dtypes)}")
+    return dtypes[name]
+
+
+def get_default_dtype(device):
+    return (
+        torch.float16
+        if "cuda" in device
+           and torch.cuda.get_device_properties(device).major >= 6
+           and not torch.cuda.get_device_name().endswith("[ZLUDA]")
+        else torch.float32
+    )
+
+
+def normalize_ema_state_dict(ema_model_state_dict):
+    """EMA weights of a training checkpoint with the keys of CFM.state_dict()"""
+    state_dict = {
+        k.replace("ema_model.", ""): v
+        for k, v in ema_model_state_dict.items()
+        if k not in ["initted", "step"]
+    }
+    for key in ["mel_spec.mel_stft.mel_scale.fb", "mel_spec.mel_stft.spectrogram.window"]:
+        if key in state_dict:
+            del state_dict[key]
+    return state_dict
+
+
 def load_checkpoint(model, ckpt_path, device: str, dtype=None, use_ema=True):
     if dtype is None:
-        dtype = (
-            torch.float16
-            if "cuda" in device
-               and torch.cuda.get_device_properties(device).major >= 6
-               and not torch.cuda.get_device_name().endswith("[ZLUDA]")
-            else torch.float32
-        )
+        dtype = get_default_dtype(device)
     model = model.to(dtype)
 
     ckpt_type = ckpt_path.split(".")[-1]
@@ -297,15 +373,7 @@ def load_checkpoint(model, ckpt_path, device: str, dtype=None, use_ema=True):
     if use_ema:
         if ckpt_type == "safetensors":
             checkpoint = {"ema_model_state_dict": checkpoint}
-        checkpoint["model_state_dict"] = {
-            k.replace("ema_model.", ""): v
-            for k, v in checkpoint["ema_model_state_dict"].items()
-            if k not in ["initted", "step"]
-        }
-
-        for key in ["mel_spec.mel_stft.mel_scale.fb", "mel_spec.mel_stft.spectrogram.window"]:
-            if key in checkpoint["model_state_dict"]:
-                del checkpoint["model_state_dict"][key]
+        checkpoint["model_state_dict"] = normalize_ema_state_dict(checkpoint["ema_model_state_dict"])
 
         model.load_state_dict(checkpoint["model_state_dict"])
     else:
@@ -328,7 +396,20 @@ def load_model(
         ode_method=ode_method,
         use_ema=True,
         device=device,
+        quantize=False,
+        quantized_ckpt_path=None,
+        dtype=None,
 ):
+    """
+    quantize: dynamic int8 attention / FF linears for CPU serving (the model is placed on cpu).
+    The quantized weights are loaded from quantized_ckpt_path if it exists, else created and saved there.
+    dtype: None (auto), fp32 | fp16 | bf16 for the backbone, e.g. bf16 on CPUs with native bf16 matmul.
+    ckpt_path may be a serving checkpoint (serving_checkpoint.py), which loads without the training state.
+    """
+    dtype = get_dtype(dtype)
+    if quantize and dtype not in (None, torch.float32):
+        raise ValueError("int8 quantization runs with fp32 activations, use dtype fp32 or leave it unset")
+
     if vocab_file == "":
         vocab_file = str(files("f5_tts").joinpath("infer/examples/vocab.txt"))
     tokenizer = "custom"
@@ -338,24 +419,40 @@ def load_model(
     print("model : ", ckpt_path, "\n")
 
     vocab_char_map, vocab_size = get_tokenizer(vocab_file, tokenizer)
-    model = CFM(
-        transformer=model_cls(**model_cfg, text_num_embeds=vocab_size, mel_dim=n_mel_channels),
-        mel_spec_kwargs=dict(
-            n_fft=n_fft,
-            hop_length=hop_length,
-            win_length=win_length,
-            n_mel_channels=n_mel_channels,
-            target_sample_rate=target_sample_rate,
-            mel_spec_type=mel_spec_type,
-        ),
-        odeint_kwargs=dict(
-            method=ode_method,
-        ),
-        vocab_char_map=vocab_char_map,
-    ).to(device)
 
-    dtype = torch.float32 if mel_spec_type == "bigvgan" else None
-    model = load_checkpoint(model, ckpt_path, device, dtype=dtype, use_ema=use_ema)
+    def build_model():
+        return CFM(
+            transformer=model_cls(**model_cfg, text_num_embeds=vocab_size, mel_dim=n_mel_channels),
+            mel_spec_kwargs=dict(
+                n_fft=n_fft,
+                hop_length=hop_length,
+                win_length=win_length,
+                n_mel_channels=n_mel_channels,
+                target_sample_rate=target_sample_rate,
+                mel_spec_type=mel_spec_type,
+            ),
+            odeint_kwargs=dict(
+                method=ode_method,
+            ),
+            vocab_char_map=vocab_char_map,
+        )
+
+    if dtype is None and mel_spec_type == "bigvgan":
+        dtype = torch.float32
+
+    if quantize:
+        from f5_tts.infer.quantization import load_quantized_model
+
+        return load_quantized_model(build_model(), ckpt_path, quantized_ckpt_path, use_ema=use_ema)
+
+    if ckpt_path.endswith(".safetensors"):
+        from f5_tts.infer.serving_checkpoint import is_serving_checkpoint, load_serving_checkpoint
+
+        # EMA-only serving checkpoint: meta-device init + memory-mapped weights
+        if is_serving_checkpoint(ckpt_path):
+            return load_serving_checkpoint(build_model, ckpt_path, device, dtype or get_default_dtype(device))
+
+    model = load_checkpoint(build_model().to(device), ckpt_path, device, dtype=dtype, use_ema=use_ema)
 
     return model
 
@@ -384,6 +481,7 @@ def remove_silence_edges(audio, silence_threshold=-42):
 def preprocess_ref_audio_text(ref_audio_orig, ref_text, clip_short=True, show_info=print, device=device):
     """FIXED: Better audio preprocessing with validation"""
     show_info("Converting audio...")
+    ref_aseg = None
 
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as f:
@@ -428,31 +526,22 @@ def preprocess_ref_audio_text(ref_audio_orig, ref_text, clip_short=True, show_in
             aseg = remove_silence_edges(aseg) + AudioSegment.silent(duration=50)
             aseg.export(f.name, format="wav")
             ref_audio = f.name
+            ref_aseg = aseg
 
     except Exception as e:
         show_info(f"⚠️ Error processing audio: {e}")
         ref_audio = ref_audio_orig
 
-    # Compute hash for caching
-    try:
-        with open(ref_audio, "rb") as audio_file:
-            audio_data = audio_file.read()
-            audio_hash = hashlib.md5(audio_data).hexdigest()
-    except Exception as e:
-        show_info(f"⚠️ Error computing audio hash: {e}")
-        audio_hash = None
-
     # Handle transcription
     if not ref_text.strip():
-        global _ref_audio_cache
-        if audio_hash and audio_hash in _ref_audio_cache:
-            show_info("Using cached reference text...")
-            ref_text = _ref_audio_cache[audio_hash]
-        else:
-            show_info("No reference text provided, transcribing reference audio...")
-            ref_text = transcribe(ref_audio)
-            if audio_hash and ref_text:
-                _ref_audio_cache[audio_hash] = ref_text
+        show_info("No reference text provided, transcribing reference audio...")
+        ref_text = get_transcription_cache().get_or_transcribe(
+            ref_aseg if ref_aseg is not None else ref_audio,
+            asr_model_name,
+            None,
+            lambda: transcribe(ref_audio),
+            show_info=show_info,
+        )
     else:
         show_info("Using custom reference text...")
 
@@ -473,47 +562,33 @@ def preprocess_ref_audio_text(ref_audio_orig, ref_text, clip_short=True, show_in
     return ref_audio, ref_text
 
 
-def infer_process(
-        ref_audio,
-        ref_text,
-        gen_text,
-        model_obj,
-        vocoder,
-        mel_spec_type=mel_spec_type,
-        show_info=print,
-        progress=tqdm,
-        target_rms=target_rms,
-        cross_fade_duration=cross_fade_duration,
-        nfe_step=nfe_step,
-        cfg_strength=cfg_strength,
-        sway_sampling_coef=sway_sampling_coef,
-        speed=speed,
-        fix_duration=fix_duration,
-        device=device,
-):
-    """FIXED: Better audio loading and chunking logic"""
-    # Load audio - try with backend first, fallback without
+def load_ref_audio(ref_audio, show_info=print):
+    """Load reference audio - try with soundfile backend first, fallback without"""
     try:
-        audio, sr = torchaudio.load(ref_audio, backend="soundfile")
+        return torchaudio.load(ref_audio, backend="soundfile")
     except:
         try:
-            audio, sr = torchaudio.load(ref_audio)
+            return torchaudio.load(ref_audio)
         except Exception as e:
             show_info(f"⚠️ Error loading audio: {e}")
             raise
 
-    # FIXED: Better max_chars calculation
+
+def get_chars_per_sec(audio, sr, ref_text):
+    """Speaking rate of the reference, in utf-8 bytes of ref_text per second of audio"""
     audio_duration = audio.shape[-1] / sr
     ref_text_len = len(ref_text.encode("utf-8"))
+    return ref_text_len / audio_duration if audio_duration > 0 else 50
 
-    # Calculate chars per second from reference
-    chars_per_sec = ref_text_len / audio_duration if audio_duration > 0 else 50
 
+def split_gen_text(gen_text, chars_per_sec, show_info=print):
+    """Chunk gen_text so that every chunk is about 10 seconds of speech in the reference voice"""
+    # FIXED: Better max_chars calculation
     # Set max_chars with reasonable bounds (150-250)
     max_chars = int(chars_per_sec * 10)  # ~10 seconds per chunk
     max_chars = max(150, min(max_chars, 250))  # Clamp between 150-250
 
-    show_info(f"Audio duration: {audio_duration:.2f}s, chars_per_sec: {chars_per_sec:.1f}, max_chars: {max_chars}")
+    show_info(f"chars_per_sec: {chars_per_sec:.1f}, max_chars: {max_chars}")
 
     # Chunk text
     gen_text_batches = chunk_text(gen_text, max_chars=max_chars)
@@ -522,10 +597,146 @@ def infer_process(
     for i, batch in enumerate(gen_text_batches):
         show_info(f"  Batch {i + 1}: {batch[:80]}{'...' if len(batch) > 80 else ''}")
 
+    return gen_text_batches
+
+
+class ReferenceConditioning:
+    """
+    Reference voice ready for sampling: mono 24 kHz waveform (RMS normalised), its mel [n d],
+    the original RMS, the normalised ref_text and its chars per second.
+    Can be passed as ref_audio to infer_process / infer_batch_process instead of a file or (audio, sr).
+    """
+
+    def __init__(self, audio, mel, rms, ref_text, chars_per_sec):
+        self.audio = audio
+        self.mel = mel
+        self.rms = rms
+        self.ref_text = ref_text
+        self.chars_per_sec = chars_per_sec
+
+    def to_dict(self):
+        return {
+            "audio": self.audio.cpu(),
+            "mel": self.mel.cpu(),
+            "rms": self.rms.cpu(),
+            "ref_text": self.ref_text,
+            "chars_per_sec": self.chars_per_sec,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["audio"], data["mel"], data["rms"], data["ref_text"], data["chars_per_sec"])
+
+
+def prepare_ref_conditioning(
+        ref_audio, ref_text, target_rms=target_rms, mel_spec=None, mel_spec_type=mel_spec_type, device=device
+):
+    """Mono, RMS-normalised, resampled reference audio and its mel, from (audio, sr)"""
+    audio, sr = ref_audio
+    chars_per_sec = get_chars_per_sec(audio, sr, ref_text)
+
+    # Convert to mono if stereo
+    if audio.shape[0] > 1:
+        audio = torch.mean(audio, dim=0, keepdim=True)
+
+    # Normalize RMS
+    rms = torch.sqrt(torch.mean(torch.square(audio)))
+    if rms < target_rms:
+        audio = audio * target_rms / rms
+
+    # Resample if needed
+    if sr != target_sample_rate:
+        resampler = torchaudio.transforms.Resample(sr, target_sample_rate)
+        audio = resampler(audio)
+
+    audio = audio.to(device)
+
+    # Ensure ref_text has proper spacing
+    if len(ref_text[-1].encode("utf-8")) == 1:
+        ref_text = ref_text + " "
+
+    if mel_spec is None:
+        mel_spec = MelSpec(
+            n_fft=n_fft,
+            hop_length=hop_length,
+            win_length=win_length,
+            n_mel_channels=n_mel_channels,
+            target_sample_rate=target_sample_rate,
+            mel_spec_type=mel_spec_type,
+        )
+    with torch.inference_mode():
+        mel = mel_spec(audio).permute(0, 2, 1)[0]
+
+    return ReferenceConditioning(audio, mel, rms, ref_text, chars_per_sec)
+
+
+def get_sampling_params(
+        preset=None, nfe_step=None, ode_method=None, cfg_strength=cfg_strength, sway_sampling_coef=sway_sampling_coef
+):
+    """
+    Resolve a sampling preset (fast | balanced | quality, default quality) into infer_process kwargs.
+    Explicitly given nfe_step / ode_method override the preset.
+    """
+    preset = preset or "quality"
+    if preset not in sampling_presets:
+        raise ValueError(f"Unknown sampling preset '{preset}', choose from {', '.join(sampling_presets)}")
+    params = dict(sampling_presets[preset])
+
+    if nfe_step is not None:
+        try:
+            nfe_step = int(nfe_step)
+        except (TypeError, ValueError):
+            raise ValueError(f"nfe_step must be an integer, got '{nfe_step}'")
+        if not 1 <= nfe_step <= max_nfe_step:
+            raise ValueError(f"nfe_step must be between 1 and {max_nfe_step}, got {nfe_step}")
+        params["nfe_step"] = nfe_step
+    if ode_method:
+        if ode_method not in ode_methods:
+            raise ValueError(f"Unknown ODE method '{ode_method}', choose from {', '.join(ode_methods)}")
+        params["ode_method"] = ode_method
+    params["ode_method"] = ode_methods[params["ode_method"]]
+
+    params["cfg_strength"] = cfg_strength
+    params["sway_sampling_coef"] = sway_sampling_coef
+    return params
+
+
+def infer_process(
+        ref_audio,
+        ref_text,
+        gen_text,
+        model_obj,
+        vocoder,
+        mel_spec_type=mel_spec_type,
+        show_info=print,
+        progress=tqdm,
+        target_rms=target_rms,
+        cross_fade_duration=cross_fade_duration,
+        nfe_step=nfe_step,
+        cfg_strength=cfg_strength,
+        sway_sampling_coef=sway_sampling_coef,
+        speed=speed,
+        fix_duration=fix_duration,
+        device=device,
+        max_frames_per_batch=max_frames_per_batch,
+        fuse_cfg=fuse_cfg,
+        ode_method=None,
+        cfg_schedule=None,
+        progress_callback=None,
+):
+    """FIXED: Better audio loading and chunking logic"""
+    if isinstance(ref_audio, ReferenceConditioning):
+        chars_per_sec = ref_audio.chars_per_sec
+    else:
+        audio, sr = load_ref_audio(ref_audio, show_info=show_info)
+        chars_per_sec = get_chars_per_sec(audio, sr, ref_text)
+        ref_audio = (audio, sr)
+    gen_text_batches = split_gen_text(gen_text, chars_per_sec, show_info=show_info)
+
     # Call batch process
     return next(
         infer_batch_process(
-            (audio, sr),
+            ref_audio,
             ref_text,
             gen_text_batches,
             model_obj,
@@ -540,140 +751,395 @@ def infer_process(
             speed=speed,
             fix_duration=fix_duration,
             device=device,
+            max_frames_per_batch=max_frames_per_batch,
+            fuse_cfg=fuse_cfg,
+            ode_method=ode_method,
+            cfg_schedule=cfg_schedule,
+            progress_callback=progress_callback,
         )
     )
 
 
-def infer_batch_process(
+def group_chunks_by_duration(durations, max_frames_per_batch):
+    """
+    Group chunk indices into padded batches of similar length.
+    Chunks are visited shortest first, and a batch is closed as soon as
+    batch_size * longest_duration would exceed max_frames_per_batch.
+    """
+    groups = []
+    current = []
+    for idx in sorted(range(len(durations)), key=lambda i: durations[i]):
+        if current and (len(current) + 1) * durations[idx] > max_frames_per_batch:
+            groups.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def get_sample_duration(duration, text_len, cond_len, max_duration=4096):
+    """Number of frames CFM.sample really generates for one item (same bounds as in CFM.sample)"""
+    return min(max(max(text_len, cond_len) + 1, duration), max_duration)
+
+
+def sample_batch(
+        model_obj,
+        conds,
+        texts,
+        durations,
+        nfe_step=32,
+        cfg_strength=2.0,
+        sway_sampling_coef=-1,
+        seed=None,
+        fuse_cfg=True,
+        ode_method=None,
+        cfg_schedule=None,
+        step_callback=None,
+):
+    """
+    Run several items through a single padded CFM.sample call.
+    conds: reference mels [n d] (may differ per item), texts: tokenized char lists, durations: total frames.
+    Returns the generated mel [n d] of every item, reference part included and batch padding removed.
+    """
+    device = conds[0].device
+    lens = torch.tensor([c.shape[0] for c in conds], device=device, dtype=torch.long)
+    cond = pad_sequence(conds, padding_value=0, batch_first=True)
+
+    generated, _ = model_obj.sample(
+        cond=cond,
+        text=texts,
+        duration=torch.tensor(durations, device=device, dtype=torch.long),
+        lens=lens,
+        steps=nfe_step,
+        cfg_strength=cfg_strength,
+        sway_sampling_coef=sway_sampling_coef,
+        seed=seed,
+        fuse_cfg=fuse_cfg,
+        ode_method=ode_method,
+        cfg_schedule=cfg_schedule,
+        step_callback=step_callback,
+    )
+
+    return [
+        generated[i, : get_sample_duration(dur, len(text), conds[i].shape[0])]
+        for i, (text, dur) in enumerate(zip(texts, durations))
+    ]
+
+
+@lru_cache(maxsize=64)
+def convert_ref_text(ref_text):
+    """convert_char_to_pinyin of a reference text, as a tuple shared by every request with this voice"""
+    return tuple(convert_char_to_pinyin([ref_text])[0])
+
+
+def prepare_batch_inputs(
         ref_audio,
         ref_text,
         gen_text_batches,
         model_obj,
-        vocoder,
-        mel_spec_type="vocos",
-        progress=tqdm,
         target_rms=0.1,
-        cross_fade_duration=0.15,
-        nfe_step=32,
-        cfg_strength=2.0,
-        sway_sampling_coef=-1,
         speed=1,
         fix_duration=None,
         device=None,
-        streaming=False,
-        chunk_size=2048,
 ):
-    """FIXED: Better batch processing with proper cross-fade"""
-    audio, sr = ref_audio
+    """
+    Turn the reference audio/text and text chunks into CFM.sample inputs.
+    ref_audio is (audio, sr) or a ReferenceConditioning, in which case ref_text is taken from it.
+    Returns (cond mel [n d], ref_audio_len, rms, tokenized text per chunk, duration per chunk).
+    """
+    if isinstance(ref_audio, ReferenceConditioning):
+        conditioning = ref_audio
+    else:
+        conditioning = prepare_ref_conditioning(
+            ref_audio, ref_text, target_rms=target_rms, mel_spec=model_obj.mel_spec, device=device
+        )
+    ref_text = conditioning.ref_text
 
-    # Convert to mono if stereo
-    if audio.shape[0] > 1:
-        audio = torch.mean(audio, dim=0, keepdim=True)
+    ref_audio_len = conditioning.audio.shape[-1] // hop_length
+    ref_text_len = len(ref_text.encode("utf-8"))
 
-    # Normalize RMS
-    rms = torch.sqrt(torch.mean(torch.square(audio)))
-    if rms < target_rms:
-        audio = audio * target_rms / rms
+    # Text and target duration of every chunk
+    if ref_text.endswith(" "):
+        # segments never span a space, so the reference part is tokenised once per voice
+        ref_chars = list(convert_ref_text(ref_text))
+        final_text_list = [ref_chars + chars for chars in convert_char_to_pinyin(gen_text_batches)]
+    else:
+        final_text_list = convert_char_to_pinyin([ref_text + gen_text for gen_text in gen_text_batches])
+    durations = []
+    for gen_text in gen_text_batches:
+        # FIXED: Better speed calculation
+        gen_text_len = len(gen_text.encode("utf-8"))
+        local_speed = 0.5 if gen_text_len < 20 else speed
 
-    # Resample if needed
-    if sr != target_sample_rate:
-        resampler = torchaudio.transforms.Resample(sr, target_sample_rate)
-        audio = resampler(audio)
+        if fix_duration is not None:
+            durations.append(int(fix_duration * target_sample_rate / hop_length))
+        else:
+            durations.append(ref_audio_len + int(ref_audio_len / ref_text_len * gen_text_len / local_speed))
 
-    audio = audio.to(device)
+    # The reference prompt is shared by every chunk
+    cond = conditioning.mel.to(device)
 
-    generated_waves = []
-    spectrograms = []
+    return cond, ref_audio_len, conditioning.rms, final_text_list, durations
 
-    # Ensure ref_text has proper spacing
-    if len(ref_text[-1].encode("utf-8")) == 1:
-        ref_text = ref_text + " "
 
-    # Process each batch
-    for gen_text in (progress.tqdm(gen_text_batches) if progress else gen_text_batches):
-        # FIXED: Better speed calculation
-        gen_text_len = len(gen_text.encode("utf-8"))
-        local_speed = 0.5 if gen_text_len < 20 else speed
+def decode_generated(generated, ref_audio_len, vocoder, mel_spec_type="vocos", rms=None, target_rms=0.1):
+    """Vocode one generated mel [n d] without its reference part, returns (wave, spectrogram) as numpy"""
+    generated = generated.to(torch.float32)
+    generated = generated[ref_audio_len:, :]
+    generated = generated.permute(1, 0).unsqueeze(0)
 
-        text_list = [ref_text + gen_text]
-        final_text_list = convert_char_to_pinyin(text_list)
+    if mel_spec_type == "vocos":
+        generated_wave = vocoder.decode(generated)
+    elif mel_spec_type == "bigvgan":
+        generated_wave = vocoder(generated)
 
-        ref_audio_len = audio.shape[-1] // hop_length
+    if rms is not None and rms < target_rms:
+        generated_wave = generated_wave * rms / target_rms
 
-        if fix_duration is not None:
-            duration = int(fix_duration * target_sample_rate / hop_length)
-        else:
-            ref_text_len = len(ref_text.encode("utf-8"))
-            duration = ref_audio_len + int(ref_audio_len / ref_text_len * gen_text_len / local_speed)
-
-        # Inference
-        with torch.inference_mode():
-            generated, _ = model_obj.sample(
-                cond=audio,
-                text=final_text_list,
-                duration=duration,
-                steps=nfe_step,
-                cfg_strength=cfg_strength,
-                sway_sampling_coef=sway_sampling_coef,
-            )
-
-            generated = generated.to(torch.float32)
-            generated = generated[:, ref_audio_len:, :]
-            generated = generated.permute(0, 2, 1)
-
-            if mel_spec_type == "vocos":
-                generated_wave = vocoder.decode(generated)
-            elif mel_spec_type == "bigvgan":
-                generated_wave = vocoder(generated)
-
-            if rms < target_rms:
-                generated_wave = generated_wave * rms / target_rms
-
-            generated_wave = generated_wave.squeeze().cpu().numpy()
-            generated_cpu = generated[0].cpu().numpy()
-
-            generated_waves.append(generated_wave)
-            spectrograms.append(generated_cpu)
-
-            del generated, _
-            torch.cuda.empty_cache()
-
-    # FIXED: Better cross-fade implementation
-    if generated_waves:
-        if cross_fade_duration <= 0 or len(generated_waves) == 1:
-            final_wave = np.concatenate(generated_waves)
+    return generated_wave.squeeze().cpu().numpy(), generated[0].cpu().numpy()
+
+
+@lru_cache(maxsize=32)
+def get_fade_curves(cross_fade_samples):
+    """(fade_out, fade_in) float32 ramps, shared between calls"""
+    fade_out = np.linspace(1, 0, cross_fade_samples, dtype=np.float32)
+    fade_in = np.linspace(0, 1, cross_fade_samples, dtype=np.float32)
+    fade_out.flags.writeable = False
+    fade_in.flags.writeable = False
+    return fade_out, fade_in
+
+
+def get_cross_fade_lengths(wave_lengths, cross_fade_duration=0.15, sample_rate=target_sample_rate):
+    """
+    Overlap (in samples) between each wave and the audio before it, and the final length.
+    The overlap is capped at half of the audio so far and half of the next wave.
+    """
+    nominal = max(int(cross_fade_duration * sample_rate), 0)
+    overlaps = []
+    total_len = 0
+    for i, wave_len in enumerate(wave_lengths):
+        overlap = max(min(nominal, total_len // 2, wave_len // 2), 0) if i > 0 else 0
+        overlaps.append(overlap)
+        total_len += wave_len - overlap
+    return overlaps, total_len
+
+
+def cross_fade_waves(generated_waves, cross_fade_duration=0.15, sample_rate=target_sample_rate, out=None):
+    """
+    Cross-fade consecutive waves into one float32 array in linear time.
+    The final length is computed up front and every wave is written once into a preallocated
+    buffer (or into out, e.g. a np.memmap from open_wav_memmap), fading the overlaps in place.
+    """
+    overlaps, total_len = get_cross_fade_lengths([len(w) for w in generated_waves], cross_fade_duration, sample_rate)
+
+    if out is None:
+        out = np.empty(total_len, dtype=np.float32)
+    elif len(out) != total_len:
+        raise ValueError(f"Output buffer has {len(out)} samples, expected {total_len}")
+
+    pos = 0
+    for next_wave, overlap in zip(generated_waves, overlaps):
+        if overlap > 0:
+            fade_out, fade_in = get_fade_curves(overlap)
+            region = out[pos - overlap:pos]
+            region *= fade_out
+            region += next_wave[:overlap] * fade_in
+        out[pos:pos + len(next_wave) - overlap] = next_wave[overlap:]
+        pos += len(next_wave) - overlap
+
+    return out
+
+
+def open_wav_memmap(path, num_samples, sample_rate=target_sample_rate):
+    """Create a mono 32-bit float WAV file of num_samples and return its data as a writable np.memmap"""
+    data_size = num_samples * 4
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", data_size + 36, b"WAVE",
+        b"fmt ", 16, 3, 1, sample_rate, sample_rate * 4, 4, 32,
+        b"data", data_size
+    )
+    with open(path, "wb") as f:
+        f.write(header)
+        f.truncate(len(header) + data_size)
+    return np.memmap(path, dtype="<f4", mode="r+", offset=len(header), shape=(num_samples,))
+
+
+def cross_fade_to_wav(generated_waves, path, cross_fade_duration=0.15, sample_rate=target_sample_rate):
+    """Cross-fade waves straight into a memory-mapped WAV file, without holding the result in memory"""
+    _, total_len = get_cross_fade_lengths([len(w) for w in generated_waves], cross_fade_duration, sample_rate)
+    out = open_wav_memmap(path, total_len, sample_rate)
+    cross_fade_waves(generated_waves, cross_fade_duration, sample_rate, out=out)
+    out.flush()
+    del out
+    return total_len
+
+
+def stream_cross_faded(generated_waves, cross_fade_duration=0.15, chunk_size=2048, sample_rate=target_sample_rate):
+    """
+    Incremental version of cross_fade_waves: consumes waves as they are produced and yields
+    chunk_size slices of the cross-faded result. Only the cross-fade tail of the audio so far is
+    held back, so the concatenated slices equal cross_fade_waves(list(generated_waves)).
+    """
+    hold = max(int(cross_fade_duration * sample_rate), 0)
+    pending = np.array([], dtype=np.float32)
+    total_len = 0  # length of the cross-faded audio so far, emitted or not
+
+    for i, next_wave in enumerate(generated_waves):
+        cross_fade_samples = min(hold, total_len // 2, len(next_wave) // 2) if i > 0 else 0
+
+        if cross_fade_samples <= 0:
+            pending = np.concatenate([pending, next_wave])
         else:
-            final_wave = generated_waves[0]
+            fade_out, fade_in = get_fade_curves(cross_fade_samples)
+            cross_faded_overlap = pending[-cross_fade_samples:] * fade_out + next_wave[:cross_fade_samples] * fade_in
+            pending = np.concatenate([
+                pending[:-cross_fade_samples],
+                cross_faded_overlap,
+                next_wave[cross_fade_samples:]
+            ])
+        total_len += len(next_wave) - cross_fade_samples
 
-            for i in range(1, len(generated_waves)):
-                prev_wave = final_wave
-                next_wave = generated_waves[i]
+        # keep the tail the next wave may fade into
+        while len(pending) - hold >= chunk_size:
+            yield pending[:chunk_size]
+            pending = pending[chunk_size:]
 
-                cross_fade_samples = int(cross_fade_duration * target_sample_rate)
-                cross_fade_samples = min(cross_fade_samples, len(prev_wave) // 2, len(next_wave) // 2)
+    for start in range(0, len(pending), chunk_size):
+        yield pending[start:start + chunk_size]
 
-                if cross_fade_samples <= 0:
-                    final_wave = np.concatenate([prev_wave, next_wave])
-                    continue
 
-                # Extract overlapping regions
-                prev_overlap = prev_wave[-cross_fade_samples:]
-                next_overlap = next_wave[:cross_fade_samples]
+def infer_batch_process(
+        ref_audio,
+        ref_text,
+        gen_text_batches,
+        model_obj,
+        vocoder,
+        mel_spec_type="vocos",
+        progress=tqdm,
+        target_rms=0.1,
+        cross_fade_duration=0.15,
+        nfe_step=32,
+        cfg_strength=2.0,
+        sway_sampling_coef=-1,
+        speed=1,
+        fix_duration=None,
+        device=None,
+        streaming=False,
+        chunk_size=2048,
+        max_frames_per_batch=None,
+        fuse_cfg=True,
+        ode_method=None,
+        cfg_schedule=None,
+        return_segments=False,
+        progress_callback=None,
+):
+    """
+    FIXED: Better batch processing with proper cross-fade
+    With max_frames_per_batch set, chunks of similar length are sampled together
+    in padded batches of at most that many frames instead of one by one.
+    fuse_cfg runs the conditional and unconditional CFG passes as one batched forward per step.
+    ode_method overrides the solver the model was loaded with (see get_sampling_params).
+    cfg_schedule (CFGSchedule or its kwargs as dict) limits guidance to part of the trajectory.
+    With streaming=True, chunks are synthesised in text order and (audio_chunk, sample_rate)
+    slices of chunk_size samples are yielded as soon as each text chunk is decoded;
+    otherwise a single (final_wave, sample_rate, combined_spectrogram) is yielded at the end.
+    With return_segments=True that is (generated_waves, sample_rate, spectrograms) instead, one
+    entry per text chunk and not cross-faded, for callers that cache chunks (see cross_fade_waves).
+    progress_callback(info) is called as every ODE step starts and after every decoded batch, info is
+    {"chunk", "chunks", "step", "steps", "progress"}: 1-based chunk being sampled (first of its batch),
+    ODE step of that batch and the overall fraction done, counting a chunk as done once decoded.
+    """
+    cond, ref_audio_len, rms, final_text_list, durations = prepare_batch_inputs(
+        ref_audio,
+        ref_text,
+        gen_text_batches,
+        model_obj,
+        target_rms=target_rms,
+        speed=speed,
+        fix_duration=fix_duration,
+        device=device,
+    )
 
-                # Create fade curves
-                fade_out = np.linspace(1, 0, cross_fade_samples)
-                fade_in = np.linspace(0, 1, cross_fade_samples)
+    if max_frames_per_batch and not streaming:
+        sample_groups = group_chunks_by_duration(durations, max_frames_per_batch)
+    else:
+        # streaming needs the chunks in text order, one at a time
+        sample_groups = [[i] for i in range(len(gen_text_batches))]
+
+    num_chunks = len(gen_text_batches)
+    chunks_done = 0
+
+    def report(step, steps, group_size, steps_done):
+        progress_callback({
+            "chunk": min(chunks_done + 1, num_chunks),
+            "chunks": num_chunks,
+            "step": step,
+            "steps": steps,
+            "progress": (chunks_done + group_size * steps_done / steps) / num_chunks,
+        })
+
+    def group_step_callback(group_size):
+        def step_callback(step, steps):
+            report(step, steps, group_size, step - 1)
+
+        return step_callback
+
+    def decode_groups():
+        nonlocal chunks_done
+        for group in (progress.tqdm(sample_groups) if progress else sample_groups):
+            step_callback = group_step_callback(len(group)) if progress_callback is not None else None
+
+            # Inference
+            with torch.inference_mode():
+                generated_mels = sample_batch(
+                    model_obj,
+                    [cond] * len(group),
+                    [final_text_list[i] for i in group],
+                    [durations[i] for i in group],
+                    nfe_step=nfe_step,
+                    cfg_strength=cfg_strength,
+                    sway_sampling_coef=sway_sampling_coef,
+                    fuse_cfg=fuse_cfg,
+                    ode_method=ode_method,
+                    cfg_schedule=cfg_schedule,
+                    step_callback=step_callback,
+                )
+
+                decoded = [
+                    decode_generated(generated, ref_audio_len, vocoder, mel_spec_type, rms=rms, target_rms=target_rms)
+                    for generated in generated_mels
+                ]
+
+                del generated_mels
+                torch.cuda.empty_cache()
 
-                # Apply cross-fade
-                cross_faded_overlap = prev_overlap * fade_out + next_overlap * fade_in
+            chunks_done += len(group)
+            if progress_callback is not None:
+                report(nfe_step, nfe_step, 0, 0)
 
-                # Concatenate
-                final_wave = np.concatenate([
-                    prev_wave[:-cross_fade_samples],
-                    cross_faded_overlap,
-                    next_wave[cross_fade_samples:]
-                ])
+            # yield outside inference_mode so that the caller does not run inside it
+            for idx, (generated_wave, generated_spectrogram) in zip(group, decoded):
+                yield idx, generated_wave, generated_spectrogram
+
+    if streaming:
+        generated_waves = (generated_wave for _, generated_wave, _ in decode_groups())
+        for audio_chunk in stream_cross_faded(generated_waves, cross_fade_duration, chunk_size):
+            yield audio_chunk, target_sample_rate
+        return
+
+    generated_waves = [None] * len(gen_text_batches)
+    spectrograms = [None] * len(gen_text_batches)
+
+    # Process each batch
+    for idx, generated_wave, generated_spectrogram in decode_groups():
+        generated_waves[idx], spectrograms[idx] = generated_wave, generated_spectrogram
 
+    if return_segments:
+        yield generated_waves, target_sample_rate, spectrograms
+    elif generated_waves:
+        final_wave = cross_fade_waves(generated_waves, cross_fade_duration)
         combined_spectrogram = np.concatenate(spectrograms, axis=1)
         yield final_wave, target_sample_rate, combined_spectrogram
     else:
@@ -1,4 +1,4 @@
-from f5_tts.model.cfm import CFM
+from f5_tts.model.cfm import CFM, CFGSchedule
 
 from f5_tts.model.backbones.unett import UNetT
 from f5_tts.model.backbones.dit import DiT
@@ -7,4 +7,4 @@ from f5_tts.model.backbones.mmdit import MMDiT
 from f5_tts.model.trainer import Trainer
 
 
-__all__ = ["CFM", "UNetT", "DiT", "MMDiT", "Trainer"]
+__all__ = ["CFM", "CFGSchedule", "UNetT", "DiT", "MMDiT", "Trainer"]
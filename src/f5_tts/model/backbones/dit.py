@@ -9,6 +9,9 @@ d - dimension
 
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
+
 import torch
 from torch import nn
 import torch.nn.functional as F
@@ -54,7 +57,9 @@ class TextEmbedding(nn.Module):
         if self.mask_padding:
             text_mask = text == 0
 
-        if drop_text:  # cfg for text
+        if isinstance(drop_text, torch.Tensor):  # per-sample cfg for text
+            text = text.masked_fill(drop_text[:, None], 0)
+        elif drop_text:  # cfg for text
             text = torch.zeros_like(text)
 
         text = self.text_embed(text)  # b n -> b n d
@@ -85,17 +90,37 @@ class TextEmbedding(nn.Module):
 class InputEmbedding(nn.Module):
     def __init__(self, mel_dim, text_dim, out_dim):
         super().__init__()
+        self.mel_dim = mel_dim
         self.proj = nn.Linear(mel_dim * 2 + text_dim, out_dim)
         self.conv_pos_embed = ConvPositionEmbedding(dim=out_dim)
 
     def forward(self, x: float["b n d"], cond: float["b n d"], text_embed: float["b n d"], drop_audio_cond=False):  # noqa: F722
-        if drop_audio_cond:  # cfg for cond audio
+        if isinstance(drop_audio_cond, torch.Tensor):  # per-sample cfg for cond audio
+            cond = cond.masked_fill(drop_audio_cond[:, None, None], 0.0)
+        elif drop_audio_cond:  # cfg for cond audio
             cond = torch.zeros_like(cond)
 
         x = self.proj(torch.cat((x, cond, text_embed), dim=-1))
         x = self.conv_pos_embed(x) + x
         return x
 
+    # proj is linear over cat(x, cond, text_embed), so it splits into an x part and a part fixed during sampling
+
+    def project_cond(self, cond: float["b n d"], text_embed: float["b n d"], drop_audio_cond=False):  # noqa: F722
+        if isinstance(drop_audio_cond, torch.Tensor):
+            cond = cond.masked_fill(drop_audio_cond[:, None, None], 0.0)
+        elif drop_audio_cond:
+            cond = torch.zeros_like(cond)
+
+        return F.linear(torch.cat((cond, text_embed), dim=-1), self.proj.weight[:, self.mel_dim :], self.proj.bias)
+
+    def forward_with_cond_proj(self, x: float["b n d"], cond_proj: float["b n d"], x_weight=None):  # noqa: F722
+        if x_weight is None:
+            x_weight = self.proj.weight[:, : self.mel_dim]
+        x = F.linear(x, x_weight) + cond_proj
+        x = self.conv_pos_embed(x) + x
+        return x
+
 
 # Transformer backbone using DiT blocks
 
@@ -129,6 +154,7 @@ class DiT(nn.Module):
             text_num_embeds, text_dim, mask_padding=text_mask_padding, conv_layers=conv_layers
         )
         self.text_cond, self.text_uncond = None, None  # text cache
+        self.text_cfg = None  # text cache of packed cond & uncond batch
         self.input_embed = InputEmbedding(mel_dim, text_dim, dim)
 
         self.rotary_embed = RotaryEmbedding(dim_head)
@@ -157,8 +183,27 @@ class DiT(nn.Module):
 
         self.checkpoint_activations = checkpoint_activations
 
+        # schedule -> {time step -> AdaLN modulations}, shared by the sampling sessions of a schedule.
+        # An entry holds the modulations of every block (about 0.5 MB for F5TTS_Base in fp32), so only the
+        # last few schedules are kept, each with at most as many time steps as a fixed-grid solver evaluates
+        self.time_cache = OrderedDict()
+        self.time_cache_schedules = 4
+        self.time_cache_size = 64  # per schedule, adaptive solvers stop caching past it
+        self._time_cache_lock = threading.Lock()  # concurrent samplers share the model (server threads, workers)
+
         self.initialize_weights()
 
+    def __getstate__(self):
+        # deepcopy / pickle (e.g. the EMA copy in training): locks cannot be copied, cached tensors need not be
+        state = self.__dict__.copy()
+        state.pop("_time_cache_lock", None)
+        state["time_cache"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._time_cache_lock = threading.Lock()
+
     def initialize_weights(self):
         # Zero-out AdaLN layers in DiT blocks:
         for block in self.transformer_blocks:
@@ -181,6 +226,66 @@ class DiT(nn.Module):
 
     def clear_cache(self):
         self.text_cond, self.text_uncond = None, None
+        self.text_cfg = None
+
+    def clear_time_cache(self):  # call after changing weights
+        with self._time_cache_lock:
+            self.time_cache = OrderedDict()
+
+    def get_time_modulation(self, time: float["b"] | float[""], schedule=None):  # noqa: F821 F722
+        """
+        AdaLN modulations of every block and of norm_out for a time step, cached for scalar steps
+        of a schedule (hashable, e.g. solver and time grid of CFM.sample)
+        """
+        use_cache = schedule is not None and time.ndim == 0 and not self.training and not torch.is_grad_enabled()
+        if use_cache:
+            key = (time.item(), time.dtype, time.device)
+            with self._time_cache_lock:
+                cache = self.time_cache.get(schedule)
+                if cache is None:
+                    cache = self.time_cache[schedule] = {}
+                    while len(self.time_cache) > self.time_cache_schedules:
+                        self.time_cache.popitem(last=False)
+                else:
+                    self.time_cache.move_to_end(schedule)
+                modulation = cache.get(key)
+            if modulation is not None:
+                return modulation
+
+        t = self.time_embed(time.reshape(1) if time.ndim == 0 else time)
+        modulation = (
+            [block.attn_norm.modulation(t) for block in self.transformer_blocks],
+            self.norm_out.modulation(t),
+        )
+
+        if use_cache:
+            with self._time_cache_lock:  # cache may have been evicted meanwhile, then the entry just goes with it
+                if len(cache) < self.time_cache_size:
+                    cache[key] = modulation
+        return modulation
+
+    def sampling_session(
+        self, cond, text, mask=None, drop_audio_cond=False, drop_text=False, cfg_infer=False, schedule=None
+    ):
+        return DiTSamplingSession(
+            self, cond, text, mask=mask, drop_audio_cond=drop_audio_cond, drop_text=drop_text, cfg_infer=cfg_infer,
+            schedule=schedule,
+        )
+
+    def get_text_embed(self, text, seq_len, drop_text, cache=False, cfg_infer=False):
+        if not cache:
+            return self.text_embed(text, seq_len, drop_text=drop_text)
+        if cfg_infer:  # cond & uncond variants side by side along batch
+            if self.text_cfg is None:
+                self.text_cfg = self.text_embed(text, seq_len, drop_text=drop_text)
+            return self.text_cfg
+        if drop_text:
+            if self.text_uncond is None:
+                self.text_uncond = self.text_embed(text, seq_len, drop_text=True)
+            return self.text_uncond
+        if self.text_cond is None:
+            self.text_cond = self.text_embed(text, seq_len, drop_text=False)
+        return self.text_cond
 
     def forward(
         self,
@@ -192,24 +297,21 @@ class DiT(nn.Module):
         drop_text,  # cfg for text
         mask: bool["b n"] | None = None,  # noqa: F722
         cache=False,
+        cfg_infer=False,  # pack cond & uncond forward: b n d -> 2b n d, drop flags are ignored
     ):
         batch, seq_len = x.shape[0], x.shape[1]
         if time.ndim == 0:
             time = time.repeat(batch)
 
+        if cfg_infer:
+            x, cond, text = torch.cat((x, x)), torch.cat((cond, cond)), torch.cat((text, text))
+            time = torch.cat((time, time))
+            mask = torch.cat((mask, mask)) if mask is not None else None
+            drop_audio_cond = drop_text = torch.arange(2 * batch, device=x.device) >= batch
+
         # t: conditioning time, text: text, x: noised audio + cond audio + text
         t = self.time_embed(time)
-        if cache:
-            if drop_text:
-                if self.text_uncond is None:
-                    self.text_uncond = self.text_embed(text, seq_len, drop_text=True)
-                text_embed = self.text_uncond
-            else:
-                if self.text_cond is None:
-                    self.text_cond = self.text_embed(text, seq_len, drop_text=False)
-                text_embed = self.text_cond
-        else:
-            text_embed = self.text_embed(text, seq_len, drop_text=drop_text)
+        text_embed = self.get_text_embed(text, seq_len, drop_text, cache=cache, cfg_infer=cfg_infer)
         x = self.input_embed(x, cond, text_embed, drop_audio_cond=drop_audio_cond)
 
         rope = self.rotary_embed.forward_from_seq_len(seq_len)
@@ -230,3 +332,57 @@ class DiT(nn.Module):
         output = self.proj_out(x)
 
         return output
+
+
+# Step-invariant part of DiT.forward for one CFM.sample call
+
+
+class DiTSamplingSession:
+    """
+    Precomputes everything DiT.forward derives from the fixed conditioning once per request:
+    text embedding, the cond/text part of InputEmbedding.proj and rope. Time embeddings and
+    AdaLN modulations depend only on the time step and come from DiT.get_time_modulation,
+    which caches them across requests sharing the schedule passed here. Calling session(x, time) then only
+    does the x-dependent work and returns the same as DiT.forward with these inputs.
+    """
+
+    def __init__(
+        self, model: DiT, cond, text, mask=None, drop_audio_cond=False, drop_text=False, cfg_infer=False, schedule=None
+    ):
+        batch, seq_len = cond.shape[0], cond.shape[1]
+        self.model = model
+        self.cfg_infer = cfg_infer
+        self.schedule = schedule
+
+        if cfg_infer:  # cond & uncond stacked along batch, as in DiT.forward(cfg_infer=True)
+            cond, text = torch.cat((cond, cond)), torch.cat((text, text))
+            mask = torch.cat((mask, mask)) if mask is not None else None
+            drop_audio_cond = drop_text = torch.arange(2 * batch, device=cond.device) >= batch
+
+        self.mask = mask
+        text_embed = model.text_embed(text, seq_len, drop_text=drop_text)
+        self.cond_proj = model.input_embed.project_cond(cond, text_embed, drop_audio_cond=drop_audio_cond)
+        self.x_weight = model.input_embed.proj.weight[:, : model.input_embed.mel_dim].contiguous()
+        self.rope = model.rotary_embed.forward_from_seq_len(seq_len)
+
+    def __call__(self, x: float["b n d"], time: float["b"] | float[""]):  # noqa: F821 F722
+        model = self.model
+        if self.cfg_infer:
+            x = torch.cat((x, x))
+            if time.ndim > 0:
+                time = torch.cat((time, time))
+
+        block_modulations, final_modulation = model.get_time_modulation(time, schedule=self.schedule)
+        x = model.input_embed.forward_with_cond_proj(x, self.cond_proj, x_weight=self.x_weight)
+
+        if model.long_skip_connection is not None:
+            residual = x
+
+        for block, modulation in zip(model.transformer_blocks, block_modulations):
+            x = block(x, None, mask=self.mask, rope=self.rope, modulation=modulation)
+
+        if model.long_skip_connection is not None:
+            x = model.long_skip_connection(torch.cat((x, residual), dim=-1))
+
+        x = model.norm_out(x, modulation=final_modulation)
+        return model.proj_out(x)
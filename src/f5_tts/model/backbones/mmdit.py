@@ -42,7 +42,9 @@ class TextEmbedding(nn.Module):
         if self.mask_padding:
             text_mask = text == 0
 
-        if drop_text:  # cfg for text
+        if isinstance(drop_text, torch.Tensor):  # per-sample cfg for text
+            text = text.masked_fill(drop_text[:, None], 0)
+        elif drop_text:  # cfg for text
             text = torch.zeros_like(text)
 
         text = self.text_embed(text)  # b nt -> b nt d
@@ -71,7 +73,9 @@ class AudioEmbedding(nn.Module):
         self.conv_pos_embed = ConvPositionEmbedding(out_dim)
 
     def forward(self, x: float["b n d"], cond: float["b n d"], drop_audio_cond=False):  # noqa: F722
-        if drop_audio_cond:
+        if isinstance(drop_audio_cond, torch.Tensor):  # per-sample cfg for cond audio
+            cond = cond.masked_fill(drop_audio_cond[:, None, None], 0.0)
+        elif drop_audio_cond:
             cond = torch.zeros_like(cond)
         x = torch.cat((x, cond), dim=-1)
         x = self.linear(x)
@@ -102,6 +106,7 @@ class MMDiT(nn.Module):
         self.time_embed = TimestepEmbedding(dim)
         self.text_embed = TextEmbedding(dim, text_num_embeds, mask_padding=text_mask_padding)
         self.text_cond, self.text_uncond = None, None  # text cache
+        self.text_cfg = None  # text cache of packed cond & uncond batch
         self.audio_embed = AudioEmbedding(mel_dim, dim)
 
         self.rotary_embed = RotaryEmbedding(dim_head)
@@ -144,6 +149,22 @@ class MMDiT(nn.Module):
 
     def clear_cache(self):
         self.text_cond, self.text_uncond = None, None
+        self.text_cfg = None
+
+    def get_text_embed(self, text, drop_text, cache=False, cfg_infer=False):
+        if not cache:
+            return self.text_embed(text, drop_text=drop_text)
+        if cfg_infer:  # cond & uncond variants side by side along batch
+            if self.text_cfg is None:
+                self.text_cfg = self.text_embed(text, drop_text=drop_text)
+            return self.text_cfg
+        if drop_text:
+            if self.text_uncond is None:
+                self.text_uncond = self.text_embed(text, drop_text=True)
+            return self.text_uncond
+        if self.text_cond is None:
+            self.text_cond = self.text_embed(text, drop_text=False)
+        return self.text_cond
 
     def forward(
         self,
@@ -155,24 +176,21 @@ class MMDiT(nn.Module):
         drop_text,  # cfg for text
         mask: bool["b n"] | None = None,  # noqa: F722
         cache=False,
+        cfg_infer=False,  # pack cond & uncond forward: b n d -> 2b n d, drop flags are ignored
     ):
         batch = x.shape[0]
         if time.ndim == 0:
             time = time.repeat(batch)
 
+        if cfg_infer:
+            x, cond, text = torch.cat((x, x)), torch.cat((cond, cond)), torch.cat((text, text))
+            time = torch.cat((time, time))
+            mask = torch.cat((mask, mask)) if mask is not None else None
+            drop_audio_cond = drop_text = torch.arange(2 * batch, device=x.device) >= batch
+
         # t: conditioning (time), c: context (text + masked cond audio), x: noised input audio
         t = self.time_embed(time)
-        if cache:
-            if drop_text:
-                if self.text_uncond is None:
-                    self.text_uncond = self.text_embed(text, drop_text=True)
-                c = self.text_uncond
-            else:
-                if self.text_cond is None:
-                    self.text_cond = self.text_embed(text, drop_text=False)
-                c = self.text_cond
-        else:
-            c = self.text_embed(text, drop_text=drop_text)
+        c = self.get_text_embed(text, drop_text, cache=cache, cfg_infer=cfg_infer)
         x = self.audio_embed(x, cond, drop_audio_cond=drop_audio_cond)
 
         seq_len = x.shape[1]
@@ -57,7 +57,9 @@ class TextEmbedding(nn.Module):
         if self.mask_padding:
             text_mask = text == 0
 
-        if drop_text:  # cfg for text
+        if isinstance(drop_text, torch.Tensor):  # per-sample cfg for text
+            text = text.masked_fill(drop_text[:, None], 0)
+        elif drop_text:  # cfg for text
             text = torch.zeros_like(text)
 
         text = self.text_embed(text)  # b n -> b n d
@@ -92,7 +94,9 @@ class InputEmbedding(nn.Module):
         self.conv_pos_embed = ConvPositionEmbedding(dim=out_dim)
 
     def forward(self, x: float["b n d"], cond: float["b n d"], text_embed: float["b n d"], drop_audio_cond=False):  # noqa: F722
-        if drop_audio_cond:  # cfg for cond audio
+        if isinstance(drop_audio_cond, torch.Tensor):  # per-sample cfg for cond audio
+            cond = cond.masked_fill(drop_audio_cond[:, None, None], 0.0)
+        elif drop_audio_cond:  # cfg for cond audio
             cond = torch.zeros_like(cond)
 
         x = self.proj(torch.cat((x, cond, text_embed), dim=-1))
@@ -132,6 +136,7 @@ class UNetT(nn.Module):
             text_num_embeds, text_dim, mask_padding=text_mask_padding, conv_layers=conv_layers
         )
         self.text_cond, self.text_uncond = None, None  # text cache
+        self.text_cfg = None  # text cache of packed cond & uncond batch
         self.input_embed = InputEmbedding(mel_dim, text_dim, dim)
 
         self.rotary_embed = RotaryEmbedding(dim_head)
@@ -180,6 +185,22 @@ class UNetT(nn.Module):
 
     def clear_cache(self):
         self.text_cond, self.text_uncond = None, None
+        self.text_cfg = None
+
+    def get_text_embed(self, text, seq_len, drop_text, cache=False, cfg_infer=False):
+        if not cache:
+            return self.text_embed(text, seq_len, drop_text=drop_text)
+        if cfg_infer:  # cond & uncond variants side by side along batch
+            if self.text_cfg is None:
+                self.text_cfg = self.text_embed(text, seq_len, drop_text=drop_text)
+            return self.text_cfg
+        if drop_text:
+            if self.text_uncond is None:
+                self.text_uncond = self.text_embed(text, seq_len, drop_text=True)
+            return self.text_uncond
+        if self.text_cond is None:
+            self.text_cond = self.text_embed(text, seq_len, drop_text=False)
+        return self.text_cond
 
     def forward(
         self,
@@ -191,24 +212,21 @@ class UNetT(nn.Module):
         drop_text,  # cfg for text
         mask: bool["b n"] | None = None,  # noqa: F722
         cache=False,
+        cfg_infer=False,  # pack cond & uncond forward: b n d -> 2b n d, drop flags are ignored
     ):
         batch, seq_len = x.shape[0], x.shape[1]
         if time.ndim == 0:
             time = time.repeat(batch)
 
+        if cfg_infer:
+            x, cond, text = torch.cat((x, x)), torch.cat((cond, cond)), torch.cat((text, text))
+            time = torch.cat((time, time))
+            mask = torch.cat((mask, mask)) if mask is not None else None
+            drop_audio_cond = drop_text = torch.arange(2 * batch, device=x.device) >= batch
+
         # t: conditioning time, c: context (text + masked cond audio), x: noised input audio
         t = self.time_embed(time)
-        if cache:
-            if drop_text:
-                if self.text_uncond is None:
-                    self.text_uncond = self.text_embed(text, seq_len, drop_text=True)
-                text_embed = self.text_uncond
-            else:
-                if self.text_cond is None:
-                    self.text_cond = self.text_embed(text, seq_len, drop_text=False)
-                text_embed = self.text_cond
-        else:
-            text_embed = self.text_embed(text, seq_len, drop_text=drop_text)
+        text_embed = self.get_text_embed(text, seq_len, drop_text, cache=cache, cfg_infer=cfg_infer)
         x = self.input_embed(x, cond, text_embed, drop_audio_cond=drop_audio_cond)
 
         # postfix time t to input x, [b n d] -> [b n+1 d]
@@ -9,6 +9,8 @@ d - dimension
 
 from __future__ import annotations
 
+import bisect
+import math
 from random import random
 from typing import Callable
 
@@ -22,6 +24,7 @@ from f5_tts.model.modules import MelSpec
 from f5_tts.model.utils import (
     default,
     exists,
+    get_bucket,
     lens_to_mask,
     list_str_to_idx,
     list_str_to_tensor,
@@ -29,6 +32,56 @@ from f5_tts.model.utils import (
 )
 
 
+class CFGSchedule:
+    """
+    Where along the trajectory (t: 0 noise -> 1 data) classifier-free guidance is applied.
+    Steps without guidance run the conditional forward only.
+
+    interval: (t_start, t_end), guide only for t_start <= t <= t_end
+    decay: None | "linear" | "cosine", strength falls from cfg_strength at t=0 to min_strength at t=1
+    reuse_every: k > 1 computes null_pred on every k-th guided call and reuses the last one in between
+    """
+
+    def __init__(self, interval=None, decay=None, min_strength=0.0, reuse_every=1):
+        assert decay in (None, "linear", "cosine"), f"Unknown cfg decay {decay}"
+        self.interval = tuple(interval) if interval is not None else None
+        self.decay = decay
+        self.min_strength = min_strength
+        self.reuse_every = max(int(reuse_every), 1)
+
+    @classmethod
+    def from_config(cls, config):  # None | dict | CFGSchedule
+        if config is None or isinstance(config, CFGSchedule):
+            return config
+        return cls(**config)
+
+    def strength(self, t: float, cfg_strength: float):
+        if self.interval is not None and not (self.interval[0] <= t <= self.interval[1]):
+            return 0.0
+        if self.decay == "linear":
+            weight = 1 - t
+        elif self.decay == "cosine":
+            weight = math.cos(math.pi / 2 * t)
+        else:
+            return cfg_strength
+        return self.min_strength + (cfg_strength - self.min_strength) * weight
+
+    def key(self):
+        return (self.interval, self.decay, self.min_strength, self.reuse_every)
+
+    def __eq__(self, other):
+        return isinstance(other, CFGSchedule) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return (
+            f"CFGSchedule(interval={self.interval}, decay={self.decay}, "
+            f"min_strength={self.min_strength}, reuse_every={self.reuse_every})"
+        )
+
+
 class CFM(nn.Module):
     def __init__(
         self,
@@ -74,6 +127,9 @@ class CFM(nn.Module):
         # vocab map for tokenization
         self.vocab_char_map = vocab_char_map
 
+        # sorted frame counts; if set, sample() pads the sequence up to one of them (masked), for compiled inference
+        self.duration_buckets = None
+
     @property
     def device(self):
         return next(self.parameters()).device
@@ -96,6 +152,10 @@ class CFM(nn.Module):
         duplicate_test=False,
         t_inter=0.1,
         edit_mask=None,
+        fuse_cfg=True,
+        ode_method=None,  # override odeint_kwargs["method"] for this call, e.g. euler | midpoint | heun2
+        cfg_schedule: CFGSchedule | dict | None = None,  # None: constant cfg_strength on every step
+        step_callback: Callable[[int, int], None] | None = None,  # (step, steps) as each ODE step starts
     ):
         self.eval()
         # raw wave
@@ -134,6 +194,9 @@ class CFM(nn.Module):
         )  # duration at least text/audio prompt length plus one token, so something is generated
         duration = duration.clamp(max=max_duration)
         max_duration = duration.amax()
+        if self.duration_buckets:
+            max_duration = get_bucket(int(max_duration), self.duration_buckets)
+        padded = int(max_duration) > int(duration.amin())
 
         # duplicate test corner for inner time step oberservation
         if duplicate_test:
@@ -149,28 +212,66 @@ class CFM(nn.Module):
             cond_mask, cond, torch.zeros_like(cond)
         )  # allow direct control (cut cond audio) with lens passed in
 
-        if batch > 1:
-            mask = lens_to_mask(duration)
+        if batch > 1 or padded or self.duration_buckets:  # bucketed: always masked, one compiled graph per shape
+            mask = lens_to_mask(duration, length=max_duration)
         else:  # save memory and speed up, as single inference need no mask currently
             mask = None
 
         # neural ode
 
-        def fn(t, x):
+        cfg_schedule = CFGSchedule.from_config(cfg_schedule)
+        sessions = {}  # mode -> sampling session, conditioning embeddings/projection/rope computed once
+        reuse = {"null_pred": None, "calls": 0}
+
+        def forward(x, t, mode):  # mode: "cond" | "null" | "cfg" (both stacked along batch)
+            drop = mode == "null"
+            if hasattr(self.transformer, "sampling_session"):
+                if mode not in sessions:
+                    sessions[mode] = self.transformer.sampling_session(
+                        step_cond, text, mask=mask, drop_audio_cond=drop, drop_text=drop, cfg_infer=mode == "cfg",
+                        schedule=schedule,
+                    )
+                return sessions[mode](x, t)
+            return self.transformer(
+                x=x,
+                cond=step_cond,
+                text=text,
+                time=t,
+                mask=mask,
+                drop_audio_cond=drop,
+                drop_text=drop,
+                cache=True,
+                cfg_infer=mode == "cfg",
+            )
+
+        def velocity(t, x):
             # at each step, conditioning is fixed
             # step_cond = torch.where(cond_mask, cond, torch.zeros_like(cond))
 
-            # predict flow
-            pred = self.transformer(
-                x=x, cond=step_cond, text=text, time=t, mask=mask, drop_audio_cond=False, drop_text=False, cache=True
-            )
-            if cfg_strength < 1e-5:
-                return pred
+            strength = cfg_strength if cfg_schedule is None else cfg_schedule.strength(t.item(), cfg_strength)
+            if strength < 1e-5:
+                return forward(x, t, "cond")
 
-            null_pred = self.transformer(
-                x=x, cond=step_cond, text=text, time=t, mask=mask, drop_audio_cond=True, drop_text=True, cache=True
-            )
-            return pred + (pred - null_pred) * cfg_strength
+            if cfg_schedule is not None and cfg_schedule.reuse_every > 1:
+                reuse_null = reuse["null_pred"] is not None and reuse["calls"] % cfg_schedule.reuse_every != 0
+                reuse["calls"] += 1
+                if reuse_null:
+                    pred = forward(x, t, "cond")
+                    return pred + (pred - reuse["null_pred"]) * strength
+
+            if fuse_cfg:
+                # cond & uncond flow in one forward, stacked along batch
+                pred, null_pred = torch.chunk(forward(x, t, "cfg"), 2, dim=0)
+            else:
+                pred = forward(x, t, "cond")
+                null_pred = forward(x, t, "null")
+            reuse["null_pred"] = null_pred
+            return pred + (pred - null_pred) * strength
+
+        def fn(t, x):
+            # ODE state and time stay fp32 (small bf16 / fp16 updates would be rounded away), transformer runs
+            # in model dtype; the time embedding casts to it after its sinusoids
+            return velocity(t, x.to(step_cond.dtype)).float()
 
         # noise input
         # to make sure batch inference result is same with different batch size, and for sure single inference
@@ -179,8 +280,9 @@ class CFM(nn.Module):
         for dur in duration:
             if exists(seed):
                 torch.manual_seed(seed)
-            y0.append(torch.randn(dur, self.num_channels, device=self.device, dtype=step_cond.dtype))
+            y0.append(torch.randn(dur, self.num_channels, device=self.device, dtype=torch.float32))
         y0 = pad_sequence(y0, padding_value=0, batch_first=True)
+        y0 = F.pad(y0, (0, 0, 0, max_duration - y0.shape[1]), value=0.0)  # up to the bucket length
 
         t_start = 0
 
@@ -190,11 +292,33 @@ class CFM(nn.Module):
             y0 = (1 - t_start) * y0 + t_start * test_cond
             steps = int(steps * (1 - t_start))
 
-        t = torch.linspace(t_start, 1, steps + 1, device=self.device, dtype=step_cond.dtype)
+        t = torch.linspace(t_start, 1, steps + 1, device=self.device, dtype=torch.float32)
         if sway_sampling_coef is not None:
             t = t + sway_sampling_coef * (torch.cos(torch.pi / 2 * t) - 1 + t)
 
-        trajectory = odeint(fn, y0, t, **self.odeint_kwargs)
+        odeint_kwargs = self.odeint_kwargs
+        if ode_method is not None:
+            odeint_kwargs = {**odeint_kwargs, "method": ode_method}
+        # time modulations are cached per solver and time grid (nfe, sway)
+        schedule = (odeint_kwargs.get("method"), tuple(t.tolist()))
+
+        if exists(step_callback):
+            # solvers may evaluate several times per step, report each step once (costs a host sync per evaluation)
+            t_grid = t.tolist()
+            current_step = [0]
+
+            def reporting_fn(t, x):
+                step = min(bisect.bisect_right(t_grid, t.item()), len(t_grid) - 1)
+                if step != current_step[0]:
+                    current_step[0] = step
+                    step_callback(step, len(t_grid) - 1)
+                return fn(t, x)
+
+            ode_fn = reporting_fn
+        else:
+            ode_fn = fn
+
+        trajectory = odeint(ode_fn, y0, t, **odeint_kwargs)
         self.transformer.clear_cache()
 
         sampled = trajectory[-1]
@@ -131,14 +131,16 @@ class MelSpec(nn.Module):
         if self.dummy.device != wav.device:
             self.to(wav.device)
 
-        mel = self.extractor(
-            waveform=wav,
-            n_fft=self.n_fft,
-            n_mel_channels=self.n_mel_channels,
-            target_sample_rate=self.target_sample_rate,
-            hop_length=self.hop_length,
-            win_length=self.win_length,
-        )
+        # stft / log in fp32 regardless of model dtype or an enclosing autocast
+        with torch.autocast(device_type=wav.device.type, enabled=False):
+            mel = self.extractor(
+                waveform=wav.float(),
+                n_fft=self.n_fft,
+                n_mel_channels=self.n_mel_channels,
+                target_sample_rate=self.target_sample_rate,
+                hop_length=self.hop_length,
+                win_length=self.win_length,
+            )
 
         return mel
 
@@ -307,9 +309,14 @@ class AdaLayerNorm(nn.Module):
 
         self.norm = nn.LayerNorm(dim, elementwise_affine=False, eps=1e-6)
 
-    def forward(self, x, emb=None):
+    def modulation(self, emb):
         emb = self.linear(self.silu(emb))
-        shift_msa, scale_msa, gate_msa, shift_mlp, scale_mlp, gate_mlp = torch.chunk(emb, 6, dim=1)
+        return torch.chunk(emb, 6, dim=1)
+
+    def forward(self, x, emb=None, modulation=None):  # modulation: precomputed self.modulation(emb)
+        if modulation is None:
+            modulation = self.modulation(emb)
+        shift_msa, scale_msa, gate_msa, shift_mlp, scale_mlp, gate_mlp = modulation
 
         x = self.norm(x) * (1 + scale_msa[:, None]) + shift_msa[:, None]
         return x, gate_msa, shift_mlp, scale_mlp, gate_mlp
@@ -328,9 +335,14 @@ class AdaLayerNorm_Final(nn.Module):
 
         self.norm = nn.LayerNorm(dim, elementwise_affine=False, eps=1e-6)
 
-    def forward(self, x, emb):
+    def modulation(self, emb):
         emb = self.linear(self.silu(emb))
-        scale, shift = torch.chunk(emb, 2, dim=1)
+        return torch.chunk(emb, 2, dim=1)
+
+    def forward(self, x, emb=None, modulation=None):  # modulation: precomputed self.modulation(emb)
+        if modulation is None:
+            modulation = self.modulation(emb)
+        scale, shift = modulation
 
         x = self.norm(x) * (1 + scale)[:, None, :] + shift[:, None, :]
         return x
@@ -624,9 +636,9 @@ class DiTBlock(nn.Module):
         self.ff_norm = nn.LayerNorm(dim, elementwise_affine=False, eps=1e-6)
         self.ff = FeedForward(dim=dim, mult=ff_mult, dropout=dropout, approximate="tanh")
 
-    def forward(self, x, t, mask=None, rope=None):  # x: noised input, t: time embedding
+    def forward(self, x, t, mask=None, rope=None, modulation=None):  # x: noised input, t: time embedding
         # pre-norm & modulation for attention input
-        norm, gate_msa, shift_mlp, scale_mlp, gate_mlp = self.attn_norm(x, emb=t)
+        norm, gate_msa, shift_mlp, scale_mlp, gate_mlp = self.attn_norm(x, emb=t, modulation=modulation)
 
         # attention
         attn_output = self.attn(x=norm, mask=mask, rope=rope)
@@ -725,7 +737,8 @@ class TimestepEmbedding(nn.Module):
         self.time_mlp = nn.Sequential(nn.Linear(freq_embed_dim, dim), nn.SiLU(), nn.Linear(dim, dim))
 
     def forward(self, timestep: float["b"]):  # noqa: F821
-        time_hidden = self.time_embed(timestep)
-        time_hidden = time_hidden.to(timestep.dtype)
+        # sinusoids of 1000 * t in fp32 (bf16 is ~4 apart near 1000, adjacent steps would collide), mlp in weight dtype
+        time_hidden = self.time_embed(timestep.float())
+        time_hidden = time_hidden.to(self.time_mlp[0].weight.dtype)
         time = self.time_mlp(time_hidden)  # b d
         return time
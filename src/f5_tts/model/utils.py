@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import os
 import random
+import re
 from collections import defaultdict
 from importlib.resources import files
 
+import numpy as np
 import torch
 from torch.nn.utils.rnn import pad_sequence
 
@@ -47,6 +49,14 @@ def lens_to_mask(t: int["b"], length: int | None = None) -> bool["b n"]:  # noqa
     return seq[None, :] < t[:, None]
 
 
+def get_bucket(length: int, buckets: list[int] | None) -> int:
+    """smallest bucket >= length, so that compiled graphs see a few fixed sequence lengths; length if none fits"""
+    for bucket in sorted(buckets or []):
+        if bucket >= length:
+            return bucket
+    return length
+
+
 def mask_from_start_end_indices(seq_len: int["b"], start: int["b"], end: int["b"]):  # noqa: F722 F821
     max_seq_len = seq_len.max().item()
     seq = torch.arange(max_seq_len, device=start.device).long()
@@ -90,9 +100,45 @@ def list_str_to_idx(
     vocab_char_map: dict[str, int],  # {char: idx}
     padding_value=-1,
 ) -> int["b nt"]:  # noqa: F722
-    list_idx_tensors = [torch.tensor([vocab_char_map.get(c, 0) for c in t]) for t in text]  # pinyin or char style
-    text = pad_sequence(list_idx_tensors, padding_value=padding_value, batch_first=True)
-    return text
+    table = get_vocab_table(vocab_char_map)
+    idx = np.full((len(text), max((len(t) for t in text), default=0)), padding_value, dtype=np.int64)
+    for i, t in enumerate(text):  # pinyin or char style
+        idx[i, : len(t)] = table.encode(t)
+    return torch.from_numpy(idx)
+
+
+class VocabTable:
+    """
+    vocab_char_map compiled for tokenisation: ids of single-char tokens in a NumPy array indexed by
+    code point, multi-char tokens (pinyin) looked up in the dict. Unknown tokens are 0, as with .get(c, 0).
+    """
+
+    def __init__(self, vocab_char_map: dict[str, int]):
+        self.vocab_char_map = vocab_char_map
+        self.size = len(vocab_char_map)
+        chars = {c: i for c, i in vocab_char_map.items() if len(c) == 1}
+        # one extra 0 at the end, code points past the table are clipped onto it
+        self.table = np.zeros(max(map(ord, chars), default=-1) + 2, dtype=np.int64)
+        for c, i in chars.items():
+            self.table[ord(c)] = i
+
+    def encode(self, tokens: str | list[str]) -> np.ndarray:
+        joined = "".join(tokens)
+        if len(joined) != len(tokens):  # pinyin syllables or empty tokens
+            return np.fromiter((self.vocab_char_map.get(c, 0) for c in tokens), dtype=np.int64, count=len(tokens))
+        code_points = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+        return self.table[np.minimum(code_points, len(self.table) - 1)]
+
+
+_vocab_tables = {}
+
+
+def get_vocab_table(vocab_char_map: dict[str, int]) -> VocabTable:
+    """VocabTable of a vocab_char_map, compiled once (again if the map grew, e.g. extend_embedding)"""
+    table = _vocab_tables.get(id(vocab_char_map))
+    if table is None or table.vocab_char_map is not vocab_char_map or table.size != len(vocab_char_map):
+        table = _vocab_tables[id(vocab_char_map)] = VocabTable(vocab_char_map)
+    return table
 
 
 # Get tokenizer
@@ -134,11 +180,48 @@ def get_tokenizer(dataset_name, tokenizer: str = "pinyin"):
 # convert char to pinyin
 
 
-def convert_char_to_pinyin(text_list, polyphone=True):
-    if jieba.dt.initialized is False:
-        jieba.default_logger.setLevel(50)  # CRITICAL
-        jieba.initialize()
-
+# Text without CJK characters (e.g. Vietnamese) goes through a direct character path, which gives the
+# segments jieba.cut would (models are trained on jieba's segmentation, it decides where spaces are
+# inserted) without loading its dictionary or building a DAG per block: without Han characters every
+# word of a block is a single char except these dictionary words, the chars are buffered and split by
+# finalseg, and chars outside blocks are yielded one by one (whitespace and \r\n whole).
+jieba_block = re.compile(r"([a-zA-Z0-9+#&\._%\-]+)")  # jieba.re_han_default without Han characters
+jieba_skip = re.compile(r"(\r\n|\s)")  # jieba.re_skip_default
+jieba_finalseg_skip = re.compile(r"([a-zA-Z0-9]+(?:\.\d+)?%?)")  # jieba.finalseg.re_skip
+jieba_ascii_words = ("AT&T", "C#", "C++", "c#", "c++")  # dictionary words without Han characters
+
+
+def is_non_cjk(text):
+    """No character pypinyin or jieba's Han blocks would touch (all below U+3000), nor any ASCII dictionary word"""
+    return max(text, default=" ") < "\u3000" and not any(word in text for word in jieba_ascii_words)
+
+
+def cut_non_cjk(text):
+    """jieba.cut(text) of a text for which is_non_cjk is True"""
+    for block in jieba_block.split(text):
+        if not block:
+            continue
+        if jieba_block.match(block):
+            yield from filter(None, jieba_finalseg_skip.split(block))
+        else:
+            for x in jieba_skip.split(block):
+                if jieba_skip.match(x):
+                    yield x
+                else:
+                    yield from x
+
+
+def convert_non_cjk(text):
+    """convert_char_to_pinyin of one text for which is_non_cjk is True: multi-char segments are all ASCII"""
+    char_list = []
+    for seg in cut_non_cjk(text):
+        if len(seg) > 1 and char_list and char_list[-1] not in " :'\"":
+            char_list.append(" ")
+        char_list.extend(seg)
+    return char_list
+
+
+def convert_char_to_pinyin(text_list, polyphone=True, fast_non_cjk=True):
     final_text_list = []
     custom_trans = str.maketrans(
         {";": ",", "“": '"', "”": '"', "‘": "'", "’": "'"}
@@ -150,8 +233,16 @@ def convert_char_to_pinyin(text_list, polyphone=True):
         )
 
     for text in text_list:
-        char_list = []
         text = text.translate(custom_trans)
+        if fast_non_cjk and is_non_cjk(text):
+            final_text_list.append(convert_non_cjk(text))
+            continue
+
+        if jieba.dt.initialized is False:
+            jieba.default_logger.setLevel(50)  # CRITICAL
+            jieba.initialize()
+
+        char_list = []
         for seg in jieba.cut(text):
             seg_byte_len = len(bytes(seg, "UTF-8"))
             if seg_byte_len == len(seg):  # if pure alphabets and symbols
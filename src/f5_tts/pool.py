@@ -0,0 +1,302 @@
+"""
+Multi-process F5TTS for CPU boxes: one model copy per worker process, each pinned to its own
+slice of cores with a matching torch thread count, handed one job at a time by the parent. Several
+workers with a few threads each saturate a many-core machine far better than one process
+whose intra-op threads contend on a single model.
+"""
+
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def get_available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cpus(cpus, num_workers, threads_per_worker):
+    """Disjoint core slices, one per worker, threads_per_worker cores each"""
+    if num_workers * threads_per_worker > len(cpus):
+        raise ValueError(
+            f"{num_workers} workers x {threads_per_worker} threads need {num_workers * threads_per_worker} cores, "
+            f"{len(cpus)} available"
+        )
+    return [cpus[i * threads_per_worker : (i + 1) * threads_per_worker] for i in range(num_workers)]
+
+
+def _worker_main(worker_id, generation, cpus, num_threads, f5tts_kwargs, job_queue, result_queue):
+    worker = (worker_id, generation)  # tags every message, so the parent drops those of a replaced process
+    # pin before torch spins up its thread pools, so they inherit the affinity
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    import torch
+
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+
+    try:
+        from f5_tts.api import F5TTS
+
+        tts = F5TTS(**f5tts_kwargs)
+    except Exception:
+        result_queue.put(("failed", worker, traceback.format_exc()))
+        return
+    result_queue.put(("ready", worker, None))
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        job_id, infer_kwargs = job
+
+        infer_kwargs.setdefault("show_info", lambda *_: None)
+        infer_kwargs.setdefault("progress", None)
+        try:
+            result = tts.infer(**infer_kwargs)
+        except Exception:
+            result_queue.put(("error", worker, (job_id, traceback.format_exc())))
+        else:
+            result_queue.put(("done", worker, (job_id, result)))
+
+
+class F5TTSPool:
+    """
+    Pool of F5TTS worker processes on CPU.
+
+    submit(**kwargs) takes the keyword arguments of F5TTS.infer (they must be picklable, show_info and
+    progress default to silent) and returns a concurrent.futures.Future of (wav, sr, spec). Every
+    worker loads its own model copy; threads_per_worker defaults to the available cores divided
+    evenly between workers. A worker that dies is respawned on its core slice up to max_respawns
+    times; once no worker is left, pending and later jobs fail instead of waiting forever.
+    """
+
+    def __init__(
+        self,
+        num_workers=None,
+        threads_per_worker=None,
+        pin_cpus=True,
+        start_timeout=600,
+        max_respawns=3,
+        **f5tts_kwargs,
+    ):
+        cpus = get_available_cpus()
+        if num_workers is None:
+            num_workers = max(len(cpus) // (threads_per_worker or 4), 1)
+        if threads_per_worker is None:
+            threads_per_worker = max(len(cpus) // num_workers, 1)
+
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker
+        self.cpu_slices = partition_cpus(cpus, num_workers, threads_per_worker) if pin_cpus else [None] * num_workers
+        f5tts_kwargs.setdefault("device", "cpu")
+
+        self.max_respawns = max_respawns
+        self._f5tts_kwargs = f5tts_kwargs
+
+        # spawn: forking a process that already initialised torch thread pools is unsafe
+        self._ctx = mp.get_context("spawn")
+        self._result_queue = self._ctx.Queue()
+        self._futures = {}
+        self._backlog = deque()  # (job_id, infer_kwargs) waiting for an idle worker
+        self._idle = set()
+        self._running = {}  # worker_id -> job_id, recorded when the job is handed to the worker
+        self._lock = threading.Lock()
+        self._job_done = threading.Condition(self._lock)
+        self._next_job_id = 0
+        self._closed = False
+        self._collector = None
+
+        self._workers = [None] * num_workers
+        self._job_queues = [None] * num_workers  # one per process, a respawned worker gets a fresh one
+        self._respawns = [0] * num_workers  # also the generation of the current process
+        self._retired = set()  # worker ids that died past max_respawns or failed to reload the model
+        for worker_id in range(num_workers):
+            self._spawn(worker_id)
+        self._wait_ready(start_timeout)
+
+        self._collector = threading.Thread(target=self._collect_results, daemon=True)
+        self._collector.start()
+        logger.info(f"F5TTSPool started: {num_workers} workers x {threads_per_worker} threads")
+
+    def _spawn(self, worker_id):
+        job_queue = self._ctx.Queue()
+        worker = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                worker_id, self._respawns[worker_id], self.cpu_slices[worker_id], self.threads_per_worker,
+                self._f5tts_kwargs, job_queue, self._result_queue,
+            ),
+            daemon=True,
+        )
+        worker.start()
+        self._workers[worker_id] = worker
+        self._job_queues[worker_id] = job_queue
+
+    def _wait_ready(self, timeout):
+        ready = set()
+        while len(ready) < self.num_workers:
+            try:
+                kind, (worker_id, _), error = self._result_queue.get(timeout=timeout)
+            except queue.Empty:
+                self.close()
+                raise TimeoutError(f"F5TTSPool workers not ready after {timeout}s")
+            if kind == "failed":
+                self.close()
+                raise RuntimeError(f"F5TTSPool worker {worker_id} failed to load the model:\n{error}")
+            ready.add(worker_id)
+        self._idle.update(ready)
+
+    def _dispatch(self):
+        """Hand backlog jobs to idle workers, recording which job each one runs (called with the lock held)"""
+        while self._backlog and self._idle:
+            worker_id = self._idle.pop()
+            job_id, infer_kwargs = self._backlog.popleft()
+            self._running[worker_id] = job_id
+            self._job_queues[worker_id].put((job_id, infer_kwargs))
+
+    def _collect_results(self):
+        next_check = 0.0
+        while True:
+            # liveness is checked once the queue is drained (at most once a second under load), so a worker
+            # that sent its result just before dying is not failed for it
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + 1.0
+            try:
+                kind, (worker_id, generation), payload = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                next_check = 0.0
+                if self._closed and not any(worker.is_alive() for worker in self._workers):
+                    return  # every result is in, close() fails what is left
+                continue
+            except (EOFError, OSError):
+                return
+            if generation != self._respawns[worker_id]:
+                continue  # sent by a process that has since died and been replaced
+
+            if kind == "ready":
+                logger.info(f"F5TTSPool worker {worker_id} respawned")
+                with self._lock:
+                    self._idle.add(worker_id)
+                    self._dispatch()
+                continue
+            if kind == "failed":
+                logger.error(f"F5TTSPool worker {worker_id} failed to reload the model:\n{payload}")
+                with self._lock:
+                    self._retired.add(worker_id)
+                continue
+
+            job_id, result = payload
+            with self._lock:
+                self._running.pop(worker_id, None)
+                future = self._futures.pop(job_id, None)
+                self._idle.add(worker_id)
+                self._dispatch()
+                self._job_done.notify_all()
+            if future is None:
+                continue
+            if kind == "done":
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(f"F5TTSPool job failed in worker {worker_id}:\n{result}"))
+
+    def _check_workers(self):
+        """
+        Fail the job of a worker process that died (e.g. killed by the OOM killer) and respawn it;
+        fail every pending job once no worker is left
+        """
+        for worker_id, worker in enumerate(self._workers):
+            if worker_id in self._retired or worker.is_alive() or worker.exitcode == 0:
+                continue
+            with self._lock:
+                self._idle.discard(worker_id)
+                job_id = self._running.pop(worker_id, None)
+                future = self._futures.pop(job_id, None) if job_id is not None else None
+                self._job_done.notify_all()
+            if future is not None:
+                future.set_exception(RuntimeError(f"F5TTSPool worker {worker_id} died (exit code {worker.exitcode})"))
+
+            if self._closed or self._respawns[worker_id] >= self.max_respawns:
+                with self._lock:
+                    self._retired.add(worker_id)
+                continue
+            self._respawns[worker_id] += 1
+            logger.warning(
+                f"F5TTSPool worker {worker_id} died (exit code {worker.exitcode}), "
+                f"respawning ({self._respawns[worker_id]}/{self.max_respawns})"
+            )
+            self._spawn(worker_id)
+
+        if len(self._retired) == self.num_workers:
+            self._fail_pending("F5TTSPool has no worker left")
+
+    def _fail_pending(self, message):
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+            self._backlog.clear()
+            self._running.clear()
+            self._job_done.notify_all()
+        for future in futures:
+            future.set_exception(RuntimeError(message))
+
+    def submit(self, **infer_kwargs):
+        if self._closed:
+            raise RuntimeError("F5TTSPool is closed")
+        if len(self._retired) == self.num_workers:
+            raise RuntimeError("F5TTSPool has no worker left")
+        future = Future()
+        with self._lock:
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            self._futures[job_id] = future
+            self._backlog.append((job_id, infer_kwargs))
+            self._dispatch()
+        return future
+
+    def infer(self, **infer_kwargs):
+        return self.submit(**infer_kwargs).result()
+
+    def close(self, timeout=30):
+        """
+        Let the workers finish the queued jobs, then stop them. Jobs still queued or running after
+        timeout fail with RuntimeError.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while (self._backlog or self._running) and self._collector is not None and self._collector.is_alive():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._job_done.wait(remaining)
+        for job_queue in self._job_queues:
+            if job_queue is not None:
+                job_queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        if self._collector is not None:
+            self._collector.join(timeout)  # results already sent by the workers
+        self._fail_pending("F5TTSPool closed before the job finished")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
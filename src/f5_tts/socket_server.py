@@ -3,22 +3,25 @@ import gc
 import logging
 import numpy as np
 import queue
+import re
 import socket
 import struct
 import threading
 import traceback
-import wave
 from importlib.resources import files
 
 import torch
-import torchaudio
 from huggingface_hub import hf_hub_download
 from omegaconf import OmegaConf
 
 from f5_tts.model.backbones.dit import DiT  # noqa: F401. used for config
+from f5_tts.infer.audio_encoding import OUTPUT_FORMATS, StreamingEncoder, get_output_format
+from f5_tts.infer.compiled_inference import CompiledInference
+from f5_tts.infer.conditioning_cache import ConditioningCache
 from f5_tts.infer.utils_infer import (
     chunk_text,
-    preprocess_ref_audio_text,
+    get_sampling_params,
+    sampling_presets,
     load_vocoder,
     load_model,
     infer_batch_process,
@@ -29,31 +32,25 @@ logger = logging.getLogger(__name__)
 
 
 class AudioFileWriterThread(threading.Thread):
-    """Threaded file writer to avoid blocking the TTS streaming process."""
+    """Threaded file writer to avoid blocking the TTS streaming process, encodes chunks as they arrive."""
 
-    def __init__(self, output_file, sampling_rate):
+    def __init__(self, output_file, sampling_rate, output_format="pcm16"):
         super().__init__()
         self.output_file = output_file
         self.sampling_rate = sampling_rate
+        self.output_format = output_format
         self.queue = queue.Queue()
         self.stop_event = threading.Event()
-        self.audio_data = []
 
     def run(self):
         """Process queued audio data and write it to a file."""
         logger.info("AudioFileWriterThread started.")
-        with wave.open(self.output_file, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(self.sampling_rate)
-
+        with StreamingEncoder(self.output_file, self.sampling_rate, self.output_format) as encoder:
             while not self.stop_event.is_set() or not self.queue.empty():
                 try:
                     chunk = self.queue.get(timeout=0.1)
                     if chunk is not None:
-                        chunk = np.int16(chunk * 32767)
-                        self.audio_data.append(chunk)
-                        wf.writeframes(chunk.tobytes())
+                        encoder.write(np.asarray(chunk, dtype=np.float32))
                 except queue.Empty:
                     continue
 
@@ -69,7 +66,25 @@ class AudioFileWriterThread(threading.Thread):
 
 
 class TTSStreamingProcessor:
-    def __init__(self, model, ckpt_file, vocab_file, ref_audio, ref_text, device=None, dtype=torch.float32):
+    def __init__(
+        self,
+        model,
+        ckpt_file,
+        vocab_file,
+        ref_audio,
+        ref_text,
+        device=None,
+        dtype="fp32",  # fp16 / bf16 opt-in
+        conditioning_cache_dir=None,
+        preset="quality",
+        ode_method=None,
+        compile=False,
+        compile_buckets=None,
+        quantize=False,
+        quantized_ckpt_file=None,
+        quantized_vocoder_file=None,
+        output_format="pcm16",
+    ):
         self.device = device or (
             "cuda"
             if torch.cuda.is_available()
@@ -85,16 +100,36 @@ class TTSStreamingProcessor:
         self.mel_spec_type = model_cfg.model.mel_spec.mel_spec_type
         self.sampling_rate = model_cfg.model.mel_spec.target_sample_rate
 
+        self.ode_method = ode_method
+        self.sampling = get_sampling_params(preset, ode_method=ode_method)
+
+        if quantize:  # int8 kernels are cpu only
+            self.device = "cpu"
+        self.quantize = quantize
+        self.quantized_ckpt_file = quantized_ckpt_file
+        self.quantized_vocoder_file = quantized_vocoder_file
+
         self.model = self.load_ema_model(ckpt_file, vocab_file, dtype)
         self.vocoder = self.load_vocoder_model()
 
+        self.compiled_inference = None
+        if compile:
+            self.compiled_inference = CompiledInference(
+                self.model, self.vocoder, mel_spec_type=self.mel_spec_type, buckets=compile_buckets
+            )
+            self.compiled_inference.warm_up()
+            logger.info(f"Compile stats: {self.compiled_inference.stats()}")
+
+        self.conditioning_cache = ConditioningCache(cache_dir=conditioning_cache_dir, mel_spec_type=self.mel_spec_type)
         self.update_reference(ref_audio, ref_text)
         self._warm_up()
+        self.output_file = "output" + get_output_format(output_format)[0]
+        self.output_format = output_format
         self.file_writer_thread = None
         self.first_package = True
 
     def load_ema_model(self, ckpt_file, vocab_file, dtype):
-        return load_model(
+        model = load_model(
             self.model_cls,
             self.model_arc,
             ckpt_path=ckpt_file,
@@ -103,16 +138,27 @@ class TTSStreamingProcessor:
             ode_method="euler",
             use_ema=True,
             device=self.device,
-        ).to(self.device, dtype=dtype)
+            quantize=self.quantize,
+            quantized_ckpt_path=self.quantized_ckpt_file,
+            dtype=dtype,
+        )
+        return model
 
     def load_vocoder_model(self):
-        return load_vocoder(vocoder_name=self.mel_spec_type, is_local=False, local_path=None, device=self.device)
+        return load_vocoder(
+            vocoder_name=self.mel_spec_type,
+            is_local=False,
+            local_path=None,
+            device=self.device,
+            quantize=self.quantize,
+            quantized_path=self.quantized_vocoder_file,
+        )
 
     def update_reference(self, ref_audio, ref_text):
-        self.ref_audio, self.ref_text = preprocess_ref_audio_text(ref_audio, ref_text)
-        self.audio, self.sr = torchaudio.load(self.ref_audio)
+        self.conditioning = self.conditioning_cache.get(ref_audio, ref_text)
+        self.ref_text = self.conditioning.ref_text
 
-        ref_audio_duration = self.audio.shape[-1] / self.sr
+        ref_audio_duration = self.conditioning.audio.shape[-1] / self.sampling_rate
         ref_text_byte_len = len(self.ref_text.encode("utf-8"))
         self.max_chars = int(ref_text_byte_len / (ref_audio_duration) * (25 - ref_audio_duration))
         self.few_chars = int(ref_text_byte_len / (ref_audio_duration) * (25 - ref_audio_duration) / 2)
@@ -122,7 +168,7 @@ class TTSStreamingProcessor:
         logger.info("Warming up the model...")
         gen_text = "Warm-up text for the model."
         for _ in infer_batch_process(
-            (self.audio, self.sr),
+            self.conditioning,
             self.ref_text,
             [gen_text],
             self.model,
@@ -130,11 +176,20 @@ class TTSStreamingProcessor:
             progress=None,
             device=self.device,
             streaming=True,
+            **self.sampling,
         ):
             pass
         logger.info("Warm-up completed.")
 
+    def parse_request(self, text):
+        """A message may start with a preset tag, e.g. "[fast] some text"; returns (text, sampling params)"""
+        match = re.match(r"^\[(\w+)\]\s*", text)
+        if match and match.group(1) in sampling_presets:
+            return text[match.end() :], get_sampling_params(match.group(1), ode_method=self.ode_method)
+        return text, self.sampling
+
     def generate_stream(self, text, conn):
+        text, sampling = self.parse_request(text)
         text_batches = chunk_text(text, max_chars=self.max_chars)
         if self.first_package:
             text_batches = chunk_text(text_batches[0], max_chars=self.few_chars) + text_batches[1:]
@@ -142,7 +197,7 @@ class TTSStreamingProcessor:
             self.first_package = False
 
         audio_stream = infer_batch_process(
-            (self.audio, self.sr),
+            self.conditioning,
             self.ref_text,
             text_batches,
             self.model,
@@ -151,12 +206,13 @@ class TTSStreamingProcessor:
             device=self.device,
             streaming=True,
             chunk_size=2048,
+            **sampling,
         )
 
         # Reset the file writer thread
         if self.file_writer_thread is not None:
             self.file_writer_thread.stop()
-        self.file_writer_thread = AudioFileWriterThread("output.wav", self.sampling_rate)
+        self.file_writer_thread = AudioFileWriterThread(self.output_file, self.sampling_rate, self.output_format)
         self.file_writer_thread.start()
 
         for audio_chunk, _ in audio_stream:
@@ -243,8 +299,66 @@ if __name__ == "__main__":
         help="Reference audio subtitle, leave empty to auto-transcribe",
     )
 
+    parser.add_argument(
+        "--conditioning_cache_dir",
+        default=None,
+        help="Directory persisting preprocessed reference voices across restarts",
+    )
+
+    parser.add_argument(
+        "--preset",
+        default="quality",
+        choices=list(sampling_presets),
+        help="Default sampling preset, a message can override it with a leading tag like [fast]",
+    )
+    parser.add_argument(
+        "--ode_method",
+        default=None,
+        choices=["euler", "midpoint", "heun"],
+        help="ODE solver, overrides the one of the preset",
+    )
+
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="torch.compile the transformer blocks and vocoder, pre-compiling the sequence-length buckets",
+    )
+    parser.add_argument(
+        "--compile_buckets",
+        default=None,
+        help="Comma separated bucket lengths in mel frames, e.g. 512,1024,2048",
+    )
+
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="Dynamic int8 quantization of the transformer attention/FF linears and the Vocos backbone (cpu)",
+    )
+    parser.add_argument(
+        "--quantized_ckpt_file",
+        default=None,
+        help="Pre-quantized model checkpoint, created from --ckpt_file on first run if missing",
+    )
+    parser.add_argument(
+        "--quantized_vocoder_file",
+        default=None,
+        help="Pre-quantized vocoder checkpoint, created on first run if missing",
+    )
+
+    parser.add_argument(
+        "--output_format",
+        default="pcm16",
+        choices=list(OUTPUT_FORMATS),
+        help="Encoding of the copy written to output.*, opus / mp3 are about 10x smaller than pcm16",
+    )
+
     parser.add_argument("--device", default=None, help="Device to run the model on")
-    parser.add_argument("--dtype", default=torch.float32, help="Data type to use for model inference")
+    parser.add_argument(
+        "--dtype",
+        default="fp32",
+        choices=["fp32", "fp16", "bf16"],
+        help="Model dtype, fp16 for CUDA or bf16 for CPUs with native bf16 matmul are opt-in",
+    )
 
     args = parser.parse_args()
 
@@ -258,6 +372,15 @@ if __name__ == "__main__":
             ref_text=args.ref_text,
             device=args.device,
             dtype=args.dtype,
+            conditioning_cache_dir=args.conditioning_cache_dir,
+            preset=args.preset,
+            ode_method=args.ode_method,
+            compile=args.compile,
+            compile_buckets=[int(b) for b in args.compile_buckets.split(",")] if args.compile_buckets else None,
+            quantize=args.quantize,
+            quantized_ckpt_file=args.quantized_ckpt_file,
+            quantized_vocoder_file=args.quantized_vocoder_file,
+            output_format=args.output_format,
         )
 
         # Start the server
@@ -26,10 +26,11 @@ import torchaudio
 from cached_path import cached_path
 from datasets import Dataset as Dataset_
 from datasets.arrow_writer import ArrowWriter
-from safetensors.torch import load_file, save_file
+from safetensors.torch import load_file
 
 from f5_tts.api import F5TTS
 from f5_tts.model.utils import convert_char_to_pinyin
+from f5_tts.infer.serving_checkpoint import extract_and_save_ema_model
 from f5_tts.infer.utils_infer import transcribe
 
 
@@ -958,29 +959,6 @@ def calculate_train(
     )
 
 
-def extract_and_save_ema_model(checkpoint_path: str, new_checkpoint_path: str, safetensors: bool) -> str:
-    try:
-        checkpoint = torch.load(checkpoint_path, weights_only=True)
-        print("Original Checkpoint Keys:", checkpoint.keys())
-
-        ema_model_state_dict = checkpoint.get("ema_model_state_dict", None)
-        if ema_model_state_dict is None:
-            return "No 'ema_model_state_dict' found in the checkpoint."
-
-        if safetensors:
-            new_checkpoint_path = new_checkpoint_path.replace(".pt", ".safetensors")
-            save_file(ema_model_state_dict, new_checkpoint_path)
-        else:
-            new_checkpoint_path = new_checkpoint_path.replace(".safetensors", ".pt")
-            new_checkpoint = {"ema_model_state_dict": ema_model_state_dict}
-            torch.save(new_checkpoint, new_checkpoint_path)
-
-        return f"New checkpoint saved at: {new_checkpoint_path}"
-
-    except Exception as e:
-        return f"An error occurred: {e}"
-
-
 def expand_model_embeddings(ckpt_path, new_ckpt_path, num_new_tokens=42):
     seed = 666
     random.seed(seed)
@@ -264,6 +264,7 @@ window.addEventListener("DOMContentLoaded", function () {
 
                     if (data.audio_url) {
                         audioSource.src = data.audio_url;
+                        audioSource.type = data.mimetype || "audio/wav";
                         downloadLink.href = data.audio_url;
                         generatedAudio.load();
                         audioResult.style.display = "block";
@@ -375,7 +376,7 @@ const progressStages = [
     { percent: 55, status: "Đang sinh giọng nói...", detail: "Generating speech", duration: 80 },
     { percent: 75, status: "Đang tạo waveform...", detail: "Vocoder processing", duration: 40 },
     { percent: 85, status: "Đang lưu audio...", detail: "Saving output file", duration: 10 },
-    { percent: 90, status: "Đang tạo spectrogram...", detail: "Creating visualization", duration: 15 },
+    { percent: 90, status: "Đang lưu kết quả...", detail: "Saving output", duration: 5 },
     //{ percent: 95, status: "Đang đánh giá chất lượng...", detail: "Calculating WER/CER", duration: 30 },
     { percent: 95, status: "Đang hoàn tất...", detail: "Finalizing", duration: 5 }
 ];
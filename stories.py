@@ -7,6 +7,7 @@ import sqlite3
 from flask import Blueprint, request, jsonify, g, current_app
 
 from auth import login_required, admin_required, get_current_user
+from story_render import get_story_narrations
 
 stories_bp = Blueprint('stories', __name__, url_prefix='/api/stories')
 
@@ -203,6 +204,13 @@ def get_story(story_id):
         story_data = dict(story)
         story_data['is_favorite'] = is_favorite
         
+        # Pre-rendered narrations (one per voice) of the current text
+        try:
+            story_data['narrations'] = get_story_narrations(db, story_id)
+        except Exception as e:
+            print(f"[GET STORY NARRATIONS ERROR] {e}")
+            story_data['narrations'] = []
+        
         return jsonify({
             'status': 'ok',
             'story': story_data
@@ -0,0 +1,313 @@
+"""
+Story Pre-rendering for Story Telling App
+Renders every active story x active voice sample to narration audio in the background,
+so the first listener does not wait for the full synthesis.
+
+Jobs live in the story_render_jobs table, a leased queue (see job_queue.py): they survive crashes
+(running jobs whose heartbeat stops are re-queued) and the concurrency limit holds across all
+processes sharing the database.
+Finished narrations are recorded in story_audio (story, voice -> audio asset).
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+from f5_tts.infer.audio_encoding import StreamingEncoder, get_output_format
+from job_queue import JobCancelled, LeasedJobWorker, connect
+
+# bump when rendering changes its output for the same story and voice
+RENDER_VERSION = 1
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS story_render_jobs (
+        job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        story_id INTEGER NOT NULL,
+        voice_id INTEGER NOT NULL,
+        content_hash TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',  -- queued | running | done | failed | cancelled
+        progress REAL DEFAULT 0,
+        attempts INTEGER DEFAULT 0,
+        error TEXT,
+        worker TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        started_at DATETIME,
+        heartbeat_at DATETIME,
+        finished_at DATETIME,
+        UNIQUE (story_id, voice_id, content_hash),
+        FOREIGN KEY (story_id) REFERENCES stories(story_id) ON DELETE CASCADE,
+        FOREIGN KEY (voice_id) REFERENCES voice_samples(sample_id) ON DELETE CASCADE
+    );
+
+    CREATE TABLE IF NOT EXISTS story_audio (
+        story_id INTEGER NOT NULL,
+        voice_id INTEGER NOT NULL,
+        audio_path TEXT NOT NULL,
+        duration REAL,
+        content_hash TEXT NOT NULL,
+        job_id INTEGER,
+        segments TEXT,  -- JSON list of segment cache keys in narration order
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (story_id, voice_id),
+        FOREIGN KEY (story_id) REFERENCES stories(story_id) ON DELETE CASCADE,
+        FOREIGN KEY (voice_id) REFERENCES voice_samples(sample_id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_render_jobs_status ON story_render_jobs(status);
+'''
+
+
+def init_render_tables(db):
+    db.executescript(SCHEMA)
+    columns = [row[1] for row in db.execute('PRAGMA table_info(story_audio)').fetchall()]
+    if 'segments' not in columns:
+        db.execute('ALTER TABLE story_audio ADD COLUMN segments TEXT')
+    db.commit()
+
+
+def get_content_hash(story, voice):
+    """Everything the narration depends on: story text and the reference voice"""
+    key = '\n'.join([
+        str(RENDER_VERSION), story['content'], voice['file_path'], voice['ref_text'] or ''
+    ])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def split_paragraphs(content):
+    return [p.strip() for p in re.split(r'\n\s*\n', content) if p.strip()]
+
+
+# ==========================================
+# Queue
+# ==========================================
+
+def enqueue_story(db, story_id, force=False):
+    """
+    Queue a render job for every active voice whose narration of the story is missing or stale.
+    Inactive or deleted stories get their pending jobs cancelled. Returns the number of jobs queued.
+    """
+    init_render_tables(db)
+    story = db.execute('SELECT * FROM stories WHERE story_id = ?', (story_id,)).fetchone()
+    if not story or not story['is_active']:
+        db.execute('''
+            UPDATE story_render_jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP
+            WHERE story_id = ? AND status IN ('queued', 'running')
+        ''', (story_id,))
+        db.commit()
+        return 0
+
+    voices = db.execute('SELECT * FROM voice_samples WHERE is_active = 1').fetchall()
+    queued = 0
+    for voice in voices:
+        content_hash = get_content_hash(story, voice)
+
+        # an edit supersedes pending jobs for the old text
+        db.execute('''
+            UPDATE story_render_jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP
+            WHERE story_id = ? AND voice_id = ? AND content_hash != ? AND status IN ('queued', 'running')
+        ''', (story_id, voice['sample_id'], content_hash))
+
+        current = db.execute(
+            'SELECT content_hash FROM story_audio WHERE story_id = ? AND voice_id = ?',
+            (story_id, voice['sample_id'])
+        ).fetchone()
+        if current and current['content_hash'] == content_hash and not force:
+            continue
+
+        job = db.execute('''
+            SELECT job_id, status FROM story_render_jobs
+            WHERE story_id = ? AND voice_id = ? AND content_hash = ?
+        ''', (story_id, voice['sample_id'], content_hash)).fetchone()
+        if job is None:
+            db.execute('''
+                INSERT INTO story_render_jobs (story_id, voice_id, content_hash) VALUES (?, ?, ?)
+            ''', (story_id, voice['sample_id'], content_hash))
+        elif job['status'] in ('queued', 'running'):
+            continue
+        else:
+            db.execute('''
+                UPDATE story_render_jobs SET status = 'queued', progress = 0, attempts = 0, error = NULL,
+                    worker = NULL, started_at = NULL, heartbeat_at = NULL, finished_at = NULL
+                WHERE job_id = ?
+            ''', (job['job_id'],))
+        queued += 1
+
+    db.commit()
+    return queued
+
+
+def enqueue_all_stories(db, force=False):
+    stories = db.execute('SELECT story_id FROM stories WHERE is_active = 1 ORDER BY story_id').fetchall()
+    return sum(enqueue_story(db, s['story_id'], force=force) for s in stories)
+
+
+def get_render_status(db, limit=20):
+    """Job counts by status, running jobs with progress and recent failures, for the admin dashboard"""
+    init_render_tables(db)
+    counts = {row['status']: row['count'] for row in db.execute(
+        'SELECT status, COUNT(*) as count FROM story_render_jobs GROUP BY status'
+    ).fetchall()}
+    job_query = '''
+        SELECT j.*, s.title as story_title, v.name as voice_name
+        FROM story_render_jobs j
+        LEFT JOIN stories s ON j.story_id = s.story_id
+        LEFT JOIN voice_samples v ON j.voice_id = v.sample_id
+        WHERE j.status = ?
+        ORDER BY j.job_id DESC
+        LIMIT ?
+    '''
+    rendered = db.execute('SELECT COUNT(*) as count FROM story_audio').fetchone()['count']
+    return {
+        'counts': {status: counts.get(status, 0) for status in ['queued', 'running', 'done', 'failed', 'cancelled']},
+        'rendered': rendered,
+        'running': [dict(j) for j in db.execute(job_query, ('running', limit)).fetchall()],
+        'failed': [dict(j) for j in db.execute(job_query, ('failed', limit)).fetchall()]
+    }
+
+
+def get_story_narrations(db, story_id):
+    """Pre-rendered narrations of the story's current text, one per active voice"""
+    init_render_tables(db)
+    rows = db.execute('''
+        SELECT a.voice_id, a.audio_path, a.duration, a.content_hash, a.created_at,
+               s.content, v.file_path, v.ref_text
+        FROM story_audio a
+        JOIN stories s ON a.story_id = s.story_id
+        JOIN voice_samples v ON a.voice_id = v.sample_id
+        WHERE a.story_id = ? AND v.is_active = 1
+    ''', (story_id,)).fetchall()
+    return [
+        {key: r[key] for key in ['voice_id', 'audio_path', 'duration', 'created_at']}
+        for r in rows if r['content_hash'] == get_content_hash(r, r)
+    ]
+
+
+# ==========================================
+# Renderer
+# ==========================================
+
+def default_resolve_voice(voice, static_dir='static'):
+    """voice_samples row -> (reference audio path, ref_text); empty ref_text is transcribed by synthesis"""
+    audio_path = os.path.join(static_dir, voice['file_path'])
+    ref_text = voice['ref_text'] or ''
+    text_ref_path = os.path.join(os.path.dirname(audio_path), 'text-ref.txt')
+    if not ref_text.strip() and os.path.exists(text_ref_path):
+        with open(text_ref_path, 'r', encoding='utf-8') as f:
+            ref_text = f.read().strip()
+    return audio_path, ref_text
+
+
+class StoryRenderer(LeasedJobWorker):
+    """
+    Background threads that claim queued jobs and render them with
+    synthesize(gen_text, ref_audio_path, ref_text) -> (audio, sample_rate[, segment_info]), one paragraph
+    at a time. With a chunk-caching synthesize (app.generate_audio_segmented) a re-render after an edit
+    only synthesises the changed chunks. Paragraphs are encoded (output_format, see audio_encoding.py)
+    as they are synthesised.
+    At most `concurrency` jobs run at once across every process using the database.
+    """
+
+    table = 'story_render_jobs'
+    name = 'Story renderer'
+    thread_name = 'story-render'
+    log_tag = 'RENDER'
+    claimed_progress = 0
+
+    def __init__(self, database, synthesize, output_dir='static/output/stories', url_prefix='/static/output/stories',
+                 concurrency=1, poll_interval=5.0, lease_seconds=600, max_attempts=3,
+                 resolve_voice=default_resolve_voice, paragraph_pause=0.4, output_format='wav'):
+        super().__init__(database, concurrency=concurrency, poll_interval=poll_interval,
+                         lease_seconds=lease_seconds, max_attempts=max_attempts)
+        self.synthesize = synthesize
+        self.output_dir = output_dir
+        self.url_prefix = url_prefix
+        self.resolve_voice = resolve_voice
+        self.paragraph_pause = paragraph_pause
+        self.output_format = output_format
+
+        os.makedirs(output_dir, exist_ok=True)
+        db = connect(database)
+        try:
+            init_render_tables(db)
+        finally:
+            db.close()
+
+    def run(self, db, job):
+        start_time = time.time()
+        story = db.execute('SELECT * FROM stories WHERE story_id = ?', (job['story_id'],)).fetchone()
+        voice = db.execute('SELECT * FROM voice_samples WHERE sample_id = ?', (job['voice_id'],)).fetchone()
+        if story is None or voice is None or get_content_hash(story, voice) != job['content_hash']:
+            db.execute('''
+                UPDATE story_render_jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP WHERE job_id = ?
+            ''', (job['job_id'],))
+            db.commit()
+            raise JobCancelled()
+
+        print(f"[RENDER] Job {job['job_id']}: story {story['story_id']} '{story['title']}' x voice {voice['name']}")
+        ref_audio_path, ref_text = self.resolve_voice(voice)
+        paragraphs = split_paragraphs(story['content'])
+
+        previous = db.execute(
+            'SELECT audio_path, segments FROM story_audio WHERE story_id = ? AND voice_id = ?',
+            (story['story_id'], voice['sample_id'])
+        ).fetchone()
+
+        extension = get_output_format(self.output_format)[0]
+        filename = f"story_{story['story_id']}_voice_{voice['sample_id']}_{job['content_hash'][:12]}{extension}"
+        output_path = os.path.join(self.output_dir, filename)
+
+        encoder = None
+        segment_keys = []
+        num_synthesized = 0
+        try:
+            for i, paragraph in enumerate(paragraphs):
+                # synthesize may also return segment info: {"segments": [keys], "synthesized": n}
+                result = self.synthesize(paragraph, ref_audio_path, ref_text)
+                audio, sample_rate = result[0], result[1]
+                if len(result) > 2:
+                    segment_keys.extend(result[2]['segments'])
+                    num_synthesized += result[2]['synthesized']
+                if encoder is None:
+                    encoder = StreamingEncoder(output_path, sample_rate, self.output_format)
+                else:
+                    encoder.write(np.zeros(int(self.paragraph_pause * sample_rate), dtype=np.float32))
+                encoder.write(audio)
+                self.heartbeat(db, job, (i + 1) / len(paragraphs))
+
+            if encoder is None:
+                encoder = StreamingEncoder(output_path, 24000, self.output_format)
+            encoded = encoder.close()
+        except BaseException:
+            if encoder is not None:
+                encoder.abort()
+            raise
+        duration = encoded.duration
+
+        if segment_keys:
+            previous_keys = set(json.loads(previous['segments'])) if previous and previous['segments'] else set()
+            print(f"[RENDER] Job {job['job_id']}: {num_synthesized}/{len(segment_keys)} chunks synthesised, "
+                  f"{len([k for k in segment_keys if k in previous_keys])} unchanged since the last narration")
+
+        db.execute('''
+            INSERT OR REPLACE INTO story_audio (story_id, voice_id, audio_path, duration, content_hash, job_id, segments)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (story['story_id'], voice['sample_id'], f"{self.url_prefix}/{filename}", duration,
+              job['content_hash'], job['job_id'], json.dumps(segment_keys) if segment_keys else None))
+        db.execute('''
+            UPDATE story_render_jobs SET status = 'done', progress = 1, finished_at = CURRENT_TIMESTAMP
+            WHERE job_id = ?
+        ''', (job['job_id'],))
+        db.commit()
+
+        # the narration of the previous text is no longer referenced
+        if previous and os.path.basename(previous['audio_path']) != filename:
+            old_path = os.path.join(self.output_dir, os.path.basename(previous['audio_path']))
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+        print(f"[RENDER] Job {job['job_id']} done: {duration:.1f}s audio ({encoded.size / 1024:.0f} KiB "
+              f"{encoded.codec}) in {time.time() - start_time:.1f}s")
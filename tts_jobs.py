@@ -0,0 +1,231 @@
+"""
+Asynchronous Synthesis Jobs for Story Telling App
+POST /api/tts/jobs queues a voice-cloning request and returns at once; background workers
+synthesise it while clients poll GET /api/tts/jobs/<job_id> or follow its Server-Sent Events.
+
+Jobs live in the tts_jobs table, a leased queue (see job_queue.py), so they survive restarts
+(running jobs whose heartbeat stops are re-queued) and the concurrency limit holds across all
+processes sharing the database.
+Finished jobs point at their generated_audios row.
+"""
+
+import json
+import time
+import uuid
+
+from job_queue import LeasedJobWorker, connect
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS tts_jobs (
+        job_id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        status TEXT NOT NULL DEFAULT 'queued',  -- queued | running | done | failed | cancelled
+        params TEXT NOT NULL,  -- JSON request: text, reference audio and text, speed, sampling
+        progress TEXT,  -- JSON {stage, chunk, chunks, step, steps, progress, eta}
+        result TEXT,  -- JSON response, as returned by /voice-cloning
+        audio_id INTEGER,
+        attempts INTEGER DEFAULT 0,
+        error TEXT,
+        worker TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        started_at DATETIME,
+        heartbeat_at DATETIME,
+        finished_at DATETIME,
+        FOREIGN KEY (audio_id) REFERENCES generated_audios(audio_id) ON DELETE SET NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_tts_jobs_status ON tts_jobs(status);
+'''
+
+FINAL_STATUSES = ('done', 'failed', 'cancelled')
+
+
+def init_job_tables(db):
+    db.executescript(SCHEMA)
+    db.commit()
+
+
+# ==========================================
+# Queue
+# ==========================================
+
+def create_job(db, params, user_id=None):
+    """Queue a synthesis job, returns its job_id"""
+    init_job_tables(db)
+    job_id = uuid.uuid4().hex
+    db.execute('''
+        INSERT INTO tts_jobs (job_id, user_id, params, progress) VALUES (?, ?, ?, ?)
+    ''', (job_id, user_id, json.dumps(params, ensure_ascii=False), json.dumps({'stage': 'queued', 'progress': 0})))
+    db.commit()
+    return job_id
+
+
+def get_job(db, job_id):
+    """Job as returned by the API (JSON columns decoded, params left out), None if unknown"""
+    row = db.execute('SELECT rowid as seq, * FROM tts_jobs WHERE job_id = ?', (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = {key: row[key] for key in [
+        'job_id', 'status', 'audio_id', 'attempts', 'error', 'created_at', 'started_at', 'finished_at'
+    ]}
+    job['progress'] = json.loads(row['progress']) if row['progress'] else None
+    job['result'] = json.loads(row['result']) if row['result'] else None
+    if row['status'] == 'queued':
+        job['queue_position'] = db.execute('''
+            SELECT COUNT(*) as count FROM tts_jobs WHERE status = 'queued' AND rowid <= ?
+        ''', (row['seq'],)).fetchone()['count']
+    return job
+
+
+def cancel_job(db, job_id):
+    """Cancel a queued or running job (a running one stops at its next ODE step); False if already finished"""
+    cursor = db.execute('''
+        UPDATE tts_jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP
+        WHERE job_id = ? AND status IN ('queued', 'running')
+    ''', (job_id,))
+    db.commit()
+    return cursor.rowcount > 0
+
+
+def get_job_counts(db):
+    init_job_tables(db)
+    counts = {row['status']: row['count'] for row in db.execute(
+        'SELECT status, COUNT(*) as count FROM tts_jobs GROUP BY status'
+    ).fetchall()}
+    return {status: counts.get(status, 0) for status in ('queued', 'running') + FINAL_STATUSES}
+
+
+def iter_job_events(database, job_id, poll_interval=0.5, keepalive=15.0):
+    """
+    Server-Sent Events of a job: a `progress` event whenever its status or progress changes, then one
+    final `done`, `failed` or `cancelled` event with the whole job. Polls the database, so it follows
+    jobs run by any process.
+    """
+    last = None
+    last_sent = time.time()
+    db = connect(database)
+    try:
+        while True:
+            job = get_job(db, job_id)
+            if job is None:
+                yield f"event: failed\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+                return
+            if job['status'] in FINAL_STATUSES:
+                yield f"event: {job['status']}\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                return
+
+            state = (job['status'], json.dumps(job['progress']), job.get('queue_position'))
+            if state != last:
+                last = state
+                last_sent = time.time()
+                data = {key: job.get(key) for key in ['job_id', 'status', 'progress', 'queue_position']}
+                yield f"event: progress\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            elif time.time() - last_sent > keepalive:
+                # comment line, keeps proxies from closing an idle stream
+                last_sent = time.time()
+                yield ": keepalive\n\n"
+            time.sleep(poll_interval)
+    finally:
+        db.close()
+
+
+# ==========================================
+# Worker
+# ==========================================
+
+class JobContext:
+    """Handed to synthesize(params, context): progress reporting, heartbeat and cancellation of one job"""
+
+    def __init__(self, worker, db, job):
+        self.worker = worker
+        self.db = db
+        self.job = job
+        self.job_id = job['job_id']
+        self.progress = {'stage': 'starting', 'progress': 0}
+        self._start = time.time()
+        self._last_write = 0.0
+
+    def report(self, stage=None, **fields):
+        """
+        Merge progress fields (chunk, chunks, step, steps, progress) and estimate the remaining time.
+        Written at most every progress_interval seconds, except on a stage change; raises JobCancelled
+        once the job was cancelled.
+        """
+        stage_changed = stage is not None and stage != self.progress.get('stage')
+        if stage_changed:
+            self.progress['stage'] = stage
+            self._start = time.time()
+        self.progress.update(fields)
+
+        fraction = self.progress.get('progress') or 0
+        if self.progress['stage'] == 'synthesizing' and fraction > 0:
+            elapsed = time.time() - self._start
+            self.progress['eta'] = round(elapsed * (1 - fraction) / fraction, 1)
+
+        if stage_changed or time.time() - self._last_write >= self.worker.progress_interval:
+            self._last_write = time.time()
+            self.worker.heartbeat(self.db, self.job, self.progress)
+
+    def __call__(self, info):
+        """Progress callback of infer_batch_process"""
+        self.report('synthesizing', **info)
+
+
+class TTSJobWorker(LeasedJobWorker):
+    """
+    Background threads that claim queued jobs and run synthesize(params, context) -> result, where
+    result is the JSON response of the job and may carry the generated_audios audio_id.
+    cleanup(params) runs once a job is finished for good (done, cancelled or out of attempts), e.g.
+    to remove an uploaded reference.
+    At most `concurrency` jobs run at once across every process using the database.
+    """
+
+    table = 'tts_jobs'
+    name = 'TTS job worker'
+    thread_name = 'tts-job'
+    log_tag = 'JOBS'
+
+    def __init__(self, database, synthesize, concurrency=1, poll_interval=1.0, lease_seconds=600,
+                 max_attempts=2, progress_interval=0.5, cleanup=None):
+        super().__init__(database, concurrency=concurrency, poll_interval=poll_interval,
+                         lease_seconds=lease_seconds, max_attempts=max_attempts)
+        self.synthesize = synthesize
+        self.progress_interval = progress_interval
+        self.cleanup = cleanup
+
+        db = connect(database)
+        try:
+            init_job_tables(db)
+        finally:
+            db.close()
+
+    def heartbeat(self, db, job, progress):
+        """Record the progress fields (JSON); raises JobCancelled if the job was cancelled meanwhile"""
+        super().heartbeat(db, job, json.dumps(progress))
+
+    def run(self, db, job):
+        start_time = time.time()
+        params = json.loads(job['params'])
+        context = JobContext(self, db, job)
+        print(f"[JOBS] Job {job['job_id']} started (attempt {job['attempts']}): {params.get('text', '')[:60]}...")
+        result = self.synthesize(params, context)
+
+        progress = dict(context.progress, stage='done', progress=1, eta=0)
+        db.execute('''
+            UPDATE tts_jobs SET status = 'done', progress = ?, result = ?, audio_id = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND status = 'running'
+        ''', (json.dumps(progress), json.dumps(result, ensure_ascii=False), result.get('audio_id'), job['job_id']))
+        db.commit()
+        self._cleanup(job)
+        print(f"[JOBS] Job {job['job_id']} done in {time.time() - start_time:.1f}s")
+
+    def job_finished(self, job):
+        self._cleanup(job)
+
+    def _cleanup(self, job):
+        if self.cleanup is None:
+            return
+        try:
+            self.cleanup(json.loads(job['params']))
+        except Exception as e:
+            print(f"[JOBS ERROR] Cleanup of job {job['job_id']} failed: {e}")